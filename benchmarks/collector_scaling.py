@@ -0,0 +1,59 @@
+"""Benchmark collection time of ShardedCollector by number of workers.
+
+Collects all processes under /proc with a sequential Collector and with a
+ShardedCollector for increasing numbers of workers, printing the best time
+for each.
+
+Run as::
+
+  python benchmarks/collector_scaling.py [--repeat N] [--max-workers N]
+
+"""
+
+from argparse import ArgumentParser
+import os
+from timeit import repeat
+
+from lxstats.process import (
+    Collector,
+    ShardedCollector,
+)
+
+
+def worker_counts(max_workers):
+    """Return powers of two up to max_workers, plus max_workers."""
+    count = 1
+    while count < max_workers:
+        yield count
+        count *= 2
+    yield max_workers
+
+
+def best_time(collector, repeat_count):
+    return min(
+        repeat(
+            lambda: list(collector.collect()), number=1, repeat=repeat_count
+        )
+    )
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    processes_count = len(list(Collector(stats=()).collect()))
+    print(f"processes: {processes_count}")
+
+    baseline = best_time(Collector(), args.repeat)
+    print(f"{'collector':<20} {'time (s)':>10} {'speedup':>8}")
+    print(f"{'sequential':<20} {baseline:>10.4f} {1:>8.2f}")
+    for workers in worker_counts(args.max_workers):
+        elapsed = best_time(ShardedCollector(workers=workers), args.repeat)
+        label = f"sharded ({workers})"
+        print(f"{label:<20} {elapsed:>10.4f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark compiled field parsers against generic field mapping.
+
+Parses sample lines for files with fields definitions, comparing the parser
+compiled for each class with the generic mapping of values to fields.
+
+Run as::
+
+  python benchmarks/field_parsers.py [--number N]
+
+"""
+
+from argparse import ArgumentParser
+from timeit import timeit
+
+from lxstats.files.proc import (
+    ProcLoadavg,
+    ProcPIDStat,
+    ProcPIDStatm,
+    ProcUptime,
+)
+from lxstats.files.text import (
+    _get_fields,
+    compile_fields,
+)
+
+SAMPLES = {
+    ProcPIDStat: (
+        "1234 (python3) S 1 1234 1234 0 -1 4194560 25914 3542 0 0 152 31 0 0 "
+        "20 0 3 0 8743 257257472 10520 18446744073709551615 1 1 0 0 0 0 0 "
+        "16781312 1090 0 0 0 17 2 0 0 0 0 0 0 0 0 0 0 0 0 0"
+    ),
+    ProcPIDStatm: "62807 10520 5183 1 0 11436 0",
+    ProcUptime: "350735.47 234388.90",
+    ProcLoadavg: "0.24 0.30 0.32 1/825 30492",
+}
+
+
+def generic_parse(fields, values):
+    """Map values to fields as done before parsers were compiled."""
+    return {
+        key: field_type(value)
+        for (key, field_type), value in zip(_get_fields(fields), values)
+        if key is not None
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(
+        f"{'file':<15} {'generic (s)':>12} {'compiled (s)':>12} {'speedup':>8}"
+    )
+    for cls, line in SAMPLES.items():
+        fields = cls._compiled[0]
+        # Compare parsers for text content
+        compiled = compile_fields(fields)
+        if cls.binary:
+            values = [
+                value.decode()
+                for value in cls("/dev/null")._split(line.encode())
+            ]
+        else:
+            values = cls("/dev/null")._split(line)
+        assert compiled(values) == generic_parse(fields, values)
+        generic_time = timeit(
+            lambda: generic_parse(fields, values), number=args.number
+        )
+        compiled_time = timeit(lambda: compiled(values), number=args.number)
+        print(
+            f"{cls.__name__:<15} {generic_time:>12.3f} {compiled_time:>12.3f} "
+            f"{generic_time / compiled_time:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark the import time of the procs script.
+
+Imports the script in a new interpreter with ``python -X importtime`` a few
+times, printing the best cumulative time and the slowest imported modules.
+Exits with an error if the best time is over the budget.
+
+Run as::
+
+  python benchmarks/procs_import.py [--repeat N] [--budget MICROSECONDS]
+
+"""
+
+from argparse import ArgumentParser
+import subprocess
+import sys
+
+MODULE = "lxstats.scripts.procs"
+
+
+def import_times(module):
+    """Return a dict mapping imported modules to their cumulative time.
+
+    Times are reported by ``python -X importtime``, in microseconds.
+
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=100000)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(MODULE) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[MODULE])
+    print(f"{'module':<40} {'time (us)':>10}")
+    for name, elapsed in sorted(
+        best.items(), key=lambda item: item[1], reverse=True
+    )[: args.top]:
+        print(f"{name:<40} {elapsed:>10}")
+
+    if best[MODULE] > args.budget:
+        sys.exit(f"{MODULE} import time over budget ({args.budget} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark splitting of /proc/[pid]/stat content.
+
+Splits content of stat files for running processes with the regex-based
+split that was used before on decoded content, and with split_stat_bytes()
+on undecoded content, as done by ProcPIDStat.
+
+Run as::
+
+  python benchmarks/stat_split.py [--number N]
+
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+import re
+from timeit import timeit
+
+from lxstats.files.proc.process import split_stat_bytes
+
+_COMM_RE = re.compile(r"\((.+)\)")
+
+
+def regex_split(content):
+    """Split content as done before split_stat_bytes() was introduced."""
+    content = content.strip(" ")
+    match = _COMM_RE.search(content)
+    if match is None:
+        return content.split()
+
+    content = _COMM_RE.sub("comm", content)
+    split = content.split()
+    split[1] = match.groups()[0]
+    return split
+
+
+def read_stat_files():
+    """Return content of stat files for running processes, as bytes."""
+    contents = []
+    for path in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            contents.append(path.read_bytes())
+        except OSError:
+            continue
+    return contents
+
+
+def run(split, contents):
+    for content in contents:
+        split(content)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    contents = read_stat_files()
+    texts = [content.decode() for content in contents]
+    print(f"stat files: {len(contents)}")
+
+    baseline = timeit(lambda: run(regex_split, texts), number=args.number)
+    print(f"{'split':<18} {'time (s)':>10} {'speedup':>8}")
+    print(f"{'regex':<18} {baseline:>10.3f} {1:>8.2f}")
+    elapsed = timeit(
+        lambda: run(split_stat_bytes, contents), number=args.number
+    )
+    print(f"{'bytes':<18} {elapsed:>10.3f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
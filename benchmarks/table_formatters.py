@@ -0,0 +1,65 @@
+"""Benchmark the streaming table formatter against the prettytable one.
+
+Formats a table with a number of sample processes with both
+StreamTableFormatter and TableFormatter, printing the best time for each.
+
+Run as::
+
+  python benchmarks/table_formatters.py [--rows N] [--repeat N]
+
+"""
+
+from argparse import ArgumentParser
+from io import StringIO
+from timeit import repeat
+
+from lxstats.process.formatters import (
+    StreamTableFormatter,
+    TableFormatter,
+)
+
+FIELDS = ["pid", "stat.state", "stat.rss", "cpu.percent", "comm"]
+
+
+class SampleProcess:
+    """A process with fixed stats."""
+
+    def __init__(self, pid):
+        self.stats = {
+            "pid": pid,
+            "stat.state": "S",
+            "stat.rss": pid * 7 % 100000,
+            "cpu.percent": pid % 1000 / 10,
+            "comm": f"process-{pid % 97}",
+        }
+
+    def get(self, stat):
+        return self.stats.get(stat)
+
+
+def best_time(formatter_class, processes, repeat_count):
+    def format_table():
+        formatter_class(StringIO(), FIELDS).format(processes)
+
+    return min(repeat(format_table, number=1, repeat=repeat_count))
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processes = [SampleProcess(pid) for pid in range(1, args.rows + 1)]
+    print(f"{'formatter':<22} {'time (s)':>9} {'speedup':>8}")
+    base_time = best_time(TableFormatter, processes, args.repeat)
+    print(f"{TableFormatter.__name__:<22} {base_time:>9.3f} {1:>8.2f}")
+    stream_time = best_time(StreamTableFormatter, processes, args.repeat)
+    print(
+        f"{StreamTableFormatter.__name__:<22} {stream_time:>9.3f} "
+        f"{base_time / stream_time:>8.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
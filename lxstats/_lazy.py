@@ -0,0 +1,43 @@
+"""Lazy loading of package attributes from submodules.
+
+A package can define attributes that are only imported from their submodule
+when first accessed, with::
+
+  __getattr__, __dir__ = lazy_attributes(__name__, {"Foo": "foo"})
+
+"""
+
+from collections.abc import Callable
+from importlib import import_module
+import sys
+from typing import Any
+
+
+def lazy_attributes(
+    package: str, attributes: dict[str, str]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Return module ``__getattr__`` and ``__dir__`` functions for a package.
+
+    Once imported, attributes are set in the package, so that further
+    accesses don't go through ``__getattr__``.
+
+    :param package: the name of the package.
+    :param attributes: a dict mapping names of lazily-loaded attributes to
+        the submodule defining them, relative to the package.
+
+    """
+
+    def __getattr__(name: str) -> Any:
+        submodule = attributes.get(name)
+        if submodule is None:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            )
+        value = getattr(import_module(f".{submodule}", package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -4,6 +4,8 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from collections.abc import Iterable
+import os
 from pathlib import Path
 from typing import Any
 
@@ -11,14 +13,48 @@ from ..fs import Directory
 
 
 class ParsedDirectory(Directory, metaclass=ABCMeta):
-    """A directory whose file listing is parsed."""
+    """A directory whose file listing is parsed.
 
-    def parse(self) -> dict[str, Any] | None:
-        """Return a dict with files in the directory and their parse result."""
+    If the directory has a parent directory descriptor, it's opened relative
+    to it while parsing, and its content is accessed through its descriptor.
+
+    """
+
+    def parse(
+        self, keys: Iterable[str] | None = None
+    ) -> dict[str, Any] | None:
+        """Return a dict with files in the directory and their parse result.
+
+        :param keys: an optional iterable with names of files to parse. If
+            specified, other files are not included in the result.
+
+        """
         if not self.exists:
             return None
 
-        return {path.name: self._parse(path) for path in self._path.iterdir()}
+        if self._dir_fd is None or self.is_open:
+            return self._parse_names(keys)
+        with self:
+            return self._parse_names(keys)
+
+    def _parse_names(
+        self, keys: Iterable[str] | None
+    ) -> dict[str, Any] | None:
+        names = self.listdir()
+        if keys is not None:
+            keys = frozenset(keys)
+            names = [name for name in names if name in keys]
+        return {name: self._parse(self._path / name) for name in names}
+
+    def _readlink(self, path: Path) -> str:
+        """Return the target of a link in the directory.
+
+        If the directory is open, the link is read relative to its descriptor.
+
+        """
+        if self._fd is None:
+            return os.readlink(path)
+        return os.readlink(path.name, dir_fd=self._fd)
 
     @abstractmethod
     def _parse(self, path: Path):
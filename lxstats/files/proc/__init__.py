@@ -13,77 +13,61 @@ Process-specific stats, like used memory, IO, etc. can be accessed through
   {'rchar': 405786, 'syscr': 415, 'cancelled_write_bytes': 0, 'syscw': 256,
    'write_bytes': 20480, 'read_bytes': 32768, 'wchar': 14790}
 
-"""
-
-from ...fs import Directory
-from ..types import ValueFile
-from .process import (
-    ProcPIDCgroup,
-    ProcPIDCmdline,
-    ProcPIDEnviron,
-    ProcPIDIo,
-    ProcPIDNs,
-    ProcPIDSched,
-    ProcPIDStat,
-    ProcPIDStatm,
-    ProcPIDStatus,
-)
-from .system import (
-    ProcCgroups,
-    ProcDiskstats,
-    ProcLoadavg,
-    ProcMeminfo,
-    ProcStat,
-    ProcUptime,
-    ProcVmstat,
-)
-
-
-class ProcDirectory(Directory):
-    """The :file:`/proc` directory."""
-
-    files = {
-        "cgroups": ProcCgroups,
-        "diskstats": ProcDiskstats,
-        "loadavg": ProcLoadavg,
-        "meminfo": ProcMeminfo,
-        "vmstat": ProcVmstat,
-        "stat": ProcStat,
-        "uptime": ProcUptime,
-        "vmstat": ProcVmstat,
-    }
+Classes are defined in the :mod:`lxstats.files.proc.process` and
+:mod:`lxstats.files.proc.system` submodules, which are only imported when
+classes from them are accessed.
 
+"""
 
-class ProcProcessDirectory(Directory):
-    """A directory for a process under :file:`/proc/[pid]`."""
+from typing import TYPE_CHECKING
 
-    files = {
-        "cgroup": ProcPIDCgroup,
-        "cmdline": ProcPIDCmdline,
-        "comm": ValueFile,
-        "environ": ProcPIDEnviron,
-        "io": ProcPIDIo,
-        "ns": ProcPIDNs,
-        "sched": ProcPIDSched,
-        "stat": ProcPIDStat,
-        "statm": ProcPIDStatm,
-        "status": ProcPIDStatus,
-        "task": Directory,
-        "wchan": ValueFile,
-    }
+from ..._lazy import lazy_attributes
 
+if TYPE_CHECKING:  # pragma: no cover
+    from .process import (  # noqa: F401
+        ProcPIDCgroup,
+        ProcPIDCmdline,
+        ProcPIDEnviron,
+        ProcPIDIo,
+        ProcPIDNs,
+        ProcPIDSched,
+        ProcPIDStat,
+        ProcPIDStatm,
+        ProcPIDStatus,
+        ProcProcessDirectory,
+        ProcTaskDirectory,
+    )
+    from .system import (  # noqa: F401
+        ProcCgroups,
+        ProcDirectory,
+        ProcDiskstats,
+        ProcLoadavg,
+        ProcMeminfo,
+        ProcStat,
+        ProcUptime,
+        ProcVmstat,
+    )
 
-class ProcTaskDirectory(Directory):
-    """A directory for a task under :file:`/proc/[pid]/task/[tid]`."""
+_LAZY_ATTRIBUTES = {
+    "ProcPIDCgroup": "process",
+    "ProcPIDCmdline": "process",
+    "ProcPIDEnviron": "process",
+    "ProcPIDIo": "process",
+    "ProcPIDNs": "process",
+    "ProcPIDSched": "process",
+    "ProcPIDStat": "process",
+    "ProcPIDStatm": "process",
+    "ProcPIDStatus": "process",
+    "ProcProcessDirectory": "process",
+    "ProcTaskDirectory": "process",
+    "ProcCgroups": "system",
+    "ProcDirectory": "system",
+    "ProcDiskstats": "system",
+    "ProcLoadavg": "system",
+    "ProcMeminfo": "system",
+    "ProcStat": "system",
+    "ProcUptime": "system",
+    "ProcVmstat": "system",
+}
 
-    files = {
-        "cgroup": ProcPIDCgroup,
-        "cmdline": ProcPIDCmdline,
-        "comm": ValueFile,
-        "environ": ProcPIDEnviron,
-        "io": ProcPIDIo,
-        "sched": ProcPIDSched,
-        "stat": ProcPIDStat,
-        "statm": ProcPIDStatm,
-        "wchan": ValueFile,
-    }
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
@@ -1,13 +1,14 @@
 """Parsers for per-process files under :file:`/proc/[pid]/`."""
 
-import os
 import re
 
+from ...fs import Directory
 from ..directory import ParsedDirectory
 from ..text import (
     ParsedFile,
     SingleLineFile,
 )
+from ..types import ValueFile
 
 
 class ProcPIDCmdline(SingleLineFile):
@@ -19,6 +20,8 @@ class ProcPIDCmdline(SingleLineFile):
 class ProcPIDStat(SingleLineFile):
     """Parse :file:`/proc/[pid]/stat`, :file:`/proc/[pid]/tasks/[tid]/stat`."""
 
+    binary = True
+
     fields = (
         ("pid", int),
         ("comm", str),
@@ -66,27 +69,37 @@ class ProcPIDStat(SingleLineFile):
         ("cguest_time", int),
     )
 
-    _re = re.compile(r"\((.+)\)")
-
     def separator(self, content):
-        """Custom separator to handle spaces in the process commandline."""
+        """Custom separator to handle spaces in the process command."""
+        return split_stat_bytes(content)
+
+    def _parse_keys(self, content, keys):
+        # The command can contain newlines, so the whole content is split
+        return self._fields_parser(keys)(self._split(content.rstrip(b"\n")))
+
+
+def split_stat_bytes(content):
+    """Split the content of a :file:`/proc/[pid]/stat` file in fields.
 
-        content = content.strip(" ")
-        match = self._re.search(content)
-        if match is None:
-            return content.split()
+    The command (the second field) is enclosed in parentheses and can contain
+    any character, including spaces and parentheses, so it's delimited by the
+    first opening and the last closing parenthesis.
 
-        # Replace with a version without spaces so split works
-        content = self._re.sub("comm", content)
-        split = content.split()
-        # Replace the original comm value
-        split[1] = match.groups()[0]
-        return split
+    This works on undecoded content, and returns a list of :class:`bytes`.
+
+    """
+    head, closing, tail = content.rpartition(b")")
+    pid, opening, comm = head.partition(b"(")
+    if not closing or not opening:
+        return content.split()
+    return [pid.strip(), comm, *tail.split()]
 
 
 class ProcPIDStatm(SingleLineFile):
     """Parse :file:`/proc/[pid]/statm`."""
 
+    binary = True
+
     fields = (
         ("size", int),
         ("resident", int),
@@ -101,12 +114,14 @@ class ProcPIDStatm(SingleLineFile):
 class ProcPIDIo(ParsedFile):
     """Parse :file:`/proc/[pid]/io`."""
 
+    binary = True
+
     def _parse(self, content):
         # Each line is in the form 'name: count'.
         result = {}
         for line in content.splitlines():
-            key, value = line.split(": ", 1)
-            result[key] = int(value)
+            key, value = line.split(b": ", 1)
+            result[key.decode()] = int(value)
         return result
 
 
@@ -116,7 +131,7 @@ class ProcPIDNs(ParsedDirectory):
     _re = re.compile(r".*:\[(.*)\]")
 
     def _parse(self, path):
-        target = os.readlink(str(path))
+        target = self._readlink(path)
         match = self._re.match(target)
         if match:
             return int(match.groups()[0])
@@ -128,8 +143,13 @@ class ProcPIDSched(ParsedFile):
     _re = re.compile(r"^(\S+)\s+:\s+(\S+)$")
 
     def _parse(self, content):
+        return self._parse_keys(content, None)
+
+    def _parse_keys(self, content, keys):
         stats = {}
         for line in content.split("\n"):
+            if keys is not None and line.split(" ", 1)[0] not in keys:
+                continue
             match = self._re.match(line)
             if match:
                 key, value = match.groups()
@@ -173,11 +193,49 @@ class ProcPIDStatus(ParsedFile):
     _re = re.compile(r":\s+")
 
     def _parse(self, content):
-        tokens = [
-            self._re.split(line, maxsplit=1) for line in content.splitlines()
-        ]
-        return {
-            key: int(value[:-3]) * 1024
-            for key, value in tokens
-            if value.endswith(" kB")
-        }
+        return self._parse_keys(content, None)
+
+    def _parse_keys(self, content, keys):
+        result = {}
+        for line in content.splitlines():
+            if keys is not None and line.split(":", 1)[0] not in keys:
+                continue
+            key, value = self._re.split(line, maxsplit=1)
+            if value.endswith(" kB"):
+                result[key] = int(value[:-3]) * 1024
+        return result
+
+
+class ProcProcessDirectory(Directory):
+    """A directory for a process under :file:`/proc/[pid]`."""
+
+    files = {
+        "cgroup": ProcPIDCgroup,
+        "cmdline": ProcPIDCmdline,
+        "comm": ValueFile,
+        "environ": ProcPIDEnviron,
+        "io": ProcPIDIo,
+        "ns": ProcPIDNs,
+        "sched": ProcPIDSched,
+        "stat": ProcPIDStat,
+        "statm": ProcPIDStatm,
+        "status": ProcPIDStatus,
+        "task": Directory,
+        "wchan": ValueFile,
+    }
+
+
+class ProcTaskDirectory(Directory):
+    """A directory for a task under :file:`/proc/[pid]/task/[tid]`."""
+
+    files = {
+        "cgroup": ProcPIDCgroup,
+        "cmdline": ProcPIDCmdline,
+        "comm": ValueFile,
+        "environ": ProcPIDEnviron,
+        "io": ProcPIDIo,
+        "sched": ProcPIDSched,
+        "stat": ProcPIDStat,
+        "statm": ProcPIDStatm,
+        "wchan": ValueFile,
+    }
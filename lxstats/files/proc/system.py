@@ -1,7 +1,6 @@
 """Parsers for :file:`/proc` files containing system information."""
 
-import re
-
+from ...fs import Directory
 from ..text import (
     ParsedFile,
     SingleLineFile,
@@ -58,9 +57,11 @@ class ProcLoadavg(SingleLineFile):
 class ProcVmstat(ParsedFile):
     """Parse :file:`/proc/vmstat`."""
 
+    binary = True
+
     def _parse(self, content):
         items = (line.split() for line in content.splitlines())
-        return {key: int(value) for key, value in items}
+        return {key.decode(): int(value) for key, value in items}
 
 
 class ProcDiskstats(ParsedFile):
@@ -80,11 +81,13 @@ class ProcDiskstats(ParsedFile):
         "io-ms-weighted",
     ]
 
+    binary = True
+
     def _parse(self, content):
         result = {}
         for line in content.splitlines():
             split = line.split()[2:]  # Ignore major/minor fields
-            dev_name, values = split[0], split[1:]
+            dev_name, values = split[0].decode(), split[1:]
             values = [int(value) for value in values]
             result[dev_name] = dict(zip(self.diskstat_fields, values))
         return result
@@ -93,14 +96,25 @@ class ProcDiskstats(ParsedFile):
 class ProcMeminfo(ParsedFile):
     """Parse :file:`/proc/meminfo`."""
 
-    _parse_re = re.compile(r"(?P<name>.+):\s+(?P<value>[0-9]+)")
+    binary = True
 
     def _parse(self, content):
-        return dict(self._parse_line(line) for line in content.splitlines())
+        return self._parse_keys(content, None)
 
-    def _parse_line(self, line):
-        match = self._parse_re.match(line).groupdict()
-        return match["name"], int(match["value"])
+    def _parse_keys(self, content, keys):
+        result = {}
+        for line in content.splitlines():
+            # Lines are in the form 'name:   value [unit]'
+            name, _, value = line.partition(b":")
+            key = name.decode()
+            if keys is None:
+                result[key] = int(value.split()[0])
+            elif key in keys:
+                result[key] = int(value.split()[0])
+                if len(result) == len(keys):
+                    # All requested keys found
+                    break
+        return result
 
 
 class ProcCgroups(ParsedFile):
@@ -118,3 +132,18 @@ class ProcCgroups(ParsedFile):
                 "enabled": enabled == "1",
             }
         return result
+
+
+class ProcDirectory(Directory):
+    """The :file:`/proc` directory."""
+
+    files = {
+        "cgroups": ProcCgroups,
+        "diskstats": ProcDiskstats,
+        "loadavg": ProcLoadavg,
+        "meminfo": ProcMeminfo,
+        "vmstat": ProcVmstat,
+        "stat": ProcStat,
+        "uptime": ProcUptime,
+        "vmstat": ProcVmstat,
+    }
@@ -6,6 +6,7 @@ from abc import (
 )
 from collections.abc import (
     Callable,
+    Iterable,
     Sequence,
 )
 from typing import (
@@ -26,28 +27,69 @@ class ParsedFile(File, metaclass=ABCMeta):
     Subclasses must implement the :func:`_parse` method which is called with
     the content of the file and returns the parsed information.
 
+    Subclasses returning a :class:`dict` can also implement
+    :func:`_parse_keys` to avoid parsing values for keys that are not
+    requested.
+
+    If :attr:`binary` is true, parsers are called with undecoded content.
+
     """
 
-    def parse(self) -> Any:
-        """Read the file and preturn the parsed content."""
+    #: Whether the content is passed to parsers as :class:`bytes`, rather than
+    #: decoded to a :class:`str`.
+    binary = False
+
+    def parse(self, keys: Iterable[str] | None = None) -> Any:
+        """Read the file and preturn the parsed content.
+
+        :param keys: an optional iterable with keys to return, if the file is
+            parsed to a :class:`dict`. If specified, other keys are not
+            included in the result.
+
+        """
         if not self.exists:
             return
 
-        return self._parse(self.read())
+        content = self.read_bytes() if self.binary else self.read()
+        if keys is None:
+            return self._parse(content)
+        return self._parse_keys(content, frozenset(keys))
 
     @abstractmethod
-    def _parse(self, content: str) -> Any:
+    def _parse(self, content: Any) -> Any:
         """Parse the content of the file.
 
+        Content is a :class:`str`, or :class:`bytes` if :attr:`binary` is
+        true.
+
         .. note::
             Subclasses must implement this method.
 
         """
 
+    def _parse_keys(self, content: Any, keys: frozenset[str]) -> Any:
+        """Parse the content of the file, only returning specified keys.
+
+        By default, the whole content is parsed and other keys are dropped
+        from the result. Keys that are not strings (such as hierarchy IDs
+        in :file:`/proc/[pid]/cgroup`) are matched by their string form.
+
+        """
+        parsed = self._parse(content)
+        if not isinstance(parsed, dict):
+            return parsed
+        return {
+            key: value for key, value in parsed.items() if str(key) in keys
+        }
+
+
+Content = Union[str, bytes]
 
 ParseResult = Union[str, list[str], dict[str, Any]]
 
-FieldDefinition = Union[tuple[str, type], tuple[None, None]]
+FieldDefinition = Union[tuple[str, Callable[[Any], Any]], tuple[None, None]]
+
+FieldsParser = Callable[[list[str]], dict[str, Any]]
 
 
 class SingleLineFile(ParsedFile):
@@ -62,15 +104,22 @@ class SingleLineFile(ParsedFile):
     If separator is a callable, it's used to split the field (it's called with
     the line and must return a list of fields).
 
+    If :attr:`binary` is true, the content is split as :class:`bytes`, and
+    only values for string fields are decoded.
+
     Subclasses can define a list of :attr:`fields` and a different
     :attr:`separator`.
 
+    Fields are compiled once per class into a function that converts split
+    values to a dict.
+
     """
 
     #: The separator to use when splitting the content. If set to :data:`None`,
     #: content is not split.  It can also be set to a `callable` that splits
-    #: the content, returning a list of strings.
-    separator: str | Callable[[str], list[str]] | None = " "
+    #: the content, returning a list of strings (or :class:`bytes`, if
+    #: :attr:`binary` is true).
+    separator: str | Callable[[Any], list[Any]] | None = " "
 
     #: If set, it must be a list or tuple, where each element can be
     #:
@@ -80,49 +129,174 @@ class SingleLineFile(ParsedFile):
     #: - :data:`None`: the field is ignored.
     fields: Sequence[str | None | FieldDefinition] | None = None
 
-    def _parse(self, content: str) -> ParseResult | None:
+    # The fields definition and parsers compiled from it, by set of keys
+    _compiled: (
+        tuple[
+            Sequence[str | None | FieldDefinition],
+            dict[tuple[frozenset[str] | None, bool], FieldsParser],
+        ]
+        | None
+    ) = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.fields is not None:
+            cls._compiled = (
+                cls.fields,
+                {
+                    (None, cls.binary): compile_fields(
+                        cls.fields, binary=cls.binary
+                    )
+                },
+            )
+
+    def _parse(self, content: Content) -> ParseResult | None:
+        return self._parse_keys(content, None)
+
+    def _parse_keys(
+        self, content: Content, keys: frozenset[str] | None
+    ) -> ParseResult | None:
         # Take just fhe first line
-        content = content.split("\n")[0]
+        if isinstance(content, bytes):
+            content = content.split(b"\n")[0]
+        else:
+            content = content.split("\n")[0]
         if self.separator is None:
-            return content
+            return _text(content)
 
         splitted = self._split(content)
         if self.fields is None:
-            return splitted
-
-        fields = self._get_fields()
+            return [_text(value) for value in splitted]
 
         # Map fields values to their name converting to the proper type
-        return {
-            key: cast(Callable, field_type)(value)
-            for (key, field_type), value in zip(fields, splitted)
-            if key is not None
-        }
-
-    def _get_fields(self) -> list[FieldDefinition]:
-        fields: list[FieldDefinition] = []
-        for field in cast(
-            list[Union[str, None, FieldDefinition]], self.fields
-        ):
-            if field is None:
-                field = (None, None)
-            elif isinstance(field, str):
-                field = (field, str)
-
-            fields.append(field)
-        return fields
-
-    def _split(self, content: str) -> list[str]:
+        return self._fields_parser(keys)(splitted)
+
+    def _fields_parser(self, keys: frozenset[str] | None) -> FieldsParser:
+        """Return the parser for fields, compiling it if needed."""
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not self.fields:
+            # Fields are different from the class ones
+            compiled = self._compiled = (cast(Sequence, self.fields), {})
+
+        fields, parsers = compiled
+        parser = parsers.get((keys, self.binary))
+        if parser is None:
+            parser = parsers[keys, self.binary] = compile_fields(
+                fields, keys=keys, binary=self.binary
+            )
+        return parser
+
+    def _split(self, content: Content) -> list[Any]:
         if not content:
             return []
 
         if callable(self.separator):
             return self.separator(content)
 
+        if isinstance(content, bytes):
+            separator = cast(str, self.separator).encode()
+            return content.strip(separator).split(separator)
+
         content = content.strip(self.separator)
         return content.split(self.separator)
 
 
+def compile_fields(
+    fields: Sequence[str | None | FieldDefinition],
+    keys: Iterable[str] | None = None,
+    binary: bool = False,
+) -> FieldsParser:
+    """Return a function mapping a list of values to fields.
+
+    The function returns a dict with field names as keys and values
+    converted to the field type. Fields set to :data:`None` are skipped.
+
+    For the common case where there are at least as many values as fields,
+    the function builds the dict with constant indexes and converters.
+
+    :param fields: the fields definition.
+    :param keys: an optional iterable with field names to include. If
+        specified, other fields are skipped, and values after the last
+        included field are ignored.
+    :param binary: whether values are :class:`bytes`. If true, values for
+        string fields are decoded, while other types are converted from
+        :class:`bytes`.
+
+    """
+    definitions = _get_fields(fields)
+    if keys is not None:
+        definitions = _project_fields(definitions, set(keys))
+    if binary:
+        # String values must be decoded
+        definitions = [
+            cast(
+                FieldDefinition,
+                (key, _text if field_type is str else field_type),
+            )
+            for key, field_type in definitions
+        ]
+    namespace: dict[str, Any] = {"definitions": definitions}
+    items = []
+    for index, (key, field_type) in enumerate(definitions):
+        if key is None:
+            continue
+        value = f"values[{index}]"
+        if field_type is not str:
+            converter = f"convert{index}"
+            namespace[converter] = field_type
+            value = f"{converter}({value})"
+        items.append(f"{key!r}: {value}")
+
+    source = f"""\
+def parse(values):
+    if len(values) >= {len(definitions)}:
+        return {{{", ".join(items)}}}
+    return {{
+        key: field_type(value)
+        for (key, field_type), value in zip(definitions, values)
+        if key is not None
+    }}
+"""
+    exec(source, namespace)
+    return cast(FieldsParser, namespace["parse"])
+
+
+def _get_fields(
+    fields: Sequence[str | None | FieldDefinition],
+) -> list[FieldDefinition]:
+    """Return fields as a list of (key, type) tuples."""
+    definitions: list[FieldDefinition] = []
+    for field in fields:
+        if field is None:
+            field = (None, None)
+        elif isinstance(field, str):
+            field = (field, str)
+
+        definitions.append(field)
+    return definitions
+
+
+def _text(value: Content) -> str:
+    """Return a value as :class:`str`, decoding it if needed."""
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    return value
+
+
+def _project_fields(
+    definitions: list[FieldDefinition], keys: set[str]
+) -> list[FieldDefinition]:
+    """Return definitions only including fields for the specified keys."""
+    projected: list[FieldDefinition] = [
+        definition if definition[0] in keys else (None, None)
+        for definition in definitions
+    ]
+    # Values after the last requested field are not needed
+    while projected and projected[-1][0] is None:
+        projected.pop()
+    return projected
+
+
 class SplittedFile(ParsedFile):
     """A file that is parsed by splitting the content in words.
 
@@ -3,22 +3,239 @@
 The :class:`File` and :class:`Directory` classes provide abstractions to access
 filesytem entities.
 
+Files that are read repeatedly (such as those under :file:`/proc`) can keep
+their descriptors open in a :class:`FileDescriptorCache`, so that subsequent
+reads don't need to open them again.
+
+Reads go through a preallocated buffer, which is reused across reads. Content
+can also be read as :class:`bytes` (:meth:`File.read_bytes`) or into a
+caller-provided buffer (:meth:`File.readinto`), avoiding decoding.
+
+A :class:`Directory` can also be opened, in which case files in it are
+accessed relative to its descriptor, rather than by full path::
+
+  with Directory('/proc/self') as directory:
+      directory['stat'].read()
+
 """
 
-from collections.abc import Iterable
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
+from collections.abc import (
+    Callable,
+    Iterable,
+)
 import os
 import pathlib
+import resource
+import threading
 from typing import (
     Any,
     ClassVar,
+    TypeVar,
 )
 
+# Size of chunks read via pread()
+_READ_SIZE = 65536
+
+# Maximum number of descriptors kept open by default, if the limit for open
+# files is higher or unlimited
+_MAX_FDS = 1 << 20
+
+_T = TypeVar("_T")
+
+# Per-thread buffers for reads
+_buffers = threading.local()
+
+
+class FileDescriptorCache:
+    """A LRU cache of open file descriptors.
+
+    Files are kept open and their content is reread from the beginning with
+    :func:`os.pread`, which avoids opening and closing them each time.
+
+    The cache can be shared between threads, although reads through it are
+    serialized.
+
+    To avoid closing and reopening descriptors at each collection, the cache
+    should be able to hold all files read, that is the number of files read
+    for each process times the number of processes (and tasks). The limit for
+    open files (:data:`resource.RLIMIT_NOFILE`) might need to be raised
+    accordingly, e.g. with ``ulimit -n``.
+
+    :param max_fds: the maximum number of file descriptors kept open. When the
+        limit is reached, least recently used ones are closed. By default, half
+        of the soft limit for open files for the current process.
+
+    """
+
+    def __init__(self, max_fds: int | None = None):
+        if max_fds is None:
+            max_fds = _default_max_fds()
+        self.max_fds = max_fds
+        self._lock = threading.Lock()
+        # Reads are serialized, so the buffer can be shared
+        self._buffer = bytearray(_READ_SIZE)
+        self._fds: OrderedDict[pathlib.Path, int] = OrderedDict()
+        # Cached files and directories containing them, by parent directory
+        self._children: defaultdict[pathlib.Path, set[pathlib.Path]] = (
+            defaultdict(set)
+        )
+
+    def __len__(self) -> int:
+        return len(self._fds)
+
+    def __contains__(self, path: pathlib.Path) -> bool:
+        return path in self._fds
+
+    def read(self, path: pathlib.Path) -> bytes:
+        """Return the content of the file at the specified path.
+
+        If reading fails (e.g. because the process for a file under
+        :file:`/proc/[pid]` has exited), the file descriptor is evicted.
+
+        """
+        return self._read(path, lambda fd: _pread_all(fd, self._buffer))
+
+    def readinto(self, path: pathlib.Path, buffer: bytearray) -> int:
+        """Read the content of the file at the specified path into a buffer.
+
+        Content exceeding the size of the buffer is not read.
+
+        :return: the number of bytes read.
+
+        """
+        return self._read(path, lambda fd: _preadinto(fd, buffer))
+
+    def _read(self, path: pathlib.Path, read: Callable[[int], _T]) -> _T:
+        with self._lock:
+            fd = self._get_fd(path)
+            try:
+                return read(fd)
+            except OSError:
+                self._close(path)
+                raise
+
+    def evict(self, path: pathlib.Path):
+        """Close the descriptor for a path and for all files under it."""
+        with self._lock:
+            paths = []
+            pending = [path]
+            while pending:
+                path = pending.pop()
+                if path in self._fds:
+                    paths.append(path)
+                pending.extend(self._children.get(path, ()))
+            for path in paths:
+                self._close(path)
+
+    def clear(self):
+        """Close all cached file descriptors."""
+        with self._lock:
+            for path in list(self._fds):
+                self._close(path)
+
+    def _get_fd(self, path: pathlib.Path) -> int:
+        fd = self._fds.get(path)
+        if fd is not None:
+            self._fds.move_to_end(path)
+            return fd
+
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self._fds[path] = fd
+        self._add_child(path)
+        while len(self._fds) > self.max_fds:
+            self._close(next(iter(self._fds)))
+        return fd
+
+    def _close(self, path: pathlib.Path):
+        os.close(self._fds.pop(path))
+        self._remove_child(path)
+
+    def _add_child(self, path: pathlib.Path):
+        """Track a path in its parent, and parents up to a tracked one."""
+        while (parent := path.parent) != path:
+            tracked = parent in self._children
+            self._children[parent].add(path)
+            if tracked:
+                break
+            path = parent
+
+    def _remove_child(self, path: pathlib.Path):
+        """Untrack a path, and parents left with no tracked children."""
+        while (parent := path.parent) != path:
+            children = self._children[parent]
+            children.discard(path)
+            if children:
+                break
+            del self._children[parent]
+            path = parent
+
+
+def _default_max_fds() -> int:
+    """Return the default maximum number of descriptors kept in a cache."""
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        soft_limit = _MAX_FDS
+    return min(soft_limit, _MAX_FDS) // 2
+
+
+def _pread_all(fd: int, buffer: bytearray) -> bytes:
+    """Read the whole content of a file descriptor from the beginning.
+
+    Content is read in chunks through the buffer.
+
+    """
+    view = memoryview(buffer)
+    chunks = []
+    offset = 0
+    while size := os.preadv(fd, [view], offset):
+        chunks.append(view[:size].tobytes())
+        offset += size
+    return b"".join(chunks)
+
+
+def _preadinto(fd: int, buffer: bytearray) -> int:
+    """Read a file descriptor from the beginning, until the buffer is full."""
+    view = memoryview(buffer)
+    offset = 0
+    while offset < len(view) and (
+        size := os.preadv(fd, [view[offset:]], offset)
+    ):
+        offset += size
+    return offset
+
+
+def _thread_buffer() -> bytearray:
+    """Return the read buffer for the current thread."""
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _buffers.buffer = bytearray(_READ_SIZE)
+    return buffer
+
 
 class Path:
-    """A filesystem path such as a file or directory."""
+    """A filesystem path such as a file or directory.
 
-    def __init__(self, path: str | pathlib.PurePath):
+    :param path: the filesystem path.
+    :param fd_cache: an optional :class:`FileDescriptorCache` to keep file
+        descriptors open across reads.
+    :param dir_fd: an optional descriptor for the parent directory. If set,
+        the path is accessed by name relative to it.
+
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.PurePath,
+        fd_cache: FileDescriptorCache | None = None,
+        dir_fd: int | None = None,
+    ):
         self._path = pathlib.PosixPath(path).absolute()
+        self._fd_cache = fd_cache
+        self._dir_fd = dir_fd
 
     @property
     def name(self) -> str:
@@ -27,33 +244,101 @@ class Path:
     @property
     def exists(self) -> bool:
         """Whether the path exists."""
-        return self._path.exists()
+        if self._dir_fd is None:
+            return self._path.exists()
+
+        try:
+            os.stat(self.name, dir_fd=self._dir_fd)
+        except OSError:
+            return False
+        return True
 
     @property
     def readable(self) -> bool:
         """Whether the path is readable."""
-        return os.access(str(self._path), os.R_OK)
+        return self._access(os.R_OK)
 
     @property
     def writable(self) -> bool:
         """Whether the path is writable."""
-        return os.access(str(self._path), os.W_OK)
+        return self._access(os.W_OK)
+
+    def _access(self, mode: int) -> bool:
+        if self._dir_fd is None:
+            return os.access(str(self._path), mode)
+        return os.access(self.name, mode, dir_fd=self._dir_fd)
 
 
 class File(Path):
-    """Wrapper to reaad/write a file."""
+    """Wrapper to reaad/write a file.
+
+    If a :class:`FileDescriptorCache` is used, files that have a cached
+    descriptor are assumed to exist. The cache is not used if the file is
+    accessed relative to a directory descriptor.
+
+    """
+
+    @property
+    def exists(self) -> bool:
+        """Whether the path exists."""
+        if self._cached:
+            return True
+        return super().exists
 
     def read(self) -> str:
         """Return file content."""
-        return self._path.read_text()
+        return self.read_bytes().decode()
+
+    def read_bytes(self) -> bytes:
+        """Return file content as :class:`bytes`."""
+        if self._dir_fd is None and self._fd_cache is not None:
+            return self._fd_cache.read(self._path)
+        return self._read(lambda fd: _pread_all(fd, _thread_buffer()))
+
+    def readinto(self, buffer: bytearray) -> int:
+        """Read file content into a buffer.
+
+        Content exceeding the size of the buffer is not read.
+
+        :return: the number of bytes read.
+
+        """
+        if self._dir_fd is None and self._fd_cache is not None:
+            return self._fd_cache.readinto(self._path, buffer)
+        return self._read(lambda fd: _preadinto(fd, buffer))
 
     def write(self, content: str):
         """Write content to file, replacing the content if it exists."""
         self._path.write_text(content)
 
+    def _read(self, read: Callable[[int], _T]) -> _T:
+        """Open the file and call read() with its descriptor."""
+        path = self._path if self._dir_fd is None else self.name
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC, dir_fd=self._dir_fd)
+        try:
+            return read(fd)
+        finally:
+            os.close(fd)
+
+    @property
+    def _cached(self) -> bool:
+        return (
+            self._dir_fd is None
+            and self._fd_cache is not None
+            and self._path in self._fd_cache
+        )
+
 
 class Directory(Path):
-    """Access  files in a directory with a :class:`dict`-like interface."""
+    """Access  files in a directory with a :class:`dict`-like interface.
+
+    The directory can be opened with :meth:`open` (or used as a context
+    manager), in which case files in it are accessed relative to the
+    directory descriptor until it's closed. This avoids resolving the full
+    path for each file, and guarantees that all files come from the same
+    directory even if its path is replaced.
+
+    """
 
     #: Map names of files under the directory to their corresponding
     #: :class:`File` type.
@@ -61,8 +346,44 @@ class Directory(Path):
     #: Subclasses should define this.
     files: ClassVar[dict[str, type[Path]]] = {}
 
+    _fd: int | None = None
+
+    def __enter__(self) -> "Directory":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the directory is open."""
+        return self._fd is not None
+
+    def open(self):
+        """Open the directory, accessing files relative to its descriptor.
+
+        If the directory has a parent directory descriptor, it's opened
+        relative to it.
+
+        """
+        path = self._path if self._dir_fd is None else self.name
+        self._fd = os.open(
+            path,
+            os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC,
+            dir_fd=self._dir_fd,
+        )
+
+    def close(self):
+        """Close the directory descriptor, if open."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
     def listdir(self) -> list[str]:
         """Return all existing names in a directory."""
+        if self._fd is not None:
+            return os.listdir(self._fd)
         return [path.name for path in self._path.iterdir()]
 
     def join(self, *paths: str | pathlib.PurePath):
@@ -75,13 +396,19 @@ class Directory(Path):
         Only existing files that match names listed in `files` are returned.
 
         """
+        if self._fd is not None:
+            names = set(self.listdir())
+            return sorted(name for name in self.files if name in names)
+
         return sorted(
             name for name in self.files if (self._path / name).exists()
         )
 
     def __getitem__(self, name: str) -> Any:
         """Return the :class:`File` instance for a name."""
-        item = self.files[name](self._path / name)
+        item = self.files[name](
+            self._path / name, fd_cache=self._fd_cache, dir_fd=self._fd
+        )
         if not item.exists:
             raise KeyError(name)
         return item
@@ -1,21 +1,54 @@
-"""Access information about running processes."""
-
-from .collection import (
-    Collection,
-    Collector,
-)
-from .filter import CommandLineFilter
-from .formatter import Formatter
-from .process import (
-    Process,
-    Task,
-)
+"""Access information about running processes.
+
+Classes are imported from submodules when they're first accessed, so that
+importing the package (or a single submodule) doesn't import all of them.
+
+"""
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_attributes
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .collection import (
+        AsyncCollector,
+        Collection,
+        Collector,
+        IncrementalCollector,
+        ParallelCollector,
+        ShardedCollector,
+    )
+    from .filter import CommandLineFilter
+    from .formatter import Formatter
+    from .process import (
+        Process,
+        Task,
+    )
 
 __all__ = [
     "Collector",
+    "AsyncCollector",
+    "IncrementalCollector",
+    "ParallelCollector",
+    "ShardedCollector",
     "Collection",
     "Process",
     "Task",
     "Formatter",
     "CommandLineFilter",
 ]
+
+_LAZY_ATTRIBUTES = {
+    "AsyncCollector": "collection",
+    "Collection": "collection",
+    "Collector": "collection",
+    "IncrementalCollector": "collection",
+    "ParallelCollector": "collection",
+    "ShardedCollector": "collection",
+    "CommandLineFilter": "filter",
+    "Formatter": "formatter",
+    "Process": "process",
+    "Task": "process",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
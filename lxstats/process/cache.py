@@ -0,0 +1,279 @@
+"""Cache for process files that don't change while the process is running.
+
+Files such as ``cmdline``, ``environ``, ``cgroup`` and ``ns`` usually don't
+change during the lifetime of a process. A :class:`StaticFilesCache` keeps
+their parsed content, so that they're read only once for each process::
+
+    cache = StaticFilesCache(ttl={'cgroup': 60})
+    collector = IncrementalCollector(static_cache=cache)
+
+Entries are keyed by PID and process start time, so that a different process
+reusing the same PID is detected.
+
+A :class:`DiskCache` saves content of a :class:`StaticFilesCache`, along with
+the last sample for each process, to a file, so that they can be reused
+across separate runs::
+
+    disk_cache = DiskCache('/tmp/procs.cache')
+    samples = disk_cache.load(cache)
+    collector.load_samples(samples)
+    ...
+    disk_cache.save(cache, collector.samples())
+
+"""
+
+from datetime import datetime
+import io
+import os
+from pathlib import Path
+import pickle
+import time
+
+#: Names of files that are cached by default.
+STATIC_FILES = frozenset(("cgroup", "cmdline", "environ", "ns"))
+
+
+class StaticFilesCache:
+    """Cache parsed content of static files for processes.
+
+    :param files: an optional iterable with names of files to cache. By
+        default, :data:`STATIC_FILES` are cached.
+    :param dict ttl: an optional dict mapping names of files that can change
+        (e.g. ``cgroup``, if the process is migrated) to the number of
+        seconds their content is cached for. Other files are cached until the
+        process exits.
+
+    """
+
+    _clock = time.monotonic  # For testing
+
+    def __init__(self, files=None, ttl=None):
+        self.files = STATIC_FILES if files is None else frozenset(files)
+        self.ttl = dict(ttl or {})
+        # Map PIDs to the process start time and cached content by file name
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, pid):
+        return pid in self._entries
+
+    def get(self, pid, starttime, name, default=None):
+        """Return the cached content for a file, or the default.
+
+        :param int pid: the process PID.
+        :param int starttime: the process start time, as reported in
+            ``stat.starttime``.
+        :param str name: the file name.
+
+        """
+        entry = self._entries.get(pid)
+        if entry is None or entry[0] != starttime:
+            return default
+        cached = entry[1].get(name)
+        if cached is None:
+            return default
+        expiry, content = cached
+        if expiry is not None and self._clock() >= expiry:
+            del entry[1][name]
+            return default
+        return content
+
+    def set(self, pid, starttime, name, content):
+        """Cache content for a file.
+
+        Content for a process with the same PID but a different start time is
+        dropped.
+
+        """
+        entry = self._entries.get(pid)
+        if entry is None or entry[0] != starttime:
+            entry = self._entries[pid] = (starttime, {})
+        ttl = self.ttl.get(name)
+        expiry = None if ttl is None else self._clock() + ttl
+        entry[1][name] = (expiry, content)
+
+    def evict(self, pid):
+        """Drop cached content for a process."""
+        self._entries.pop(pid, None)
+
+    def clear(self):
+        """Drop all cached content."""
+        self._entries.clear()
+
+    def entries(self, limit=None):
+        """Return cached entries, which can be loaded with :meth:`load`.
+
+        :param int limit: the maximum number of processes to return entries
+            for. Entries for the lowest PIDs are returned.
+        :return: a dict mapping PIDs to a tuple with the process start time
+            and a dict mapping file names to a tuple with the expiry time (or
+            None) and the cached content.
+
+        """
+        pids = sorted(self._entries)[:limit]
+        return {pid: self._entries[pid] for pid in pids}
+
+    def load(self, entries):
+        """Load entries, as returned by :meth:`entries`."""
+        self._entries.update(entries)
+
+
+# Version of the format for files written by DiskCache
+_DISK_CACHE_VERSION = 1
+
+# File reporting the ID of the current boot
+_BOOT_ID_FILE = Path("/proc/sys/kernel/random/boot_id")
+
+
+class DiskCache:
+    """Save static files content and last samples for processes to a file.
+
+    Data is written with :mod:`pickle` to a temporary file, which atomically
+    replaces the cache file. Concurrent runs can safely use the same file,
+    in which case the last one writing to it wins. Only plain data types are
+    loaded from the file, and invalid content is ignored.
+
+    Since start times and monotonic times are relative to the system boot,
+    cached data is only used if it was saved during the same boot.
+
+    :param path: the path of the cache file.
+    :param int max_processes: the maximum number of processes data is saved
+        for.
+
+    """
+
+    _boot_id_file = _BOOT_ID_FILE  # For testing
+
+    def __init__(self, path, max_processes=65536):
+        self.path = Path(path)
+        self.max_processes = max_processes
+
+    def load(self, static_cache):
+        """Load cached data from the file.
+
+        Cached content for static files is loaded in the static cache.
+
+        :param StaticFilesCache static_cache: the cache to load static files
+            content into.
+        :return: a dict with last samples for processes, in the format
+            accepted by
+            :meth:`lxstats.process.collection.IncrementalCollector.load_samples`.
+
+        """
+        try:
+            data = _load_pickle(self.path.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return {}
+
+        if not _valid_data(data, self._boot_id()):
+            return {}
+        static_cache.load(data["static"])
+        return data["samples"]
+
+    def save(self, static_cache, samples):
+        """Save data to the file.
+
+        :param StaticFilesCache static_cache: the cache with static files
+            content to save.
+        :param dict samples: last samples for processes, as returned by
+            :meth:`lxstats.process.collection.IncrementalCollector.samples`.
+
+        """
+        pids = sorted(samples)[: self.max_processes]
+        data = {
+            "version": _DISK_CACHE_VERSION,
+            "boot_id": self._boot_id(),
+            "static": static_cache.entries(limit=self.max_processes),
+            "samples": {pid: samples[pid] for pid in pids},
+        }
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Imported here since it's slow to import, and only needed for saving
+        import tempfile
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix=f".{self.path.name}."
+        )
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _boot_id(self):
+        try:
+            return self._boot_id_file.read_text().strip()
+        except OSError:
+            return None
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler only allowing plain data types."""
+
+    _allowed = frozenset((("datetime", "datetime"),))
+
+    def find_class(self, module, name):
+        if (module, name) not in self._allowed:
+            raise pickle.UnpicklingError(f"{module}.{name} not allowed")
+        return super().find_class(module, name)
+
+
+def _load_pickle(content):
+    """Load pickled content only containing plain data types."""
+    return _Unpickler(io.BytesIO(content)).load()
+
+
+def _valid_data(data, boot_id):
+    """Return whether data loaded from the cache file is valid and current."""
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != _DISK_CACHE_VERSION
+        or data.get("boot_id") != boot_id
+    ):
+        return False
+    static, samples = data.get("static"), data.get("samples")
+    return (
+        isinstance(static, dict)
+        and isinstance(samples, dict)
+        and all(
+            _valid_static_entry(pid, entry) for pid, entry in static.items()
+        )
+        and all(_valid_sample(pid, sample) for pid, sample in samples.items())
+    )
+
+
+def _valid_static_entry(pid, entry):
+    """Return whether a static files cache entry is valid."""
+    if not (isinstance(pid, int) and _is_tuple(entry, 2)):
+        return False
+    starttime, files = entry
+    return (
+        isinstance(starttime, int)
+        and isinstance(files, dict)
+        and all(
+            isinstance(name, str)
+            and _is_tuple(cached, 2)
+            and (cached[0] is None or isinstance(cached[0], (int, float)))
+            for name, cached in files.items()
+        )
+    )
+
+
+def _valid_sample(pid, sample):
+    """Return whether a process sample is valid."""
+    if not (isinstance(pid, int) and _is_tuple(sample, 3)):
+        return False
+    timestamp, monotonic, stats = sample
+    return (
+        isinstance(timestamp, datetime)
+        and (monotonic is None or isinstance(monotonic, (int, float)))
+        and isinstance(stats, dict)
+        and all(isinstance(stat, str) for stat in stats)
+    )
+
+
+def _is_tuple(value, length):
+    return isinstance(value, tuple) and len(value) == length
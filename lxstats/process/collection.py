@@ -1,10 +1,23 @@
 """
 Handle collection of processes, allowing filtering and sorting by attribute
 values.
+
+Modules for concurrent collection (:mod:`asyncio` and
+:mod:`concurrent.futures`) are only imported by collectors using them, since
+they're slow to import.
 """
 
+from contextlib import aclosing
+import heapq
+from itertools import (
+    islice,
+    repeat,
+)
+from math import ceil
+import os
 from pathlib import Path
 
+from .filter import AllFilter
 from .process import Process
 
 
@@ -14,58 +27,529 @@ class Collector:
     An iterable with PIDs can be passed, otherwise all PIDs found scanning
     the ``/proc`` directory are returned.
 
+    An iterable with names of stats can also be passed, in which case only
+    files needed for those stats are read for each process.
+
+    If a :class:`lxstats.fs.FileDescriptorCache` is passed, process files are
+    kept open across collections. Descriptors for processes that are no
+    longer found are evicted from the cache.
+
+    If ``use_dir_fd`` is true, files for each process are read relative to
+    its open ``/proc/[pid]`` directory.
+
+    If ``compact`` is true, processes store stats in the compact form (see
+    :mod:`lxstats.process.stats`).
+
+    If a :class:`lxstats.process.cache.StaticFilesCache` is passed as
+    ``static_cache``, files that don't change for a process are only read
+    once. Cached content for processes that are no longer found is evicted.
+
+    If ``lazy`` is true, processes are returned without reading their files,
+    which are read when stats are accessed (see :mod:`lxstats.process.process`
+    for details). This is cheaper when only a few stats are used for each
+    process, but those stats are not read at the same time.
+
+    Collection methods accept an optional ``prefilter``, a callable with a
+    ``stats`` attribute listing the stats it needs. Those stats are collected
+    first, and the remaining ones only for processes matching the filter.
+
     """
 
-    def __init__(self, proc="/proc", pids=None):
+    def __init__(
+        self,
+        proc="/proc",
+        pids=None,
+        stats=None,
+        fd_cache=None,
+        use_dir_fd=False,
+        compact=False,
+        lazy=False,
+        static_cache=None,
+    ):
         self._proc = Path(proc).absolute()
         self._pids = sorted(pids or ())
+        self._stats = None if stats is None else frozenset(stats)
+        self._fd_cache = fd_cache
+        self._use_dir_fd = use_dir_fd
+        self._compact = compact
+        self._lazy = lazy
+        self._static_cache = static_cache
+        self._seen_dirs = set()
 
-    def collect(self):
+    def collect(self, prefilter=None):
         """Return an iterator yielding Process objects."""
+        seen_dirs = set()
+        for proc_dir in self._proc_dirs():
+            process = self._collect_process(proc_dir, prefilter)
+            if process is not None:
+                seen_dirs.add(proc_dir)
+                yield process
+        self._update_seen_dirs(seen_dirs)
+
+    def _proc_dirs(self):
+        """Return an iterable with ``/proc`` directories for processes."""
         if self._pids:
-            proc_dirs = (self._proc / str(pid) for pid in self._pids)
+            return (self._proc / str(pid) for pid in self._pids)
+        return self._proc.glob("[0-9]*")
+
+    def _collect_process(self, proc_dir, prefilter=None):
+        """Return a Process with collected stats.
+
+        None is returned if the process is not found or doesn't match the
+        prefilter.
+
+        """
+        process = self._new_process(proc_dir)
+        if not self._collect_stats(process, prefilter):
+            return None
+        if not process.exists:
+            # Don't return non-existing processes. Check this after trying
+            # collecting stats, since doing the opposite there's a chance the
+            # process might go away bewteen the check and the data
+            # collection.
+            return None
+        return process
+
+    def _new_process(self, proc_dir):
+        """Return a Process for a ``/proc`` directory."""
+        return Process(
+            int(proc_dir.name),
+            proc_dir,
+            fd_cache=self._fd_cache,
+            use_dir_fd=self._use_dir_fd,
+            compact=self._compact,
+            lazy=self._lazy,
+            static_cache=self._static_cache,
+        )
+
+    def _collect_stats(self, process, prefilter):
+        """Collect stats for a process.
+
+        If a prefilter is passed, stats it needs are collected first, and
+        others only if the process matches it.
+
+        Return whether the process matches the prefilter.
+
+        """
+        if prefilter is None:
+            process.collect_stats(stats=self._stats)
+            return True
+
+        process.collect_stats(stats=prefilter.stats)
+        if not prefilter(process):
+            return False
+        process.update_stats(stats=self._stats)
+        return True
+
+    def _update_seen_dirs(self, seen_dirs):
+        """Track found processes, evicting files for exited ones."""
+        for proc_dir in self._seen_dirs - seen_dirs:
+            if self._fd_cache is not None:
+                self._fd_cache.evict(proc_dir)
+            if self._static_cache is not None:
+                self._static_cache.evict(int(proc_dir.name))
+        self._seen_dirs = seen_dirs
+
+
+class IncrementalCollector(Collector):
+    """Process collector which keeps processes across collections.
+
+    Each collection compares found PIDs with those from the previous one.
+    :class:`Process` objects are only created for new processes, and reused
+    for existing ones, while exited processes are dropped. Since processes
+    are reused, rates based on the previous sample are available for them.
+
+    After each collection, the :attr:`started` and :attr:`exited` sets
+    contain PIDs for processes that were started and exited since the
+    previous one.
+
+    It accepts the same parameters as :class:`Collector`.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._processes = {}
+        self.started = set()
+        self.exited = set()
+
+    def collect(self, prefilter=None):
+        """Return an iterator yielding Process objects."""
+        for process in self._update_processes():
+            matched = self._collect_stats(process, prefilter)
+            if self._collected(process, matched):
+                yield process
+
+    def samples(self):
+        """Return the last sample for each process.
+
+        :return: a dict mapping PIDs to a tuple with timestamp, monotonic time
+            and stats for the process, which can be passed to
+            :meth:`load_samples`.
+
+        """
+        return {
+            pid: (process.timestamp, process.monotonic, process.stats())
+            for pid, process in self._processes.items()
+            if process.timestamp is not None
+        }
+
+    def load_samples(self, samples):
+        """Load samples for processes, such as from a previous run.
+
+        Loaded samples are used as the previous sample for rates at the next
+        collection.
+
+        :param dict samples: a dict in the format returned by
+            :meth:`samples`.
+
+        """
+        for pid, (timestamp, monotonic, stats) in samples.items():
+            process = self._new_process(self._proc / str(pid))
+            process.load_stats(stats, timestamp, monotonic=monotonic)
+            self._processes[pid] = process
+
+    def _update_processes(self):
+        """Update processes for a new collection.
+
+        Exited processes are dropped, and new ones created. Return a list of
+        processes to collect, in PID order.
+
+        """
+        pids = self._pids or sorted(
+            int(name) for name in os.listdir(self._proc) if name.isdigit()
+        )
+        previous_pids = set(self._processes)
+        self.started = set(pids) - previous_pids
+        self.exited = previous_pids - set(pids)
+        for pid in self.exited:
+            self._drop(pid)
+
+        processes = []
+        for pid in pids:
+            process = self._processes.get(pid)
+            if process is None:
+                process = self._new_process(self._proc / str(pid))
+                self._processes[pid] = process
+            processes.append(process)
+        return processes
+
+    def _collected(self, process, matched):
+        """Return whether a collected process should be returned.
+
+        Processes that exited before or during collection are dropped.
+
+        """
+        if process.exists:
+            return matched
+        pid = process.pid
+        if pid in self.started:
+            self.started.remove(pid)
+        else:
+            self.exited.add(pid)
+        self._drop(pid)
+        return False
+
+    def _drop(self, pid):
+        """Drop an exited process."""
+        del self._processes[pid]
+        if self._fd_cache is not None:
+            self._fd_cache.evict(self._proc / str(pid))
+        if self._static_cache is not None:
+            self._static_cache.evict(pid)
+
+
+class ParallelCollector(IncrementalCollector):
+    """Process collector which collects stats using a pool of threads.
+
+    Like with :class:`IncrementalCollector`, processes are kept across
+    collections, so rates are available for them. Only collection of stats
+    for each process happens in worker threads.
+
+    It accepts the same parameters as :class:`Collector`, and the following:
+
+    :param int workers: the number of worker threads. If not specified, the
+        :class:`concurrent.futures.ThreadPoolExecutor` default is used.
+    :param bool ordered: whether to yield processes in the same order they
+        are listed (PID order). If false, processes are yielded as soon as
+        their stats are collected.
+    :param int max_pending: the maximum number of processes being collected
+        at any time. It defaults to four times the number of workers.
+
+    """
+
+    def __init__(
+        self, *args, workers=None, ordered=True, max_pending=None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        # Same default as ThreadPoolExecutor
+        self._workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self._ordered = ordered
+        self._max_pending = max_pending or self._workers * 4
+
+    def collect(self, prefilter=None):
+        """Return an iterator yielding Process objects."""
+        # Map futures to the process they're collecting, in submission order.
+        pending = {}
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=self._workers)
+        try:
+            for process in self._update_processes():
+                future = executor.submit(
+                    self._collect_stats, process, prefilter
+                )
+                pending[future] = process
+                if len(pending) >= self._max_pending:
+                    yield from self._collect_pending(pending)
+
+            while pending:
+                yield from self._collect_pending(pending)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _collect_pending(self, pending):
+        """Yield processes from completed pending futures.
+
+        If processes are ordered, wait for the first submitted one, otherwise
+        for any of them.
+
+        """
+        if self._ordered:
+            done = [next(iter(pending))]
         else:
-            proc_dirs = self._proc.glob("[0-9]*")
-
-        for proc_dir in proc_dirs:
-            process = Process(int(proc_dir.name), proc_dir)
-            process.collect_stats()
-            if process.exists:
-                # Don't return non-existing processes. Check this after trying
-                # collecting stats, since doing the opposite there's a chance
-                # the process might go away bewteen the check and the
-                # data collection.
+            from concurrent.futures import (
+                FIRST_COMPLETED,
+                wait,
+            )
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            process = pending.pop(future)
+            if self._collected(process, future.result()):
                 yield process
 
 
+class ShardedCollector(Collector):
+    """Process collector which collects stats in a pool of worker processes.
+
+    PIDs are split in shards which are collected by separate processes, so
+    that parsing of files is not serialized by the GIL. Workers return
+    compact stats for each shard, which are loaded into :class:`Process`
+    objects in the calling process.
+
+    It accepts the same parameters as :class:`Collector` (except for
+    ``fd_cache``), and the following:
+
+    :param int workers: the number of worker processes. If not specified,
+        the :class:`concurrent.futures.ProcessPoolExecutor` default is used.
+    :param int shard_size: the number of PIDs in each shard. If not
+        specified, PIDs are split in four shards per worker.
+
+    """
+
+    def __init__(
+        self,
+        proc="/proc",
+        pids=None,
+        stats=None,
+        use_dir_fd=False,
+        compact=False,
+        workers=None,
+        shard_size=None,
+    ):
+        super().__init__(
+            proc=proc,
+            pids=pids,
+            stats=stats,
+            use_dir_fd=use_dir_fd,
+            compact=compact,
+        )
+        # Same default as ProcessPoolExecutor
+        self._workers = workers or os.cpu_count() or 1
+        self._shard_size = shard_size
+
+    def collect(self, prefilter=None):
+        """Return an iterator yielding Process objects.
+
+        The prefilter, if passed, must be picklable.
+
+        """
+        pids = self._pids or sorted(
+            int(proc_dir.name) for proc_dir in self._proc_dirs()
+        )
+        if not pids:
+            return
+
+        shard_size = self._shard_size or ceil(len(pids) / (self._workers * 4))
+        shards = [
+            pids[index : index + shard_size]
+            for index in range(0, len(pids), shard_size)
+        ]
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            results = executor.map(
+                _collect_shard,
+                repeat(self._proc),
+                shards,
+                repeat(self._stats),
+                repeat(self._use_dir_fd),
+                repeat(prefilter),
+            )
+            for keys, rows in results:
+                for pid, timestamp, key_ids, values in rows:
+                    process = Process(
+                        pid, self._proc / str(pid), compact=self._compact
+                    )
+                    stats = zip((keys[key_id] for key_id in key_ids), values)
+                    process.load_stats(dict(stats), timestamp)
+                    yield process
+
+
+def _collect_shard(proc, pids, stats, use_dir_fd, prefilter=None):
+    """Collect stats for a shard of PIDs.
+
+    Return a tuple with a list of stat names and a list of rows, one per
+    process. Each row contains the PID, the timestamp, indexes of stat names
+    and their values.
+
+    """
+    keys = {}
+    rows = []
+    collector = Collector(
+        proc=proc, pids=pids, stats=stats, use_dir_fd=use_dir_fd
+    )
+    for process in collector.collect(prefilter=prefilter):
+        process_stats = process.stats()
+        key_ids = tuple(
+            keys.setdefault(key, len(keys)) for key in process_stats
+        )
+        rows.append(
+            (
+                process.pid,
+                process.timestamp,
+                key_ids,
+                tuple(process_stats.values()),
+            )
+        )
+    return list(keys), rows
+
+
+class AsyncCollector(Collector):
+    """Process collector for use with :mod:`asyncio`.
+
+    Processes are collected in an executor, so that the event loop is not
+    blocked, and yielded as they become ready.
+
+    It accepts the same parameters as :class:`Collector`, and the following:
+
+    :param int concurrency: the maximum number of processes being collected
+        at any time. It defaults to the default executor number of workers.
+    :param executor: the :class:`concurrent.futures.Executor` to collect
+        processes in. If not specified, the loop default one is used.
+
+    """
+
+    def __init__(self, *args, concurrency=None, executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Same default as ThreadPoolExecutor
+        self._concurrency = concurrency or min(32, (os.cpu_count() or 1) + 4)
+        self._executor = executor
+
+    async def acollect(self, prefilter=None):
+        """Asynchronously yield Process objects."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        proc_dirs = await loop.run_in_executor(
+            self._executor, list, self._proc_dirs()
+        )
+        # Map futures to the directory of the process they're collecting.
+        pending = {}
+        seen_dirs = set()
+        try:
+            for proc_dir in proc_dirs:
+                future = loop.run_in_executor(
+                    self._executor, self._collect_process, proc_dir, prefilter
+                )
+                pending[future] = proc_dir
+                if len(pending) >= self._concurrency:
+                    for process in await self._collect_pending(
+                        pending, seen_dirs
+                    ):
+                        yield process
+
+            while pending:
+                for process in await self._collect_pending(pending, seen_dirs):
+                    yield process
+        finally:
+            for future in pending:
+                future.cancel()
+        self._update_seen_dirs(seen_dirs)
+
+    async def _collect_pending(self, pending, seen_dirs):
+        """Return processes from pending futures, once any completes."""
+        import asyncio
+
+        done, _ = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED
+        )
+        processes = []
+        for future in done:
+            proc_dir = pending.pop(future)
+            process = future.result()
+            if process is not None:
+                seen_dirs.add(proc_dir)
+                processes.append(process)
+        return processes
+
+
 class Collection:
     """A Process collection.
 
     :param Collector collector: the process collector. If not provided, a
         default one will be created.
     :param str sort_by: The field to sort processes by. It can be prefixed
-        with ``-`` to invert sorting (e.g. ``pid`` or ``-pid``).
+        with ``-`` to invert sorting (e.g. ``pid`` or ``-pid``). Processes
+        where the field is not available are sorted last.
+    :param int limit: The maximum number of processes to return. If
+        processes are sorted, only the top ones are kept while collecting.
+        It must not be negative.
 
     """
 
-    def __init__(self, collector=None, sort_by=None):
+    def __init__(self, collector=None, sort_by=None, limit=None):
+        if limit is not None and limit < 0:
+            raise ValueError("Limit must not be negative")
         if collector is None:
             self._collector = Collector()
         else:
             self._collector = collector
         self._filters = []
+        self._prefilters = []
         self._set_sort_by(sort_by)
+        self._limit = limit
 
     def add_filter(self, filter_function):
         """Add a filtering function to the collection.
 
         Processes not matching the filter are not returned.
 
+        If the filter has a ``stats`` attribute listing the stats it needs,
+        it's passed to the collector as a prefilter, so that other stats are
+        only collected for matching processes. In this case, the collector
+        ``collect`` method must accept a ``prefilter`` argument.
+
         :param callable filter_function: A callable accepting a Process and
             returning a boolean value (whether the process should be included).
 
         """
-        self._filters.append(filter_function)
+        if hasattr(filter_function, "stats"):
+            self._prefilters.append(filter_function)
+        else:
+            self._filters.append(filter_function)
 
     def __iter__(self):
         """Return an iterator yielding Process objects.
@@ -73,25 +557,84 @@ class Collection:
         Processes are filtered and sorted as configured.
 
         """
-        iterator = self._collector.collect()
+        prefilter = self._prefilter()
+        if prefilter is None:
+            # Collectors not supporting prefilters can still be used
+            iterator = self._collector.collect()
+        else:
+            iterator = self._collector.collect(prefilter=prefilter)
         if self._filters:
             iterator = filter(self._filter, iterator)
 
         if self._sort_by is not None:
+            iterator = self._sort(iterator)
+        elif self._limit is not None:
+            iterator = islice(iterator, self._limit)
+
+        return iterator
+
+    async def __aiter__(self):
+        """Asynchronously yield Process objects.
+
+        Processes are filtered and sorted as configured. The collector must
+        support asynchronous collection, like :class:`AsyncCollector`.
+
+        """
+        processes = self._collector.acollect(prefilter=self._prefilter())
+        async with aclosing(processes):
+            if self._sort_by is None:
+                if self._limit == 0:
+                    return
+                count = 0
+                async for process in processes:
+                    if self._filter(process):
+                        yield process
+                        count += 1
+                        if count == self._limit:
+                            break
+                return
+
+            filtered = [
+                process async for process in processes if self._filter(process)
+            ]
+        for process in self._sort(filtered):
+            yield process
+
+    def _sort(self, processes):
+        """Return an iterator with sorted processes.
+
+        If a limit is set, only the top processes are kept, using a heap.
+
+        """
+        if self._sort_reverse:
 
             def key(elem):
-                return elem.get(self._sort_by)
+                value = elem.get(self._sort_by)
+                return value is not None, value
 
-            iterator = iter(
-                sorted(iterator, key=key, reverse=self._sort_reverse)
-            )
+            select = heapq.nlargest
+        else:
 
-        return iterator
+            def key(elem):
+                value = elem.get(self._sort_by)
+                return value is None, value
+
+            select = heapq.nsmallest
+
+        if self._limit is None:
+            return iter(sorted(processes, key=key, reverse=self._sort_reverse))
+        return iter(select(self._limit, processes, key=key))
 
     def _filter(self, proc):
         """Apply filters to a Process."""
         return all(ffunc(proc) for ffunc in self._filters)
 
+    def _prefilter(self):
+        """Return the filter to pass to the collector, if any."""
+        if not self._prefilters:
+            return None
+        return AllFilter(self._prefilters)
+
     def _set_sort_by(self, sort_by):
         if sort_by is not None and sort_by.startswith("-"):
             self._sort_by = sort_by[1:]
@@ -1,8 +1,31 @@
-"""Filter classes for process Collection."""
+"""Filter classes for process Collection.
+
+Filters can declare the stats they need in a ``stats`` attribute, which
+allows collectors to evaluate them before collecting other stats.
+
+"""
 
 import re
 
 
+class AllFilter:
+    """Match processes matching all the specified filters.
+
+    :param list filters: A list of filters, each declaring the stats it
+        needs.
+
+    """
+
+    def __init__(self, filters):
+        self._filters = filters
+        self.stats = sorted(
+            set().union(*(process_filter.stats for process_filter in filters))
+        )
+
+    def __call__(self, process):
+        return all(process_filter(process) for process_filter in self._filters)
+
+
 class CommandNameFilter:
     """Filter processes based on the command name.
 
@@ -10,6 +33,8 @@ class CommandNameFilter:
 
     """
 
+    stats = ("cmdline", "comm")
+
     def __init__(self, name):
         self._name = name
 
@@ -29,6 +54,8 @@ class CommandLineFilter:
 
     """
 
+    stats = ("cmdline", "comm")
+
     def __init__(self, regexp, include_args=False):
         self._re = re.compile(regexp)
         self._include_args = include_args
@@ -23,6 +23,9 @@ class Formatter:
     # Name of the format produced by the formatter.
     fmt = ""
 
+    # MIME type of the output.
+    content_type = "text/plain; charset=utf-8"
+
     # Configuration parameters with defaults.
     config: ClassVar[dict[str, Any]] = {}
 
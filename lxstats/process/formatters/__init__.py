@@ -1,15 +1,46 @@
-"""Formatter subclasses for different formats."""
+"""Formatter subclasses for different formats.
 
+Formatter modules are only imported when the formatter is requested, since
+they can depend on modules that are slow to import.
+
+"""
+
+from typing import TYPE_CHECKING
+
+from ..._lazy import lazy_attributes
 from ..formatter import Formatter
-from .fmt_csv import CSVFormatter
-from .fmt_json import JSONFormatter
-from .fmt_table import TableFormatter
 
-_FORMATTERS: dict[str, type[Formatter]] = {
-    formatter.fmt: formatter
-    for formatter in (CSVFormatter, JSONFormatter, TableFormatter)
+if TYPE_CHECKING:  # pragma: no cover
+    from .fmt_csv import CSVFormatter  # noqa: F401
+    from .fmt_json import JSONFormatter  # noqa: F401
+    from .fmt_ndjson import NDJSONFormatter  # noqa: F401
+    from .fmt_prometheus import PrometheusFormatter  # noqa: F401
+    from .fmt_sqlite import SQLiteFormatter  # noqa: F401
+    from .fmt_stream_table import StreamTableFormatter  # noqa: F401
+    from .fmt_table import TableFormatter  # noqa: F401
+
+# Map format names to the name of the formatter class
+_FORMATTERS = {
+    "csv": "CSVFormatter",
+    "json": "JSONFormatter",
+    "ndjson": "NDJSONFormatter",
+    "prometheus": "PrometheusFormatter",
+    "stream-table": "StreamTableFormatter",
+    "table": "TableFormatter",
 }
 
+_LAZY_ATTRIBUTES = {
+    "CSVFormatter": "fmt_csv",
+    "JSONFormatter": "fmt_json",
+    "NDJSONFormatter": "fmt_ndjson",
+    "PrometheusFormatter": "fmt_prometheus",
+    "SQLiteFormatter": "fmt_sqlite",
+    "StreamTableFormatter": "fmt_stream_table",
+    "TableFormatter": "fmt_table",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+
 
 def get_formats() -> list[str]:
     """Return a sorted list of available formatters names."""
@@ -18,4 +49,5 @@ def get_formats() -> list[str]:
 
 def get_formatter(name: str) -> type[Formatter]:
     """Return the formatter class for the specified format."""
-    return _FORMATTERS[name]
+    formatter: type[Formatter] = __getattr__(_FORMATTERS[name])
+    return formatter
@@ -0,0 +1,61 @@
+"""Newline-delimited JSON formatter."""
+
+from datetime import datetime
+import json
+
+from ..formatter import Formatter
+
+
+class NDJSONFormatter(Formatter):
+    """Format fields as newline-delimited JSON, one object per process.
+
+    Each object is written (and the stream flushed) as soon as the process is
+    collected, so that consumers get it even if the stream is buffered.
+    Timestamps are formatted in ISO 8601 format.
+
+    Config parameters:
+
+      - header: whether to write a record with the sweep timestamp and fields
+        before processes, in the form
+        ``{"type": "sweep", "timestamp": ..., "fields": [...]}``
+    """
+
+    fmt = "ndjson"
+
+    config = {"header": False}
+
+    _utcnow = datetime.utcnow  # For testing
+
+    def __init__(self, stream, fields, **kwargs):
+        super().__init__(stream, fields, **kwargs)
+        self._encoder = json.JSONEncoder(
+            separators=(",", ":"), default=_encode_value
+        )
+
+    def _format_header(self):
+        if self._config["header"]:
+            self._write_record(
+                {
+                    "type": "sweep",
+                    "timestamp": self._utcnow().isoformat(),
+                    "fields": self.fields,
+                }
+            )
+
+    def _format_process(self, process):
+        self._write_record(
+            dict(zip(self.fields, self._fields_values(process)))
+        )
+
+    def _write_record(self, record):
+        self._write(self._encoder.encode(record) + "\n")
+        self._stream.flush()
+
+
+def _encode_value(value):
+    """Return a JSON-serializable form of values not supported by JSON."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
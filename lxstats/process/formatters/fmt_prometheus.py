@@ -0,0 +1,120 @@
+"""Prometheus text exposition formatter."""
+
+import math
+import re
+
+from ..formatter import Formatter
+from ..process import RATE_SUFFIX
+
+#: Stats that are reported as counters, since they only increase during the
+#: lifetime of a process.  All ``io.*`` stats are also counters, except
+#: rates.
+COUNTER_STATS = frozenset(
+    (
+        "stat.minflt",
+        "stat.cminflt",
+        "stat.majflt",
+        "stat.cmajflt",
+        "stat.utime",
+        "stat.stime",
+        "stat.cutime",
+        "stat.cstime",
+        "stat.delayacct_blkio_ticks",
+        "stat.guest_time",
+        "stat.cguest_time",
+        "status.voluntary_ctxt_switches",
+        "status.nonvoluntary_ctxt_switches",
+    )
+)
+
+# Fields used as labels for metrics
+_LABELS = ("pid", "comm")
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class PrometheusFormatter(Formatter):
+    """Format numeric fields in the Prometheus text exposition format.
+
+    Each field is reported as a metric, with ``pid`` and ``comm`` labels for
+    each process (labels are omitted if the process doesn't have a value for
+    them). Non-numeric values are skipped.
+
+    Config parameters:
+
+    - prefix: the prefix for metric names
+    """
+
+    fmt = "prometheus"
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    config = {"prefix": "lxstats_process_"}
+
+    def __init__(self, stream, fields, **kwargs):
+        super().__init__(stream, fields, **kwargs)
+        self._metric_fields = [
+            field for field in self.fields if field not in _LABELS
+        ]
+        self._samples = {}
+
+    def _format_header(self):
+        self._samples = {field: [] for field in self._metric_fields}
+
+    def _format_process(self, process):
+        labels = ",".join(
+            f'{label}="{_escape_label(value)}"'
+            for label, value in (
+                (label, process.get(label)) for label in _LABELS
+            )
+            if value is not None
+        )
+        for field in self._metric_fields:
+            value = process.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._samples[field].append((labels, value))
+
+    def _dump(self):
+        lines = []
+        for field, samples in self._samples.items():
+            if not samples:
+                continue
+            name, metric_type = self._metric_name(field)
+            lines.append(f"# HELP {name} Process {field}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(
+                f"{name}{{{labels}}} {_format_value(value)}"
+                for labels, value in samples
+            )
+        if lines:
+            self._write("\n".join(lines) + "\n")
+        self._samples = {}
+
+    def _metric_name(self, field):
+        """Return the metric name and type for a field."""
+        name = self._config["prefix"] + _INVALID_NAME_CHARS.sub("_", field)
+        if field == "cpu.percent" or field.endswith(RATE_SUFFIX):
+            return name, "gauge"
+        if field in COUNTER_STATS or field.startswith("io."):
+            return name + "_total", "counter"
+        return name, "gauge"
+
+
+def _escape_label(value):
+    """Escape a label value."""
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_value(value):
+    """Format a sample value."""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
@@ -0,0 +1,177 @@
+"""SQLite formatter."""
+
+from datetime import datetime
+import json
+import sqlite3
+
+from ..formatter import Formatter
+
+# Range of SQLite integers
+_MIN_INTEGER = -(2**63)
+_MAX_INTEGER = 2**63 - 1
+
+# Fields stored in the processes table, rather than with each sample
+_PROCESS_FIELDS = frozenset(("pid", "comm", "cmd", "timestamp"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processes (
+    id INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    starttime INTEGER NOT NULL,
+    comm TEXT,
+    cmd TEXT,
+    UNIQUE (pid, starttime)
+);
+CREATE INDEX IF NOT EXISTS processes_pid ON processes (pid);
+CREATE INDEX IF NOT EXISTS processes_comm ON processes (comm);
+CREATE TABLE IF NOT EXISTS samples (
+    timestamp TEXT NOT NULL,
+    process_id INTEGER NOT NULL REFERENCES processes (id)
+);
+CREATE INDEX IF NOT EXISTS samples_timestamp ON samples (timestamp);
+CREATE INDEX IF NOT EXISTS samples_process_id ON samples (process_id);
+"""
+
+
+class SQLiteFormatter(Formatter):
+    """Write fields for each sweep to a SQLite database.
+
+    Rather than to a stream, output is written to a database with these
+    tables:
+
+    - ``processes``: a row for each process, identified by PID and start
+      time, with ``comm`` and ``cmd``.
+
+    - ``samples``: a row for each process in each sweep, with the
+      ``timestamp`` (as ISO 8601 text in UTC), the ``process_id`` and a
+      column for each other field, named after it.
+
+    Each sweep is written in a single transaction. Processes must have the
+    ``stat.starttime``, ``comm`` and ``cmdline`` stats collected, to be
+    identified in the processes table.
+
+    :param database: the path of the database file, or a
+        :class:`sqlite3.Connection`.
+
+    """
+
+    fmt = "sqlite"
+
+    _utcnow = datetime.utcnow  # For testing
+
+    def __init__(self, database, fields, **kwargs):
+        super().__init__(None, fields, **kwargs)
+        if isinstance(database, sqlite3.Connection):
+            self._connection = database
+        else:
+            self._connection = sqlite3.connect(database)
+        self._sample_fields = [
+            field for field in self.fields if field not in _PROCESS_FIELDS
+        ]
+        # Map (pid, starttime) to the ID in the processes table
+        self._process_ids = {}
+        self._processes = []
+        self._rows = []
+        self._timestamp = None
+        self._create_schema()
+
+    def _format_header(self):
+        self._timestamp = self._utcnow().isoformat(sep=" ")
+        self._processes = []
+        self._rows = []
+
+    def _format_process(self, process):
+        key = (process.pid, process.get("stat.starttime") or 0)
+        self._processes.append((key, process.get("comm"), process.cmd))
+        self._rows.append(
+            [_sql_value(process.get(field)) for field in self._sample_fields]
+        )
+
+    def _dump(self):
+        processes, rows = self._processes, self._rows
+        self._processes = []
+        self._rows = []
+        with self._connection:
+            new_ids = self._add_processes(processes)
+            self._connection.executemany(
+                self._insert_sample,
+                (
+                    [
+                        self._timestamp,
+                        new_ids.get(key) or self._process_ids[key],
+                        *row,
+                    ]
+                    for (key, _, _), row in zip(processes, rows)
+                ),
+            )
+        # Only cache IDs once the transaction is committed
+        self._process_ids.update(new_ids)
+
+    def _add_processes(self, processes):
+        """Add new processes, returning their IDs by key."""
+        new_ids = {}
+        new = {
+            key: (comm, cmd)
+            for key, comm, cmd in processes
+            if key not in self._process_ids
+        }
+        if new:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO processes (pid, starttime, comm, cmd) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (pid, starttime, comm, cmd)
+                    for (pid, starttime), (comm, cmd) in new.items()
+                ),
+            )
+            # Get IDs for all new processes at once, including those that
+            # were already in the database
+            rows = self._connection.execute(
+                "SELECT id, pid, starttime FROM processes "
+                "WHERE (pid, starttime) IN ("
+                "  SELECT json_extract(value, '$[0]'),"
+                "    json_extract(value, '$[1]')"
+                "  FROM json_each(?))",
+                (json.dumps(list(new)),),
+            )
+            new_ids = {(pid, starttime): id for id, pid, starttime in rows}
+        return new_ids
+
+    def _create_schema(self):
+        """Create tables, adding columns for fields if missing."""
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            columns = {
+                row[1]
+                for row in self._connection.execute(
+                    "PRAGMA table_info(samples)"
+                )
+            }
+            for field in self._sample_fields:
+                if field not in columns:
+                    self._connection.execute(
+                        f"ALTER TABLE samples ADD COLUMN {_quote(field)}"
+                    )
+        names = ", ".join(
+            _quote(name)
+            for name in ("timestamp", "process_id", *self._sample_fields)
+        )
+        placeholders = ", ".join("?" * (len(self._sample_fields) + 2))
+        self._insert_sample = (
+            f"INSERT INTO samples ({names}) VALUES ({placeholders})"
+        )
+
+
+def _quote(name):
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    """Return a value that can be stored in the database."""
+    if isinstance(value, int) and not _MIN_INTEGER <= value <= _MAX_INTEGER:
+        # Too large for SQLite integers
+        return str(value)
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return json.dumps(value)
@@ -0,0 +1,91 @@
+"""Streaming fixed-width table formatter."""
+
+from ..formatter import Formatter
+
+
+class StreamTableFormatter(Formatter):
+    """Format fields as a fixed-width table, writing rows as they arrive.
+
+    Column widths are computed from the header and the first rows, which are
+    buffered up to the lookahead size. Widths can also be declared for
+    fields, in which case no buffering is needed if all fields have one.
+    Columns are widened for later rows if they contain longer values.
+
+    Config parameters:
+
+    - lookahead: the maximum number of rows buffered to compute widths
+    - widths: a dict mapping fields to the minimum width of their column
+    """
+
+    fmt = "stream-table"
+
+    config = {"lookahead": 100, "widths": None}
+
+    def __init__(self, stream, fields, **kwargs):
+        super().__init__(stream, fields, **kwargs)
+        self._declared_widths = self._config["widths"] or {}
+        self._rows = []
+        self._widths = None
+        self._row_format = ""
+
+    def _format_header(self):
+        self._rows = [list(self.fields)]
+        self._widths = None
+        self._flush_if_ready()
+
+    def _format_process(self, process):
+        row = [str(value) for value in self._fields_values(process)]
+        if self._widths is None:
+            self._rows.append(row)
+            self._flush_if_ready()
+        else:
+            self._write_rows([row])
+
+    def _format_footer(self):
+        if self._widths is None:
+            self._flush_rows()
+
+    def _dump(self):
+        self._stream.flush()
+
+    def _flush_if_ready(self):
+        """Write buffered rows if column widths can be computed."""
+        if len(self._rows) > self._config["lookahead"] or all(
+            field in self._declared_widths for field in self.fields
+        ):
+            self._flush_rows()
+
+    def _flush_rows(self):
+        """Compute column widths from buffered rows and write them."""
+        rows, self._rows = self._rows, []
+        self._set_widths(
+            [
+                max(
+                    self._declared_widths.get(field, 0),
+                    *(len(value) for value in column),
+                )
+                for field, column in zip(self.fields, zip(*rows))
+            ]
+        )
+        self._write_rows(rows)
+
+    def _set_widths(self, widths):
+        self._widths = widths
+        self._row_format = (
+            "".join(f" {{:<{width}}} " for width in widths) + "\n"
+        )
+
+    def _write_rows(self, rows):
+        lines = []
+        for row in rows:
+            if any(
+                len(value) > width for value, width in zip(row, self._widths)
+            ):
+                self._set_widths(
+                    [
+                        max(len(value), width)
+                        for value, width in zip(row, self._widths)
+                    ]
+                )
+            lines.append(self._row_format.format(*row))
+        self._write("".join(lines))
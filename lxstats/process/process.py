@@ -6,23 +6,145 @@ Stats for a process can be collected and accessed::
     p.collect_stats()
     p.get('statm.size')
 
+Collection can be limited to the files needed for a set of stats, in which
+case only the requested values are parsed from them::
+
+    p.collect_stats(stats=['pid', 'stat.state', 'comm'])
+
+When stats are collected more than once for the same process, rates are
+computed from the previous sample. Any numeric stat can be accessed as a rate
+per second by appending ``_per_sec`` to its name, and ``cpu.percent`` reports
+the CPU usage::
+
+    p.get('io.read_bytes_per_sec')
+    p.get('cpu.percent')
+
+If ``compact`` is true, stats are stored in a
+:class:`lxstats.process.stats.CompactStats`, which uses less memory for
+processes that are kept around.
+
+If a :class:`lxstats.process.cache.StaticFilesCache` is passed as
+``static_cache``, files that don't change while the process is running (such
+as ``cmdline``) are only read once for each process.
+
+If ``lazy`` is true, :meth:`TaskBase.collect_stats` doesn't read any file,
+and files are read when the stats they contain are first accessed (for
+instance, ``p.get('io.read_bytes')`` only reads ``io``). Values read from a
+file are kept until the next call to :meth:`TaskBase.collect_stats`.
+
+Note that in lazy mode the timestamp reports when
+:meth:`TaskBase.collect_stats` was called, while files are read later, at
+different times, so values from different files are not guaranteed to be
+consistent with each other (or to come from the same process, if its PID is
+reused). Rates are only available for stats that were also accessed for the
+previous sample.
+
 """
 
 from datetime import datetime
+import os
+import time
+
+from ..files.proc.process import ProcProcessDirectory
+from .stats import CompactStats
+
+#: Suffix for stats reporting the rate per second of another stat.
+RATE_SUFFIX = "_per_sec"
+
+#: Map stats that are not read from a file with the same name as their prefix
+#: to the stats they're computed from.
+STATS_FILES = {
+    "cmd": ("cmdline", "comm"),
+    "cpu.percent": ("stat.utime", "stat.stime", "stat.starttime"),
+    "pid": (),
+    "tid": (),
+    "timestamp": (),
+}
 
-from ..files.proc import ProcProcessDirectory
+# Clock ticks per second, used by times in /proc/[pid]/stat
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# Marker for files that couldn't be read
+_MISSING = object()
+
+
+def stats_keys(stats):
+    """Return a dict mapping file names to keys needed from them for stats.
+
+    Stats are mapped to files based on their prefix. Keys are returned as a
+    :class:`set`, or :data:`None` if the whole file is needed (e.g.
+    ``stat.state`` maps to ``{'stat': {'state'}}``, ``comm`` to
+    ``{'comm': None}``). Unknown stats are ignored.
+
+    """
+    keys = {}
+    for stat in stats:
+        if stat.endswith(RATE_SUFFIX):
+            # the start time is needed to match the previous sample
+            _add_stat_key(keys, "stat.starttime")
+            stat = stat[: -len(RATE_SUFFIX)]
+
+        for name in STATS_FILES.get(stat, (stat,)):
+            _add_stat_key(keys, name)
+    return keys
+
+
+def _add_stat_key(keys, stat):
+    """Add the file and key for a stat to a dict of keys by file."""
+    name, _, key = stat.partition(".")
+    if name not in ProcProcessDirectory.files:
+        return
+
+    if not key:
+        keys[name] = None
+    elif name not in keys:
+        keys[name] = {key}
+    elif keys[name] is not None:
+        keys[name].add(key)
 
 
 class TaskBase:
-    """Base class for tasks and processes."""
+    """Base class for tasks and processes.
+
+    If ``use_dir_fd`` is true, the ``/proc`` directory for the task is opened
+    once when collecting stats, and files are read relative to it. This
+    guarantees that all stats come from the same task, even if its ID is
+    reused in the meantime.
+
+    If ``compact`` is true, values parsed from each file are stored as a
+    :class:`lxstats.process.stats.Record` rather than as separate entries.
+
+    If ``lazy`` is true, files are only read when stats are accessed.
+
+    If ``static_cache`` is passed, content of static files is read from it,
+    based on the task ID and start time. In this case, ``stat.starttime`` is
+    also collected along with static files. It's not passed to tasks of a
+    process, since task entries would never be evicted, and the main task has
+    the same ID as the process.
+
+    """
 
     _utcnow = datetime.utcnow  # For testing
+    _monotonic_clock = time.monotonic  # For testing
 
     _id_attr = "_id"
 
-    def __init__(self, id, proc_dir):
+    def __init__(
+        self,
+        id,
+        proc_dir,
+        fd_cache=None,
+        use_dir_fd=False,
+        compact=False,
+        lazy=False,
+        static_cache=None,
+    ):
         self._id = id
-        self._dir = ProcProcessDirectory(proc_dir)
+        self._dir = ProcProcessDirectory(proc_dir, fd_cache=fd_cache)
+        self._use_dir_fd = use_dir_fd
+        self._compact = compact
+        self._lazy = lazy
+        self._static_cache = static_cache
         self._reset()
 
     def __repr__(self):
@@ -37,6 +159,7 @@ class TaskBase:
     @property
     def cmd(self):
         """The task command line, with brackets for kernel tasks."""
+        self._load(("cmd",))
         cmdline = self._stats.get("cmdline")
         if cmdline:
             return " ".join(cmdline)
@@ -48,26 +171,106 @@ class TaskBase:
         """Whether the task exists."""
         return self._dir.exists
 
-    def collect_stats(self):
-        """Collect stats about the process from ``/proc`` files."""
+    def collect_stats(self, stats=None):
+        """Collect stats about the process from ``/proc`` files.
+
+        In lazy mode, files are not read until stats are accessed.
+
+        :param stats: an optional iterable with names of stats to collect. If
+            specified, only files needed for those stats are read, otherwise
+            all available files are read.
+
+        """
+        previous = (self._monotonic, self._stats)
         self._reset()
+        if self._lazy:
+            self._set_timestamp()
+            self._pending.append(stats)
+        else:
+            self._collect(stats)
+        if previous[0] is not None and self._monotonic is not None:
+            # Keep the previous sample to compute rates
+            self._previous = previous
+
+    def update_stats(self, stats=None):
+        """Collect additional stats, keeping those already collected.
+
+        Files that were already read since the last call to
+        :meth:`collect_stats` are not read again.
+
+        :param stats: an optional iterable with names of stats to collect. If
+            not specified, all available files are read.
+
+        """
+        if self._lazy:
+            self._pending.append(stats)
+        else:
+            self._collect(stats)
+
+    def _load(self, stats):
+        """In lazy mode, read files for stats that are accessed."""
+        if self._lazy:
+            self._collect(stats)
+
+    def _load_pending(self):
+        """In lazy mode, read files for all collected stats."""
+        for stats in self._pending:
+            self._collect(stats)
+        self._pending = []
+
+    def _collect(self, stats):
+        if not self._use_dir_fd:
+            if self._dir.readable:
+                self._collect_stats(stats)
+            return
 
-        if not self._dir.readable:
+        try:
+            self._dir.open()
+        except OSError:
             return
+        try:
+            self._collect_stats(stats)
+        finally:
+            self._dir.close()
 
+    def _set_timestamp(self):
         self._timestamp = self._utcnow()
-
-        for name in self._dir.list():
-            entry = self._dir[name]
-            if not entry.readable or not hasattr(entry, "parse"):
+        self._monotonic = self._monotonic_clock()
+
+    def _collect_stats(self, stats):
+        if self._timestamp is None:
+            self._set_timestamp()
+
+        if stats is None:
+            files = dict.fromkeys(self._dir.list())
+        else:
+            files = stats_keys(stats)
+        if self._static_cache is not None and not files.keys().isdisjoint(
+            self._static_cache.files
+        ):
+            # The start time is needed to look up cached content
+            _add_stat_key(files, "stat.starttime")
+
+        # Read stat first, so that the start time is available
+        for name, keys in sorted(
+            files.items(), key=lambda item: (item[0] != "stat", item[0])
+        ):
+            keys = self._keys_to_read(name, keys)
+            if keys is not None and not keys:
                 continue
-
-            try:
-                parsed_stats = entry.parse()
-            except OSError:
+            if (
+                self._static_cache is not None
+                and name in self._static_cache.files
+            ):
+                parsed_stats = self._read_static_file(name, keys)
+            else:
+                parsed_stats = self._read_file(name, keys)
+            if parsed_stats is _MISSING:
                 continue
 
-            if isinstance(parsed_stats, dict):
+            if self._compact:
+                self._stats.set_file(name, parsed_stats)
+            elif isinstance(parsed_stats, dict):
                 self._stats.update(
                     (f"{name}.{key}", value)
                     for key, value in parsed_stats.items()
@@ -75,12 +278,87 @@ class TaskBase:
             else:
                 self._stats[name] = parsed_stats
 
+    def _read_file(self, name, keys):
+        """Return the parsed content of a file, or _MISSING if not found."""
+        try:
+            entry = self._dir[name]
+        except KeyError:
+            return _MISSING
+        if not hasattr(entry, "parse"):
+            return _MISSING
+
+        try:
+            return entry.parse(keys=keys)
+        except OSError:
+            return _MISSING
+
+    def _read_static_file(self, name, keys):
+        """Return the parsed content of a file through the static cache."""
+        starttime = self._stats.get("stat.starttime")
+        if starttime is None:
+            return self._read_file(name, keys)
+
+        parsed = self._static_cache.get(self._id, starttime, name, _MISSING)
+        if parsed is _MISSING:
+            # The whole file is cached, regardless of requested keys
+            parsed = self._read_file(name, None)
+            if parsed is _MISSING:
+                return parsed
+            self._static_cache.set(self._id, starttime, name, parsed)
+
+        if keys is not None and isinstance(parsed, dict):
+            parsed = {
+                key: value for key, value in parsed.items() if str(key) in keys
+            }
+        return parsed
+
+    def _keys_to_read(self, name, keys):
+        """Return keys not read yet from a file, marking them as read.
+
+        Keys are :data:`None` if the whole file must be read, or an empty set
+        if nothing needs to be read.
+
+        """
+        read_keys = self._read_files.get(name, set())
+        if read_keys is None:
+            return set()
+        if keys is None:
+            self._read_files[name] = None
+            return None
+
+        keys = keys - read_keys
+        self._read_files[name] = read_keys | keys
+        return keys
+
+    def load_stats(self, stats, timestamp, monotonic=None):
+        """Set stats collected elsewhere, such as in a different process.
+
+        :param dict stats: stats in the same format returned by
+            :meth:`stats`.
+        :param datetime timestamp: the time stats were collected at.
+        :param float monotonic: the optional value of :func:`time.monotonic`
+            when stats were collected. If specified, loaded stats are used as
+            the previous sample for rates when stats are next collected.
+
+        """
+        self._reset()
+        self._stats.update(stats)
+        self._timestamp = timestamp
+        self._monotonic = monotonic
+
     def available_stats(self):
         """Return a sorted list of available stats for the process."""
+        self._load_pending()
         return sorted(self._stats)
 
     def stats(self):
-        """Return a dict with process stats."""
+        """Return a dict with process stats.
+
+        Keys are in the ``<file>.<key>`` form for files reporting multiple
+        values.
+
+        """
+        self._load_pending()
         return self._stats.copy()
 
     @property
@@ -88,17 +366,61 @@ class TaskBase:
         """Return the timestamp for stat collection."""
         return self._timestamp
 
+    @property
+    def monotonic(self):
+        """Return the value of :func:`time.monotonic` for stat collection."""
+        return self._monotonic
+
     def get(self, stat):
         """Return the stat with the name, or None if not available."""
         if stat in (self._id_attr, "cmd", "timestamp"):
             return getattr(self, stat)
 
-        return self._stats.get(stat)
+        value = self._stats.get(stat)
+        if value is None and self._lazy:
+            self._load((stat,))
+            value = self._stats.get(stat)
+        if value is None and self._previous is not None:
+            value = self._rate(stat)
+        return value
+
+    def _rate(self, stat):
+        """Return the rate for a stat based on the previous sample."""
+        if stat == "cpu.percent":
+            names = ("stat.utime", "stat.stime")
+            scale = 100 / CLOCK_TICKS
+        elif stat.endswith(RATE_SUFFIX):
+            names = (stat[: -len(RATE_SUFFIX)],)
+            scale = 1
+        else:
+            return None
+
+        previous_time, previous_stats = self._previous
+        if previous_stats.get("stat.starttime") != self._stats.get(
+            "stat.starttime"
+        ):
+            # Not the same process
+            return None
+        interval = self._monotonic - previous_time
+        if interval <= 0:
+            return None
+        try:
+            delta = sum(
+                self._stats[name] - previous_stats[name] for name in names
+            )
+        except (KeyError, TypeError):
+            return None
+        return delta * scale / interval
 
     def _reset(self):
         """Reset stats."""
-        self._stats = {}
+        self._stats = CompactStats() if self._compact else {}
         self._timestamp = None
+        self._monotonic = None
+        self._previous = None
+        self._read_files = {}
+        # Stats to read in lazy mode, None for all
+        self._pending = []
 
 
 class Process(TaskBase):
@@ -115,10 +437,32 @@ class Process(TaskBase):
 
     def tasks(self):
         """Return a list of Tasks for the Process."""
+        if not self._use_dir_fd:
+            return self._tasks()
+
+        with self._dir:
+            return self._tasks()
+
+    def _tasks(self):
         tasks = []
         tasks_dir = self._dir["task"]
-        for tid in tasks_dir.listdir():
-            tasks.append(Task(int(tid), self, tasks_dir.join(tid)))
+        if self._dir.is_open:
+            with tasks_dir:
+                tids = tasks_dir.listdir()
+        else:
+            tids = tasks_dir.listdir()
+        for tid in tids:
+            tasks.append(
+                Task(
+                    int(tid),
+                    self,
+                    tasks_dir.join(tid),
+                    fd_cache=self._dir._fd_cache,
+                    use_dir_fd=self._use_dir_fd,
+                    compact=self._compact,
+                    lazy=self._lazy,
+                )
+            )
         return tasks
 
 
@@ -127,8 +471,26 @@ class Task(TaskBase):
 
     _id_attr = "tid"
 
-    def __init__(self, id, parent, proc_dir):
-        super().__init__(id, proc_dir)
+    def __init__(
+        self,
+        id,
+        parent,
+        proc_dir,
+        fd_cache=None,
+        use_dir_fd=False,
+        compact=False,
+        lazy=False,
+        static_cache=None,
+    ):
+        super().__init__(
+            id,
+            proc_dir,
+            fd_cache=fd_cache,
+            use_dir_fd=use_dir_fd,
+            compact=compact,
+            lazy=lazy,
+            static_cache=static_cache,
+        )
         self.parent = parent
 
     @property
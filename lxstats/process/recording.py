@@ -0,0 +1,368 @@
+"""Record sweeps of processes stats in a compact binary format, and replay them.
+
+A :class:`Recorder` writes values of a set of fields for each process, for
+each sweep of a collection::
+
+    with open('procs.rec', 'wb') as stream:
+        recorder = Recorder(stream, ['stat.rss', 'comm'])
+        recorder.record(collection)
+
+Recorded sweeps can be read back with a :class:`ReplayCollector`, which can
+be used in place of a collector with a
+:class:`~lxstats.process.collection.Collection` (and its filters and
+formatters). Each call to :meth:`ReplayCollector.collect` returns processes
+from the next recorded sweep::
+
+    with open('procs.rec', 'rb') as stream:
+        collection = Collection(collector=ReplayCollector(stream))
+        list(collection)
+
+The format is a stream of bytes, starting with a header with the format
+version and the list of recorded fields, followed by sweeps. Integers are
+encoded as variable-length quantities (with zig-zag encoding for signed
+values). Each sweep is prefixed by its length, and contains the sweep
+timestamp (as a difference from the previous one, in microseconds) and a row
+for each process, with the PID (as a difference from the previous row) and a
+value for each field. Values that didn't change since the previous sweep for
+the same PID take a single byte, and integers are stored as a difference
+from the previous value.
+
+"""
+
+from datetime import (
+    datetime,
+    timedelta,
+)
+import json
+from pathlib import Path
+import struct
+
+from .process import Process
+
+# Identifies recording streams
+_MAGIC = b"LXSR"
+
+# Version of the recording format
+_VERSION = 1
+
+# Tags for field values in rows
+_SAME = 0  # same value as in the previous sweep
+_NONE = 1
+_INT_DELTA = 2  # difference from the integer in the previous sweep
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_JSON = 6  # any other JSON-serializable value
+
+_EPOCH = datetime(1970, 1, 1)
+
+_FLOAT_STRUCT = struct.Struct("<d")
+
+
+class RecordingError(Exception):
+    """The recording stream is invalid."""
+
+
+class Recorder:
+    """Record values of fields for processes in a compact binary format.
+
+    :param stream: a binary file-like object to write to.
+    :param list fields: names of fields to record.
+
+    """
+
+    _utcnow = datetime.utcnow  # For testing
+
+    def __init__(self, stream, fields):
+        self.fields = list(fields)
+        self._stream = stream
+        self._last_timestamp = 0
+        # Map PIDs to values in the previous sweep
+        self._previous = {}
+        self._write_header()
+
+    def record(self, processes, timestamp=None):
+        """Record a sweep.
+
+        :param processes: an iterable of processes, such as a
+            :class:`~lxstats.process.collection.Collection`.
+        :param datetime timestamp: the sweep timestamp. If not specified,
+            the current time is used.
+
+        """
+        if timestamp is None:
+            timestamp = self._utcnow()
+        micros = _timestamp_micros(timestamp)
+        rows = bytearray()
+        count = 0
+        last_pid = 0
+        previous = {}
+        for process in processes:
+            pid = process.pid
+            values = [process.get(field) for field in self.fields]
+            _write_varint(rows, _zigzag(pid - last_pid))
+            _write_values(rows, values, self._previous.get(pid))
+            previous[pid] = values
+            last_pid = pid
+            count += 1
+
+        sweep = bytearray()
+        _write_varint(sweep, _zigzag(micros - self._last_timestamp))
+        _write_varint(sweep, count)
+        sweep += rows
+        data = bytearray()
+        _write_varint(data, len(sweep))
+        self._stream.write(data + sweep)
+        self._stream.flush()
+        self._last_timestamp = micros
+        self._previous = previous
+
+    def _write_header(self):
+        header = bytearray(_MAGIC)
+        _write_varint(header, _VERSION)
+        _write_varint(header, len(self.fields))
+        for field in self.fields:
+            _write_str(header, field)
+        self._stream.write(header)
+
+
+class Reader:
+    """Read sweeps from a recording.
+
+    Iterating the reader yields a tuple for each sweep, with the timestamp
+    and a list of ``(pid, stats)`` tuples, where ``stats`` is a dict with
+    values of recorded fields.
+
+    :param stream: a binary file-like object to read from.
+
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.fields = self._read_header()
+
+    def __iter__(self):
+        micros = 0
+        previous = {}
+        while True:
+            size = self._read_varint(eof_ok=True)
+            if size is None:
+                return
+            data = self._read(size)
+            try:
+                delta, rows, previous = self._read_sweep(data, previous)
+            except (
+                IndexError,
+                TypeError,
+                ValueError,
+                struct.error,
+            ) as error:
+                raise RecordingError(f"Invalid sweep: {error}")
+            micros += delta
+            yield _EPOCH + timedelta(microseconds=micros), rows
+
+    def _read_sweep(self, data, previous):
+        """Decode a sweep.
+
+        Return the timestamp difference from the previous sweep, rows, and
+        values by PID.
+
+        """
+        delta, offset = _read_varint(data, 0)
+        count, offset = _read_varint(data, offset)
+        rows = []
+        current = {}
+        pid = 0
+        for _ in range(count):
+            pid_delta, offset = _read_varint(data, offset)
+            pid += _unzigzag(pid_delta)
+            values, offset = _read_values(
+                data, offset, len(self.fields), previous.get(pid)
+            )
+            current[pid] = values
+            rows.append((pid, dict(zip(self.fields, values))))
+        return _unzigzag(delta), rows, current
+
+    def _read_header(self):
+        if self._read(len(_MAGIC)) != _MAGIC:
+            raise RecordingError("Not a recording")
+        version = self._read_varint()
+        if version != _VERSION:
+            raise RecordingError(f"Unsupported version: {version}")
+        fields = []
+        for _ in range(self._read_varint()):
+            fields.append(self._read(self._read_varint()).decode())
+        return fields
+
+    def _read(self, size):
+        data = self._stream.read(size)
+        if len(data) != size:
+            raise RecordingError("Truncated recording")
+        return data
+
+    def _read_varint(self, eof_ok=False):
+        """Read a varint from the stream, or None if at the end."""
+        value = 0
+        shift = 0
+        while True:
+            byte = self._stream.read(1)
+            if not byte:
+                if eof_ok and shift == 0:
+                    return None
+                raise RecordingError("Truncated recording")
+            value |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                return value
+            shift += 7
+
+
+class ReplayCollector:
+    """Collector returning processes from recorded sweeps.
+
+    Each call to :meth:`collect` returns processes from the next sweep, with
+    recorded stats loaded. Once all sweeps have been returned, no process is
+    returned.
+
+    :param stream: a binary file-like object to read the recording from.
+    :param str proc: the path for ``/proc``, used for processes paths.
+
+    """
+
+    def __init__(self, stream, proc="/proc"):
+        self._proc = Path(proc)
+        self._reader = Reader(stream)
+        self._sweeps = iter(self._reader)
+        self._next = next(self._sweeps, None)
+
+    @property
+    def fields(self):
+        """Names of recorded fields."""
+        return self._reader.fields
+
+    @property
+    def finished(self):
+        """Whether all sweeps have been returned."""
+        return self._next is None
+
+    def collect(self, prefilter=None):
+        """Return an iterator yielding Process objects for the next sweep."""
+        if self._next is None:
+            return
+        (timestamp, rows), self._next = self._next, next(self._sweeps, None)
+        for pid, stats in rows:
+            process = Process(pid, self._proc / str(pid))
+            process.load_stats(
+                {
+                    stat: value
+                    for stat, value in stats.items()
+                    if value is not None
+                },
+                timestamp,
+            )
+            if prefilter is None or prefilter(process):
+                yield process
+
+
+def _timestamp_micros(timestamp):
+    """Return microseconds since the epoch for a timestamp."""
+    delta = timestamp - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _zigzag(value):
+    """Map signed integers to unsigned, with small absolute values first."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_varint(data, value):
+    """Append an unsigned integer as a variable-length quantity."""
+    while value >= 0x80:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def _read_varint(data, offset):
+    """Return a variable-length integer and the offset following it."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_str(data, value):
+    encoded = value.encode()
+    _write_varint(data, len(encoded))
+    data += encoded
+
+
+def _write_values(data, values, previous):
+    """Append values for a row, encoded based on previous ones."""
+    if previous is None:
+        previous = (None,) * len(values)
+    for value, previous_value in zip(values, previous):
+        value_type = type(value)
+        if value_type is type(previous_value) and value == previous_value:
+            data.append(_SAME)
+        elif value is None:
+            data.append(_NONE)
+        elif value_type is int:
+            if type(previous_value) is int:
+                data.append(_INT_DELTA)
+                _write_varint(data, _zigzag(value - previous_value))
+            else:
+                data.append(_INT)
+                _write_varint(data, _zigzag(value))
+        elif value_type is float:
+            data.append(_FLOAT)
+            data += _FLOAT_STRUCT.pack(value)
+        elif value_type is str:
+            data.append(_STR)
+            _write_str(data, value)
+        else:
+            data.append(_JSON)
+            _write_str(data, json.dumps(value))
+
+
+def _read_values(data, offset, count, previous):
+    """Return values for a row and the offset following them."""
+    if previous is None:
+        previous = (None,) * count
+    values = []
+    for previous_value in previous:
+        tag = data[offset]
+        offset += 1
+        if tag == _SAME:
+            value = previous_value
+        elif tag == _NONE:
+            value = None
+        elif tag == _INT_DELTA:
+            delta, offset = _read_varint(data, offset)
+            value = previous_value + _unzigzag(delta)
+        elif tag == _INT:
+            value, offset = _read_varint(data, offset)
+            value = _unzigzag(value)
+        elif tag == _FLOAT:
+            [value] = _FLOAT_STRUCT.unpack_from(data, offset)
+            offset += _FLOAT_STRUCT.size
+        elif tag in (_STR, _JSON):
+            size, offset = _read_varint(data, offset)
+            if offset + size > len(data):
+                raise ValueError("truncated value")
+            value = data[offset : offset + size].decode()
+            offset += size
+            if tag == _JSON:
+                value = json.loads(value)
+        else:
+            raise ValueError(f"invalid value tag {tag}")
+        values.append(value)
+    return values, offset
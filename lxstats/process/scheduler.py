@@ -0,0 +1,105 @@
+"""Run periodic sampling at fixed intervals, without drift.
+
+A :class:`Scheduler` yields ticks aligned to absolute deadlines, based on
+:func:`time.monotonic`, so the time taken to process each tick doesn't shift
+following ones::
+
+    scheduler = Scheduler(0.5)
+    for tick in scheduler.ticks(count=10):
+        formatter.format(collection)
+
+If processing a tick takes longer than the interval, following deadlines are
+missed. Missed ticks are reported (through the ``on_missed`` callback and
+the :attr:`Tick.missed` count of the next tick) and, by default, skipped, so
+the next tick is at the first deadline in the future. Otherwise, they run
+immediately one after the other, until the schedule is caught up.
+
+"""
+
+from collections import namedtuple
+from math import ceil
+import time
+
+#: A scheduler tick, with its index (counting only ticks that are run), its
+#: deadline in :func:`time.monotonic` time, and the number of ticks missed
+#: since the previous one.
+Tick = namedtuple("Tick", ["index", "deadline", "missed"])
+
+
+class Scheduler:
+    """Schedule ticks at a fixed interval.
+
+    :param float interval: the interval between ticks, in seconds. If zero,
+        ticks run without waiting.
+    :param bool skip_missed: whether to skip ticks with deadlines missed
+        while processing the previous one. If false, they run immediately.
+    :param callable on_missed: an optional function, called with the number
+        of ticks missed when processing a tick overruns the interval.
+
+    """
+
+    _clock = time.monotonic  # For testing
+    _sleep = time.sleep  # For testing
+
+    def __init__(self, interval, skip_missed=True, on_missed=None):
+        if interval < 0:
+            raise ValueError("Interval must not be negative")
+        self.interval = interval
+        self.skip_missed = skip_missed
+        self.on_missed = on_missed
+        #: The total number of missed ticks.
+        self.missed = 0
+
+    def ticks(self, count=None):
+        """Yield :class:`Tick`\\ s at their deadlines.
+
+        The first tick is yielded immediately. There's no wait after the
+        last one.
+
+        :param int count: the number of ticks to yield. If not specified,
+            ticks are yielded forever.
+
+        """
+        start = self._clock()
+        deadline_index = 0
+        # Number of deadlines already counted as missed or run
+        counted = 0
+        index = 0
+        missed = 0
+        while True:
+            deadline = start + deadline_index * self.interval
+            delay = deadline - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+            yield Tick(index, deadline, missed)
+
+            index += 1
+            if count is not None and index >= count:
+                return
+            deadline_index += 1
+            passed = self._passed(start)
+            missed = max(0, passed - max(deadline_index, counted))
+            counted = max(counted, passed)
+            if missed:
+                self.missed += missed
+                if self.on_missed:
+                    self.on_missed(missed)
+                if self.skip_missed:
+                    deadline_index += missed
+
+    def run(self, function, count=None):
+        """Call a function at each tick.
+
+        :param callable function: the function to call, with no arguments.
+        :param int count: the number of calls. If not specified, the
+            function is called forever.
+
+        """
+        for _ in self.ticks(count=count):
+            function()
+
+    def _passed(self, start):
+        """Return the number of deadlines passed since the start."""
+        if not self.interval:
+            return 0
+        return ceil((self._clock() - start) / self.interval)
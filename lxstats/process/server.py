@@ -0,0 +1,106 @@
+"""Serve formatted output for a collection of processes over HTTP.
+
+A :class:`SweepCache` formats a :class:`~lxstats.process.collection.Collection`
+at most once per interval, so that concurrent requests share the same sweep
+of processes. A :class:`SweepServer` serves the cached content, for instance
+to be scraped by Prometheus::
+
+    collection = Collection(collector=IncrementalCollector())
+    cache = SweepCache(
+        collection, PrometheusFormatter, ['stat.rss', 'cpu.percent'], 10
+    )
+    SweepServer(cache, 9100).serve_forever()
+
+"""
+
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from io import StringIO
+import threading
+import time
+
+
+class SweepCache:
+    """Cache formatted output for a collection.
+
+    :param Collection collection: the collection of processes to format.
+    :param formatter_class: the :class:`~lxstats.process.formatter.Formatter`
+        subclass used to format the collection.
+    :param list fields: names of fields to format.
+    :param float interval: the minimum number of seconds between sweeps.
+
+    """
+
+    _clock = time.monotonic  # For testing
+
+    def __init__(self, collection, formatter_class, fields, interval):
+        self.interval = interval
+        self.content_type = formatter_class.content_type
+        self._collection = collection
+        self._formatter_class = formatter_class
+        self._fields = fields
+        self._lock = threading.Lock()
+        self._content = None
+        self._updated = None
+
+    def get(self):
+        """Return the formatted output, as :class:`bytes`.
+
+        Processes are collected again if the cached output is older than
+        the interval. Concurrent callers wait for the same sweep.
+
+        """
+        with self._lock:
+            if (
+                self._content is None
+                or self._clock() - self._updated >= self.interval
+            ):
+                stream = StringIO()
+                formatter = self._formatter_class(stream, self._fields)
+                formatter.format(self._collection)
+                self._content = stream.getvalue().encode()
+                self._updated = self._clock()
+            return self._content
+
+
+class SweepServer(ThreadingHTTPServer):
+    """HTTP server for output cached in a :class:`SweepCache`.
+
+    Content is served at ``/`` and ``/metrics``.
+
+    :param SweepCache cache: the cache for output.
+    :param int port: the port to listen on.
+    :param str host: the address to listen on. By default, only local
+        connections are accepted.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, cache, port, host="127.0.0.1"):
+        super().__init__((host, port), _SweepRequestHandler)
+        self.cache = cache
+
+
+class _SweepRequestHandler(BaseHTTPRequestHandler):
+    """Handle requests for cached output."""
+
+    _paths = frozenset(("/", "/metrics"))
+
+    def do_GET(self):
+        if self.path.partition("?")[0] not in self._paths:
+            self.send_error(404)
+            return
+
+        content = self.server.cache.get()
+        self.send_response(200)
+        self.send_header("Content-Type", self.server.cache.content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Don't log requests
+        pass
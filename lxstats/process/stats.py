@@ -0,0 +1,172 @@
+"""Compact storage for process stats.
+
+By default, stats for a process are stored in a flat :class:`dict`, with a
+key for each value, such as ``stat.utime``. When many processes (or many
+samples for each of them) are kept in memory, :class:`CompactStats` can be
+used instead, storing values parsed from each file as a :class:`Record`.
+
+Records are tuples of values sharing a :class:`dict` mapping keys to indexes
+with all other records with the same keys, so key names are not stored with
+each sample. Since a record type is created for each set of keys, only files
+with a fixed set of keys (:data:`RECORD_FILES`) are stored as records, while
+content of other files (such as ``environ``, which has different keys for each
+process) is stored as a plain :class:`dict`::
+
+    stats = CompactStats()
+    stats.set_file('statm', {'size': 100, 'resident': 20})
+    stats['statm.size']  # 100
+
+"""
+
+from collections.abc import Mapping
+from typing import ClassVar
+
+#: Names of files with a fixed set of keys, stored as records.
+RECORD_FILES = frozenset(("io", "stat", "statm", "status"))
+
+# Record types by their keys
+_record_types: dict[tuple[str, ...], type["Record"]] = {}
+
+
+class Record(tuple):
+    """A tuple of values, which can be accessed by key.
+
+    Subclasses for each set of keys are returned by :meth:`type_for`.
+
+    """
+
+    __slots__ = ()
+
+    #: Map keys to the index of their value
+    _index: ClassVar[dict[str, int]] = {}
+
+    @classmethod
+    def type_for(cls, keys):
+        """Return the Record type for a tuple of keys."""
+        record_type = _record_types.get(keys)
+        if record_type is None:
+            index = {key: position for position, key in enumerate(keys)}
+            record_type = _record_types[keys] = type(
+                cls.__name__, (cls,), {"__slots__": (), "_index": index}
+            )
+        return record_type
+
+    @classmethod
+    def from_dict(cls, values):
+        """Return a Record with keys and values from a dict."""
+        return cls.type_for(tuple(values))(values.values())
+
+    def __reduce__(self):
+        return _make_record, (tuple(self._index), tuple(self))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return super().__getitem__(self._index[key])
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        """Return the value for a key, or the default if not found."""
+        position = self._index.get(key)
+        if position is None:
+            return default
+        return super().__getitem__(position)
+
+    def keys(self):
+        """Return record keys."""
+        return self._index.keys()
+
+    def items(self):
+        """Return an iterator of (key, value) pairs."""
+        return zip(self._index, self)
+
+    def to_dict(self):
+        """Return a dict with keys and values."""
+        return dict(zip(self._index, self))
+
+
+def _make_record(keys, values):
+    """Return a Record with the specified keys and values."""
+    return Record.type_for(keys)(values)
+
+
+# Types of values for files with keys
+_KEYED_TYPES = (Record, dict)
+
+
+class CompactStats(Mapping):
+    """Stats for a process, stored as a :class:`Record` per file.
+
+    Content of files not in :data:`RECORD_FILES` is stored as is, with
+    :class:`dict` keys converted to strings.
+
+    It provides the same read-only interface as the :class:`dict` used by
+    default, with keys in the ``<file>.<key>`` form.
+
+    """
+
+    def __init__(self):
+        self._files = {}
+
+    def __getitem__(self, stat):
+        if stat in self._files:
+            value = self._files[stat]
+            if not isinstance(value, _KEYED_TYPES):
+                return value
+
+        name, _, key = stat.partition(".")
+        values = self._files.get(name)
+        if not isinstance(values, _KEYED_TYPES) or key not in values.keys():
+            raise KeyError(stat)
+        return values[key]
+
+    def __iter__(self):
+        for name, value in self._files.items():
+            if isinstance(value, _KEYED_TYPES):
+                for key in value.keys():
+                    yield f"{name}.{key}"
+            else:
+                yield name
+
+    def __len__(self):
+        return sum(
+            len(value) if isinstance(value, _KEYED_TYPES) else 1
+            for value in self._files.values()
+        )
+
+    def set_file(self, name, value):
+        """Set the parsed value for a file.
+
+        If the value is a :class:`dict`, it's merged with values previously
+        set for the same file, and stored as a :class:`Record` if the file is
+        in :data:`RECORD_FILES`.
+
+        """
+        if not isinstance(value, dict):
+            self._files[name] = value
+            return
+
+        value = {str(key): item for key, item in value.items()}
+        current = self._files.get(name)
+        if isinstance(current, Record):
+            value = current.to_dict() | value
+        elif isinstance(current, dict):
+            value = current | value
+        if name in RECORD_FILES:
+            value = Record.from_dict(value)
+        self._files[name] = value
+
+    def update(self, stats):
+        """Update from a dict with stats in the ``<file>.<key>`` form."""
+        files = {}
+        for stat, value in stats.items():
+            name, dot, key = stat.partition(".")
+            if dot:
+                files.setdefault(name, {})[key] = value
+            else:
+                self._files[stat] = value
+        for name, values in files.items():
+            self.set_file(name, values)
+
+    def copy(self):
+        """Return a :class:`dict` with stats."""
+        return dict(self.items())
@@ -4,22 +4,44 @@ from argparse import (
     ArgumentParser,
     ArgumentTypeError,
 )
-from itertools import repeat
+from contextlib import ExitStack
 import os
 import sys
-from time import sleep
 
 from toolrack.script import Script
 
+from ..process.cache import (
+    DiskCache,
+    StaticFilesCache,
+)
 from ..process.collection import (
     Collection,
     Collector,
+    IncrementalCollector,
+    ParallelCollector,
 )
 from ..process.filter import CommandLineFilter
 from ..process.formatters import (
     get_formats,
     get_formatter,
 )
+from ..process.scheduler import Scheduler
+
+# Seconds the content of cgroup files is cached for, since processes can be
+# moved to a different cgroup
+CGROUP_TTL = 60
+
+# Stats always included in recordings, since they're used by filters
+RECORD_STATS = frozenset(("cmdline", "comm"))
+
+# Stats always collected for Prometheus output, since they're used as labels
+PROMETHEUS_STATS = frozenset(("comm",))
+
+# Stats always collected when writing to SQLite
+SQLITE_STATS = frozenset(("cmdline", "comm", "stat.starttime"))
+
+# Stats not included in recordings, since they're process attributes
+UNRECORDED_STATS = frozenset(("pid", "cmd", "timestamp"))
 
 
 class ProcsScript(Script):
@@ -34,6 +56,26 @@ class ProcsScript(Script):
             description="Dump info about running processes."
         )
 
+        def interval(value):
+            """Non-negative number of seconds."""
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = -1
+            if seconds < 0:
+                raise ArgumentTypeError("Must specify a non-negative number")
+            return seconds
+
+        def top(value):
+            """Non-negative number of processes."""
+            try:
+                count = int(value)
+            except ValueError:
+                count = -1
+            if count < 0:
+                raise ArgumentTypeError("Must specify a non-negative integer")
+            return count
+
         def pids(pid_list):
             """Comma-separated list of PIDs."""
             try:
@@ -63,6 +105,18 @@ class ProcsScript(Script):
         parser.add_argument(
             "--pids", "-p", help="list specific PIDs", type=pids
         )
+        parser.add_argument(
+            "--sort-by",
+            "-s",
+            help="field to sort by, prefix with - to reverse (e.g. -s=-stat.rss)",
+        )
+        parser.add_argument(
+            "--top",
+            "-t",
+            help="only list the first N processes",
+            type=top,
+            metavar="N",
+        )
         parser.add_argument(
             "--format",
             "-F",
@@ -70,11 +124,18 @@ class ProcsScript(Script):
             choices=get_formats(),
             default="table",
         )
+        parser.add_argument(
+            "--workers",
+            "-w",
+            help="number of threads collecting processes in parallel",
+            type=int,
+            default=1,
+        )
         parser.add_argument(
             "--interval",
             "-i",
             help="sample interval in seconds (default %(default)s)",
-            type=int,
+            type=interval,
             default=5,
         )
         parser.add_argument(
@@ -84,6 +145,50 @@ class ProcsScript(Script):
             type=int,
             default=0,
         )
+        parser.add_argument(
+            "--catch-up",
+            help=(
+                "when collecting a sample takes longer than the interval, "
+                "collect missed samples immediately, instead of skipping them"
+            ),
+            action="store_true",
+        )
+        parser.add_argument(
+            "--cache",
+            help=(
+                "file to cache processes data in across runs, so that rates "
+                "are available from the first sample"
+            ),
+            metavar="FILE",
+        )
+        parser.add_argument(
+            "--serve",
+            help=(
+                "serve stats in Prometheus format on localhost at the "
+                "specified port, collecting processes at most once per "
+                "interval"
+            ),
+            type=int,
+            metavar="PORT",
+        )
+        parser.add_argument(
+            "--record",
+            help=(
+                "record samples to a file in binary format, instead of "
+                "printing them"
+            ),
+            metavar="FILE",
+        )
+        parser.add_argument(
+            "--sqlite",
+            help="write samples to a SQLite database, instead of printing them",
+            metavar="FILE",
+        )
+        parser.add_argument(
+            "--replay",
+            help="print samples recorded in a file, instead of collecting",
+            metavar="FILE",
+        )
         return parser
 
     def main(self, args):
@@ -92,24 +197,108 @@ class ProcsScript(Script):
             self.exit()
 
         fields = [field.strip() for field in args.fields.split(",")]
+        stats = set(fields)
+        if args.sort_by:
+            stats.add(args.sort_by.lstrip("-"))
+        if args.record:
+            # Also record stats needed for filtering replayed samples
+            stats.update(RECORD_STATS)
+        if args.serve or args.format == "prometheus":
+            stats.update(PROMETHEUS_STATS)
+        if args.sqlite:
+            # Needed to identify processes
+            stats.update(SQLITE_STATS)
 
-        collector = Collector(pids=args.pids)
-        collection = Collection(collector=collector)
-        if args.regexp:
-            collection.add_filter(CommandLineFilter(args.regexp))
-        if args.cmdline_regexp:
-            collection.add_filter(
-                CommandLineFilter(args.cmdline_regexp, include_args=True)
+        # Close recording files on exit, flushing pending data
+        with ExitStack() as files:
+            static_cache = StaticFilesCache(ttl={"cgroup": CGROUP_TTL})
+            if args.replay:
+                # Only needed for recordings
+                from ..process.recording import ReplayCollector
+
+                collector = ReplayCollector(
+                    files.enter_context(open(args.replay, "rb"))
+                )
+            elif args.workers > 1:
+                collector = ParallelCollector(
+                    pids=args.pids,
+                    stats=stats,
+                    static_cache=static_cache,
+                    workers=args.workers,
+                )
+            else:
+                collector = IncrementalCollector(
+                    pids=args.pids, stats=stats, static_cache=static_cache
+                )
+            disk_cache = (
+                DiskCache(args.cache)
+                if args.cache and not args.replay
+                else None
+            )
+            if disk_cache:
+                collector.load_samples(disk_cache.load(static_cache))
+            collection = Collection(
+                collector=collector, sort_by=args.sort_by, limit=args.top
             )
-        formatter_class = get_formatter(args.format)
-        formatter = formatter_class(sys.stdout, fields)
-
-        count_iter = range(args.count) if args.count else repeat(None)
-        for n in count_iter:
-            formatter.format(collection)
-            if n != args.count - 1:
-                # don't sleep after last iteration
-                sleep(args.interval)
+            if args.regexp:
+                collection.add_filter(CommandLineFilter(args.regexp))
+            if args.cmdline_regexp:
+                collection.add_filter(
+                    CommandLineFilter(args.cmdline_regexp, include_args=True)
+                )
+            if args.serve:
+                self._serve(collection, fields, args.serve, args.interval)
+                return
+
+            if args.record:
+                from ..process.recording import Recorder
+
+                recorder = Recorder(
+                    files.enter_context(open(args.record, "wb")),
+                    sorted(stats.difference(UNRECORDED_STATS)),
+                )
+                output = recorder.record
+            elif args.sqlite:
+                from ..process.formatters.fmt_sqlite import SQLiteFormatter
+
+                output = SQLiteFormatter(args.sqlite, fields).format
+            else:
+                output = get_formatter(args.format)(sys.stdout, fields).format
+
+            scheduler = Scheduler(
+                # Recorded samples are printed without waiting
+                0 if args.replay else args.interval,
+                skip_missed=not args.catch_up,
+                on_missed=self._report_missed,
+            )
+            for _ in scheduler.ticks(count=args.count or None):
+                if args.replay and collector.finished:
+                    break
+                output(collection)
+                if disk_cache:
+                    disk_cache.save(static_cache, collector.samples())
+
+    def _serve(self, collection, fields, port, interval):
+        """Serve stats in Prometheus format over HTTP."""
+        # Only needed when serving, and slow to import
+        from ..process.server import (
+            SweepCache,
+            SweepServer,
+        )
+
+        cache = SweepCache(
+            collection, get_formatter("prometheus"), fields, interval
+        )
+        with SweepServer(cache, port) as server:
+            server.serve_forever()
+
+    def _report_missed(self, missed):
+        """Report samples missed because collection overran the interval."""
+        print(
+            f"Collection took longer than the interval, missed {missed} "
+            "sample(s)",
+            file=sys.stderr,
+        )
 
     def _print_available_stats(self):
         collector = Collector(pids=[os.getpid()])
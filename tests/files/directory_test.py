@@ -14,6 +14,13 @@ class TestParsedDirectory:
         parsed_dir = SampleParsedDirectory(tmpdir)
         assert parsed_dir.parse() == {"foo": "foo-parsed", "bar": "bar-parsed"}
 
+    def test_parse_keys(self, tmpdir):
+        """ParsedDirectory.parse can parse only the specified files."""
+        (tmpdir / "foo").write_text("", "utf-8")
+        (tmpdir / "bar").write_text("", "utf-8")
+        parsed_dir = SampleParsedDirectory(tmpdir)
+        assert parsed_dir.parse(keys=["foo"]) == {"foo": "foo-parsed"}
+
     def test_parse_not_existent(self, tmpdir):
         """ParsedDirectory.parse returns None if directory doesn't exist."""
         parsed_dir = SampleParsedDirectory(tmpdir / "somedir")
@@ -1,5 +1,8 @@
+import random
 from textwrap import dedent
 
+import pytest
+
 from lxstats.files.proc.process import (
     ProcPIDCgroup,
     ProcPIDCmdline,
@@ -10,8 +13,23 @@ from lxstats.files.proc.process import (
     ProcPIDStat,
     ProcPIDStatm,
     ProcPIDStatus,
+    ProcProcessDirectory,
+    split_stat_bytes,
 )
 
+# Characters likely to confuse parsing of the command in stat files
+ADVERSARIAL_CHARS = "() \t\n)(x1-:"
+
+# Values for fields after the command in stat files
+STAT_TAIL = [str(i) for i in range(3, 45)]
+
+
+def random_comms(seed, chars, count=200):
+    """Yield random command names up to 15 characters from chars."""
+    rand = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rand.choices(chars, k=rand.randint(0, 15)))
+
 
 class TestProcPIDCmdline:
     def test_parse(self, tmpfile):
@@ -81,6 +99,65 @@ class TestProcPIDStat:
         stat_file = ProcPIDStat(tmpfile)
         assert stat_file.parse()["comm"] == "cmd with spaces"
 
+    def test_parse_keys(self, tmpfile):
+        """Only requested fields are returned."""
+        fields = [str(i) for i in range(45)]
+        fields[1] = "(cmd)"
+        fields[2] = "S"
+        tmpfile.write_text(" ".join(fields))
+        stat_file = ProcPIDStat(tmpfile)
+        assert stat_file.parse(keys=["state", "rss", "utime"]) == {
+            "state": "S",
+            "rss": 23,
+            "utime": 13,
+        }
+
+    @pytest.mark.parametrize(
+        "comm",
+        ["a)", "(", ")", ") 1 2 3 (", "a) S 1 (b", "x\ny", " ", ""],
+    )
+    def test_comm_adversarial(self, tmpfile, comm):
+        """The comm field can contain any character."""
+        tmpfile.write_text(f"123 ({comm}) S " + " ".join(STAT_TAIL[1:]) + "\n")
+        stat_file = ProcPIDStat(tmpfile)
+        parsed = stat_file.parse()
+        assert parsed["pid"] == 123
+        assert parsed["comm"] == comm
+        assert parsed["state"] == "S"
+        assert parsed["cguest_time"] == 44
+
+    def test_comm_not_utf8(self, tmpfile):
+        """Undecodable characters in the comm field are replaced."""
+        tmpfile.write_bytes(b"1 (a\xffb) " + " ".join(STAT_TAIL).encode())
+        stat_file = ProcPIDStat(tmpfile)
+        assert stat_file.parse()["comm"] == "a\ufffdb"
+
+    def test_comm_adversarial_keys(self, tmpfile):
+        """Fields after a comm with parentheses are parsed with keys."""
+        tmpfile.write_text("1 (a) b) S " + " ".join(STAT_TAIL[1:]))
+        stat_file = ProcPIDStat(tmpfile)
+        assert stat_file.parse(keys=["comm", "ppid"]) == {
+            "comm": "a) b",
+            "ppid": 4,
+        }
+
+
+class TestSplitStat:
+    @pytest.mark.parametrize("seed", range(10))
+    def test_random_comm(self, seed):
+        """Any command name is split as a single field."""
+        chars = ADVERSARIAL_CHARS + "".join(map(chr, range(1, 256)))
+        tail = [value.encode() for value in STAT_TAIL]
+        for comm in random_comms(seed, chars):
+            comm = comm.encode("latin-1")
+            content = b"1234 (" + comm + b") " + b" ".join(tail)
+            assert split_stat_bytes(content) == [b"1234", comm, *tail]
+
+    def test_no_parenthesis(self):
+        """Content without parenthesis is split on spaces."""
+        assert split_stat_bytes(b"1 comm S") == [b"1", b"comm", b"S"]
+        assert split_stat_bytes(b"1 comm) S") == [b"1", b"comm)", b"S"]
+
 
 class TestProcPIDStatm:
     def test_fields(self, tmpfile):
@@ -134,6 +211,18 @@ class TestProcPIDNs:
         ns_dir = ProcPIDNs(tmpdir)
         assert ns_dir.parse() == {"pid": 123, "ipc": 456}
 
+    def test_parse_dir_fd(self, tmp_path):
+        """Links are read relative to the parent directory descriptor."""
+        pid_dir = tmp_path / "10"
+        (pid_dir / "ns").mkdir(parents=True)
+        (pid_dir / "ns" / "pid").symlink_to("pid:[123]")
+        with ProcProcessDirectory(pid_dir) as process_dir:
+            ns_dir = process_dir["ns"]
+            # the directory is accessed through the parent descriptor
+            pid_dir.rename(tmp_path / "20")
+            assert ns_dir.parse() == {"pid": 123}
+            assert not ns_dir.is_open
+
 
 class TestProcPIDSched:
     def test_fields(self, tmpfile):
@@ -159,6 +248,22 @@ class TestProcPIDSched:
             "se.statistics.sum_sleep_runtime": 1.234567,
         }
 
+    def test_parse_keys(self, tmpfile):
+        """Only requested fields are returned."""
+        content = dedent(
+            """\
+            process (1234, #threads: 1)
+            -------------------------------------------------------------------
+            se.exec_start                                :     123456789.123456
+            se.nr_migrations                             :                   12
+            """
+        )
+        tmpfile.write_text(content)
+        sched_file = ProcPIDSched(tmpfile)
+        assert sched_file.parse(keys=["se.nr_migrations"]) == {
+            "se.nr_migrations": 12
+        }
+
 
 class TestProcPIDEnviron:
     def test_parse(self, tmpfile):
@@ -196,6 +301,12 @@ class TestProcPIDCgroup:
             2: (["devices"], "/group1"),
         }
 
+    def test_parse_keys(self, tmpfile):
+        """Hierarchy IDs can be requested as strings."""
+        tmpfile.write_text("5:net_cls,net_prio:/group1\n0::/\n")
+        cgroup_file = ProcPIDCgroup(tmpfile)
+        assert cgroup_file.parse(keys=["0"]) == {0: ([""], "/")}
+
 
 class TestProcPIDStatus:
     def test_parse(self, tmpfile):
@@ -243,6 +354,19 @@ class TestProcPIDStatus:
             "HugetlbPages": 0,
         }
 
+    def test_parse_keys(self, tmpfile):
+        """Only requested fields are returned."""
+        content = dedent(
+            """\
+            Uid:\t1000	1000	1000	1000
+            VmPeak:\t 1132616 kB
+            VmRSS:\t  246340 kB
+            """
+        )
+        tmpfile.write_text(content)
+        status_file = ProcPIDStatus(tmpfile)
+        assert status_file.parse(keys=["Uid", "VmRSS"]) == {"VmRSS": 252252160}
+
     def test_parse_skip_extra(self, tmpfile):
         """Non memory-related info is skipped."""
         content = dedent(
@@ -170,6 +170,23 @@ class TestProcMeminfo:
             "HugePages_Total": 0,
         }
 
+    def test_parse_keys(self, tmpfile):
+        """Only requested fields are returned."""
+        tmpfile.write_text(
+            dedent(
+                """\
+                MemTotal:       1000 kB
+                MemFree:         200 kB
+                HugePages_Total:   0
+                """
+            )
+        )
+        meminfo_file = ProcMeminfo(tmpfile)
+        assert meminfo_file.parse(keys=["MemFree", "Unknown"]) == {
+            "MemFree": 200
+        }
+        assert meminfo_file.parse(keys=["MemTotal"]) == {"MemTotal": 1000}
+
 
 class TestProcCgroups:
     def test_fields(self, tmpfile):
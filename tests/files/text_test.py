@@ -1,6 +1,9 @@
+from unittest import mock
+
 import pytest
 
 from lxstats.files.text import (
+    compile_fields,
     ParsedFile,
     SingleLineFile,
     SplittedFile,
@@ -12,6 +15,18 @@ class SampleParsedFile(ParsedFile):
         return f"parsed {content}"
 
 
+class SampleDictParsedFile(ParsedFile):
+    def _parse(self, content):
+        return {"foo": content, "bar": content}
+
+
+class SampleBinaryParsedFile(ParsedFile):
+    binary = True
+
+    def _parse(self, content):
+        return content
+
+
 class TestParsedFile:
     def test_parse(self, tmpfile):
         """ParsedFile.parse calls the parser with the file content."""
@@ -20,6 +35,24 @@ class TestParsedFile:
         parsed_file = SampleParsedFile(tmpfile)
         assert parsed_file.parse() == f"parsed {content}"
 
+    def test_parse_binary(self, tmpfile):
+        """If binary is set, the parser is called with bytes."""
+        tmpfile.write_bytes(b"some \xff content")
+        parsed_file = SampleBinaryParsedFile(tmpfile)
+        assert parsed_file.parse() == b"some \xff content"
+
+    def test_parse_keys(self, tmpfile):
+        """ParsedFile.parse can filter keys from parsed dicts."""
+        tmpfile.write_text("content")
+        parsed_file = SampleDictParsedFile(tmpfile)
+        assert parsed_file.parse(keys=["foo"]) == {"foo": "content"}
+
+    def test_parse_keys_not_dict(self, tmpfile):
+        """Keys are ignored if the file is not parsed to a dict."""
+        tmpfile.write_text("content")
+        parsed_file = SampleParsedFile(tmpfile)
+        assert parsed_file.parse(keys=["foo"]) == "parsed content"
+
     def test_parse_not_existent(self, tmpfile):
         """ParsedFile.parse returns None if file doesn't exist."""
         parsed_file = SampleParsedFile(tmpfile)
@@ -108,6 +141,124 @@ class TestSingleLineFile:
         single_line_file.fields = fields
         assert single_line_file.parse() == parsed
 
+    def test_parse_subclass_fields(self, tmpfile):
+        """Fields defined by subclasses are compiled once per class."""
+
+        class SampleFile(SingleLineFile):
+            fields = ("one", ("two", int))
+
+        tmpfile.write_text("foo 2")
+        sample_file = SampleFile(tmpfile)
+        assert SampleFile._compiled == (SampleFile.fields, mock.ANY)
+        assert sample_file.parse() == {"one": "foo", "two": 2}
+        assert "_compiled" not in sample_file.__dict__
+
+    def test_parse_subclass_fields_overridden(self, tmpfile):
+        """Fields overridden on an instance are compiled for it."""
+
+        class SampleFile(SingleLineFile):
+            fields = ("one", ("two", int))
+
+        tmpfile.write_text("foo 2")
+        sample_file = SampleFile(tmpfile)
+        sample_file.fields = (None, "two")
+        assert sample_file.parse() == {"two": "2"}
+        assert SampleFile(tmpfile).parse() == {"one": "foo", "two": 2}
+
+    def test_parse_binary_fields(self, single_line_file, tmpfile):
+        """If binary is set, only string fields are decoded."""
+        tmpfile.write_bytes(b"f\xc3\xb6o 2 4.5 \xff\nbar")
+        single_line_file.binary = True
+        single_line_file.fields = (
+            "one",
+            ("two", int),
+            ("three", float),
+            "four",
+        )
+        assert single_line_file.parse() == {
+            "one": "f\xf6o",
+            "two": 2,
+            "three": 4.5,
+            "four": "\ufffd",
+        }
+        assert single_line_file.parse(keys=["two"]) == {"two": 2}
+
+    def test_parse_binary_less_values(self, single_line_file, tmpfile):
+        """If binary is set, fields without a value are not included."""
+        tmpfile.write_bytes(b"foo")
+        single_line_file.binary = True
+        single_line_file.fields = ("one", ("two", int))
+        assert single_line_file.parse() == {"one": "foo"}
+
+    def test_parse_binary_no_fields(self, single_line_file, tmpfile):
+        """If binary is set, split values are decoded."""
+        tmpfile.write_bytes(b"foo|bar")
+        single_line_file.binary = True
+        single_line_file.separator = "|"
+        assert single_line_file.parse() == ["foo", "bar"]
+
+    def test_parse_binary_no_separator(self, single_line_file, tmpfile):
+        """If binary is set, content is decoded if not split."""
+        tmpfile.write_bytes(b"foo bar")
+        single_line_file.binary = True
+        single_line_file.separator = None
+        assert single_line_file.parse() == "foo bar"
+
+    def test_parse_keys(self, single_line_file, tmpfile):
+        """Only requested fields are returned."""
+        tmpfile.write_text("foo 2 bar")
+        single_line_file.fields = ("one", ("two", int), "three")
+        assert single_line_file.parse(keys=["two"]) == {"two": 2}
+        assert single_line_file.parse(keys=["one", "three"]) == {
+            "one": "foo",
+            "three": "bar",
+        }
+
+
+class TestCompileFields:
+    def test_values(self):
+        """The parser maps values to fields, converting their type."""
+        parse = compile_fields(("one", ("two", int), None, ("four", float)))
+        assert parse(["foo", "2", "bar", "4.5"]) == {
+            "one": "foo",
+            "two": 2,
+            "four": 4.5,
+        }
+
+    def test_extra_values(self):
+        """Values beyond defined fields are ignored."""
+        parse = compile_fields(("one", "two"))
+        assert parse(["foo", "bar", "baz"]) == {"one": "foo", "two": "bar"}
+
+    def test_less_values(self):
+        """Fields without a value are not included."""
+        parse = compile_fields(("one", ("two", int), "three"))
+        assert parse(["foo", "2"]) == {"one": "foo", "two": 2}
+
+    def test_conversion_error(self):
+        """Errors from converting values are raised."""
+        parse = compile_fields((("one", int),))
+        with pytest.raises(ValueError):
+            parse(["foo"])
+
+    def test_keys(self):
+        """Only fields for specified keys are included."""
+        parse = compile_fields(("one", ("two", int), "three"), keys=["two"])
+        assert parse(["foo", "2", "bar"]) == {"two": 2}
+        # values after the last requested field are not needed
+        assert parse(["foo", "2"]) == {"two": 2}
+        assert parse(["foo"]) == {}
+
+    def test_keys_none_found(self):
+        """If no field matches the keys, an empty dict is returned."""
+        parse = compile_fields(("one", "two"), keys=["other"])
+        assert parse(["foo", "bar"]) == {}
+
+    def test_quoted_keys(self):
+        """Field names are not interpreted as code."""
+        parse = compile_fields(("it's", 'say "hi"'))
+        assert parse(["foo", "bar"]) == {"it's": "foo", 'say "hi"': "bar"}
+
 
 class TestSplittedFile:
     @pytest.mark.parametrize(
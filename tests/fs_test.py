@@ -1,14 +1,160 @@
 from pathlib import PosixPath
+import resource
 
 import pytest
 
 from lxstats.fs import (
     Directory,
     File,
+    FileDescriptorCache,
     Path,
 )
 
 
+@pytest.fixture
+def fd_cache():
+    cache = FileDescriptorCache(max_fds=2)
+    yield cache
+    cache.clear()
+
+
+class TestFileDescriptorCache:
+    def test_max_fds_default(self, mocker):
+        """By default, up to half the limit for open files are kept open."""
+        mocker.patch(
+            "resource.getrlimit", return_value=(20000, resource.RLIM_INFINITY)
+        )
+        assert FileDescriptorCache().max_fds == 10000
+
+    @pytest.mark.parametrize("limit", [resource.RLIM_INFINITY, 1 << 30])
+    def test_max_fds_default_capped(self, mocker, limit):
+        """The default is capped if the limit is high or unlimited."""
+        mocker.patch("resource.getrlimit", return_value=(limit, limit))
+        assert FileDescriptorCache().max_fds == 1 << 19
+
+    def test_read(self, fd_cache, tmp_path):
+        """File content is read and the descriptor is kept open."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        assert fd_cache.read(path) == b"some content"
+        assert path in fd_cache
+        assert len(fd_cache) == 1
+
+    def test_reread(self, fd_cache, tmp_path):
+        """Content is reread from the beginning each time."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        fd_cache.read(path)
+        path.write_text("other content")
+        assert fd_cache.read(path) == b"other content"
+        assert len(fd_cache) == 1
+
+    def test_read_large(self, fd_cache, tmp_path):
+        """Files larger than the read size are fully read."""
+        path = tmp_path / "file"
+        content = b"x" * 100000
+        path.write_bytes(content)
+        assert fd_cache.read(path) == content
+
+    def test_max_fds(self, fd_cache, tmp_path):
+        """Least recently used descriptors are closed past the limit."""
+        paths = [tmp_path / name for name in ("foo", "bar", "baz")]
+        for path in paths:
+            path.write_text(path.name)
+        fd_cache.read(paths[0])
+        fd_cache.read(paths[1])
+        fd_cache.read(paths[0])
+        fd_cache.read(paths[2])
+        assert len(fd_cache) == 2
+        assert paths[0] in fd_cache
+        assert paths[1] not in fd_cache
+        assert paths[2] in fd_cache
+
+    def test_readinto(self, fd_cache, tmp_path):
+        """File content can be read into a buffer."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        buffer = bytearray(20)
+        assert fd_cache.readinto(path, buffer) == 12
+        assert buffer[:12] == b"some content"
+        assert path in fd_cache
+
+    def test_readinto_buffer_full(self, fd_cache, tmp_path):
+        """Content exceeding the buffer size is not read."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        buffer = bytearray(4)
+        assert fd_cache.readinto(path, buffer) == 4
+        assert buffer == b"some"
+
+    def test_readinto_error_evicts(self, fd_cache, tmp_path):
+        """If reading into a buffer fails, the descriptor is evicted."""
+        path = tmp_path / "dir"
+        path.mkdir()
+        with pytest.raises(IsADirectoryError):
+            fd_cache.readinto(path, bytearray(10))
+        assert path not in fd_cache
+
+    def test_read_error_evicts(self, fd_cache, tmp_path):
+        """If reading fails, the descriptor is evicted."""
+        path = tmp_path / "dir"
+        path.mkdir()
+        with pytest.raises(IsADirectoryError):
+            fd_cache.read(path)
+        assert path not in fd_cache
+
+    def test_evict(self, fd_cache, tmp_path):
+        """A path can be evicted from the cache."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        fd_cache.read(path)
+        fd_cache.evict(path)
+        assert len(fd_cache) == 0
+
+    def test_evict_directory(self, fd_cache, tmp_path):
+        """Evicting a directory evicts files under it."""
+        (tmp_path / "dir1").mkdir()
+        (tmp_path / "dir2").mkdir()
+        path1 = tmp_path / "dir1" / "file"
+        path1.write_text("foo")
+        path2 = tmp_path / "dir2" / "file"
+        path2.write_text("bar")
+        fd_cache.read(path1)
+        fd_cache.read(path2)
+        fd_cache.evict(tmp_path / "dir1")
+        assert path1 not in fd_cache
+        assert path2 in fd_cache
+
+    def test_evict_nested(self, tmp_path):
+        """Evicting a directory evicts files in its subdirectories."""
+        fd_cache = FileDescriptorCache(max_fds=10)
+        paths = [
+            tmp_path / "1" / "stat",
+            tmp_path / "1" / "task" / "1" / "stat",
+            tmp_path / "1" / "task" / "2" / "stat",
+            tmp_path / "2" / "task" / "2" / "stat",
+        ]
+        for path in paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("content")
+            fd_cache.read(path)
+        fd_cache.evict(tmp_path / "1")
+        assert len(fd_cache) == 1
+        assert paths[3] in fd_cache
+        fd_cache.evict(tmp_path / "2" / "task")
+        assert len(fd_cache) == 0
+        # directories for closed files are no longer tracked
+        assert not fd_cache._children
+
+    def test_clear(self, fd_cache, tmp_path):
+        """All descriptors can be closed."""
+        path = tmp_path / "file"
+        path.write_text("some content")
+        fd_cache.read(path)
+        fd_cache.clear()
+        assert len(fd_cache) == 0
+
+
 @pytest.fixture
 def posix_path(tmpdir):
     yield PosixPath(tmpdir / "somefile")
@@ -57,11 +203,65 @@ class TestFile:
         posix_path.write_text("some content")
         assert file.read() == "some content"
 
+    def test_read_large(self, file, posix_path):
+        """Files larger than the read buffer are fully read."""
+        content = b"x" * 100000
+        posix_path.write_bytes(content)
+        assert file.read_bytes() == content
+
+    def test_read_bytes(self, file, posix_path):
+        """File content can be read as bytes."""
+        posix_path.write_bytes(b"some content \xff")
+        assert file.read_bytes() == b"some content \xff"
+
+    def test_readinto(self, file, posix_path):
+        """File content can be read into a buffer."""
+        posix_path.write_text("some content")
+        buffer = bytearray(20)
+        assert file.readinto(buffer) == 12
+        assert buffer[:12] == b"some content"
+
+    def test_readinto_buffer_full(self, file, posix_path):
+        """Content exceeding the buffer size is not read."""
+        posix_path.write_text("some content")
+        buffer = bytearray(4)
+        assert file.readinto(buffer) == 4
+        assert buffer == b"some"
+
     def test_write(self, file, posix_path):
         """Content can be written to file."""
         file.write("some content")
         assert posix_path.read_text() == "some content"
 
+    def test_read_fd_cache(self, fd_cache, posix_path):
+        """If a descriptor cache is used, the file is read through it."""
+        posix_path.write_text("some content")
+        file = File(posix_path, fd_cache=fd_cache)
+        assert file.read() == "some content"
+        assert posix_path in fd_cache
+
+    def test_readinto_fd_cache(self, fd_cache, posix_path):
+        """If a descriptor cache is used, the file is read through it."""
+        posix_path.write_text("some content")
+        file = File(posix_path, fd_cache=fd_cache)
+        buffer = bytearray(20)
+        assert file.readinto(buffer) == 12
+        assert buffer[:12] == b"some content"
+        assert posix_path in fd_cache
+
+    def test_exists_fd_cache(self, fd_cache, posix_path):
+        """Files with a cached descriptor are assumed to exist."""
+        posix_path.write_text("some content")
+        file = File(posix_path, fd_cache=fd_cache)
+        file.read()
+        posix_path.unlink()
+        assert file.exists
+
+    def test_exists_fd_cache_not_cached(self, fd_cache, posix_path):
+        """Existence of files not in the cache is checked."""
+        file = File(posix_path, fd_cache=fd_cache)
+        assert not file.exists
+
 
 @pytest.fixture
 def dir(tmpdir, posix_path):
@@ -130,6 +330,89 @@ class TestDirectory:
         # The file is accessible through the tree
         assert dir["subdir"]["foo"].read() == "foo text"
 
+    def test_get_file_fd_cache(self, fd_cache, posix_path):
+        """The descriptor cache is passed to files in the directory."""
+        posix_path.mkdir()
+        dir = Directory(posix_path, fd_cache=fd_cache)
+        dir.files = {"foo": File}
+        (posix_path / "foo").write_text("foo text")
+        assert dir["foo"].read() == "foo text"
+        assert posix_path / "foo" in fd_cache
+
+    def test_open(self, dir, posix_path):
+        """The directory can be opened and closed."""
+        assert not dir.is_open
+        dir.open()
+        assert dir.is_open
+        dir.close()
+        assert not dir.is_open
+
+    def test_close_not_open(self, dir):
+        """Closing a directory that's not open is a no-op."""
+        dir.close()
+        assert not dir.is_open
+
+    def test_context_manager(self, dir):
+        """The directory is open when used as context manager."""
+        with dir as opened:
+            assert opened is dir
+            assert dir.is_open
+        assert not dir.is_open
+
+    def test_open_list(self, dir, posix_path):
+        """Names are listed via the directory descriptor when open."""
+        (posix_path / "foo").touch()
+        (posix_path / "baz").touch()
+        with dir:
+            assert dir.list() == ["foo"]
+            assert sorted(dir.listdir()) == ["baz", "foo"]
+
+    def test_open_get_file(self, dir, posix_path):
+        """Files are read relative to the directory descriptor when open."""
+        (posix_path / "foo").write_text("foo text")
+        with dir:
+            file_item = dir["foo"]
+            assert file_item.exists
+            assert file_item.readable
+            assert file_item.writable
+            # the directory is replaced after opening
+            posix_path.rename(posix_path.with_name("other"))
+            posix_path.mkdir()
+            (posix_path / "foo").write_text("new text")
+            assert file_item.read() == "foo text"
+
+    def test_open_get_file_not_existing(self, dir):
+        """Accessing a file that doesn't exist raises an error when open."""
+        with dir, pytest.raises(KeyError):
+            dir["foo"]
+
+    def test_open_fd_cache_not_used(self, fd_cache, posix_path):
+        """The descriptor cache is not used when the directory is open."""
+        posix_path.mkdir()
+        dir = Directory(posix_path, fd_cache=fd_cache)
+        dir.files = {"foo": File}
+        (posix_path / "foo").write_text("foo text")
+        with dir:
+            file_item = dir["foo"]
+            assert file_item.read() == "foo text"
+            assert file_item.exists
+            buffer = bytearray(3)
+            assert file_item.readinto(buffer) == 3
+            assert buffer == b"foo"
+        assert len(fd_cache) == 0
+
+    def test_open_subdirectory(self, dir, posix_path):
+        """Sub-directories are opened relative to the parent descriptor."""
+
+        class SubDirectory(Directory):
+            files = {"foo": File}
+
+        dir.files = {"subdir": SubDirectory}
+        (posix_path / "subdir").mkdir()
+        (posix_path / "subdir" / "foo").write_text("foo text")
+        with dir, dir["subdir"] as subdir:
+            assert subdir["foo"].read() == "foo text"
+
     def test_join(self, dir, posix_path):
         """It's possible to join a path with the Directory one."""
         assert dir.join("append", "path") == posix_path / "append" / "path"
@@ -0,0 +1,78 @@
+import subprocess
+import sys
+
+import pytest
+
+from lxstats import process
+from lxstats.files import proc
+from lxstats.files.proc.system import ProcDirectory
+from lxstats.process.collection import Collector
+
+# Modules that are slow to import, and not needed to start procs
+SLOW_MODULES = frozenset(
+    (
+        "asyncio",
+        "concurrent.futures",
+        "csv",
+        "json",
+        "multiprocessing",
+        "prettytable",
+        "tempfile",
+    )
+)
+
+
+def import_times(module):
+    """Return a dict mapping imported modules to their cumulative time.
+
+    Times are reported by ``python -X importtime``, in microseconds.
+
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImports:
+    def test_procs_slow_modules(self):
+        """Slow modules are not imported by the procs script."""
+        times = import_times("lxstats.scripts.procs")
+        assert "lxstats.scripts.procs" in times
+        assert not SLOW_MODULES & set(times)
+
+
+class TestLazyAttributes:
+    def test_process(self):
+        """Classes are available from the lxstats.process package."""
+        assert process.Collector is Collector
+
+    def test_proc(self):
+        """Classes are available from the lxstats.files.proc package."""
+        assert proc.ProcDirectory is ProcDirectory
+
+    @pytest.mark.parametrize("module", [process, proc])
+    def test_unknown(self, module):
+        """An error is raised for unknown attributes."""
+        with pytest.raises(AttributeError):
+            module.Unknown
+
+    @pytest.mark.parametrize(
+        "module,name", [(process, "Process"), (proc, "ProcMeminfo")]
+    )
+    def test_dir(self, module, name):
+        """Lazily-loaded attributes are listed."""
+        assert name in dir(module)
+
+    def test_cached(self):
+        """Attributes are set in the package once imported."""
+        process.Collection
+        assert "Collection" in vars(process)
@@ -0,0 +1,232 @@
+from datetime import datetime
+import os
+import pickle
+
+import pytest
+
+from lxstats.process.cache import (
+    DiskCache,
+    STATIC_FILES,
+    StaticFilesCache,
+)
+
+
+@pytest.fixture
+def cache():
+    cache = StaticFilesCache(ttl={"cgroup": 10})
+    cache._clock = lambda: 100
+    yield cache
+
+
+class TestStaticFilesCache:
+    def test_files(self):
+        """Static files are cached by default, other files can be set."""
+        assert StaticFilesCache().files == STATIC_FILES
+        assert StaticFilesCache(files=["comm"]).files == {"comm"}
+
+    def test_get_set(self, cache):
+        """Content for a file can be cached."""
+        cache.set(10, 1000, "cmdline", ["foo", "bar"])
+        assert cache.get(10, 1000, "cmdline") == ["foo", "bar"]
+        assert 10 in cache
+        assert len(cache) == 1
+
+    def test_get_not_cached(self, cache):
+        """The default is returned for content not in the cache."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        assert cache.get(20, 1000, "cmdline") is None
+        assert cache.get(10, 1000, "environ", "default") == "default"
+
+    def test_get_different_starttime(self, cache):
+        """Content for a reused PID is not returned."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        assert cache.get(10, 2000, "cmdline") is None
+
+    def test_set_different_starttime(self, cache):
+        """Content for a previous process with the same PID is dropped."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        cache.set(10, 1000, "environ", {"FOO": "bar"})
+        cache.set(10, 2000, "cmdline", ["bar"])
+        assert cache.get(10, 2000, "cmdline") == ["bar"]
+        assert cache.get(10, 1000, "environ") is None
+        assert cache.get(10, 2000, "environ") is None
+
+    def test_ttl(self, cache):
+        """Content for files with a TTL expires."""
+        cache.set(10, 1000, "cgroup", {0: "/"})
+        cache.set(10, 1000, "cmdline", ["foo"])
+        cache._clock = lambda: 109
+        assert cache.get(10, 1000, "cgroup") == {0: "/"}
+        cache._clock = lambda: 110
+        assert cache.get(10, 1000, "cgroup") is None
+        assert cache.get(10, 1000, "cmdline") == ["foo"]
+
+    def test_evict(self, cache):
+        """Content for a process can be evicted."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        cache.set(20, 1000, "cmdline", ["bar"])
+        cache.evict(10)
+        cache.evict(30)
+        assert 10 not in cache
+        assert 20 in cache
+
+    def test_clear(self, cache):
+        """All content can be dropped."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_entries_load(self, cache):
+        """Cached entries can be returned and loaded in another cache."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        cache.set(10, 1000, "environ", {"FOO": "bar"})
+        new_cache = StaticFilesCache()
+        new_cache.load(cache.entries())
+        assert new_cache.get(10, 1000, "cmdline") == ["foo"]
+        assert new_cache.get(10, 1000, "environ") == {"FOO": "bar"}
+
+    def test_entries_limit(self, cache):
+        """Entries can be limited to the lowest PIDs."""
+        for pid in (30, 10, 20):
+            cache.set(pid, 1000, "cmdline", ["foo"])
+        assert list(cache.entries(limit=2)) == [10, 20]
+
+
+@pytest.fixture
+def boot_id_file(tmp_path):
+    path = tmp_path / "boot_id"
+    path.write_text("abcd\n")
+    yield path
+
+
+@pytest.fixture
+def disk_cache(tmp_path, boot_id_file):
+    disk_cache = DiskCache(tmp_path / "cache" / "procs.cache")
+    disk_cache._boot_id_file = boot_id_file
+    yield disk_cache
+
+
+@pytest.fixture
+def samples():
+    yield {10: (datetime(2020, 1, 1), 100.0, {"stat.utime": 10})}
+
+
+class TestDiskCache:
+    def test_save_load(self, disk_cache, cache, samples):
+        """Static files content and samples are saved and loaded."""
+        cache.set(10, 1000, "cmdline", ["foo", "bar"])
+        disk_cache.save(cache, samples)
+        new_cache = StaticFilesCache()
+        assert disk_cache.load(new_cache) == samples
+        assert new_cache.get(10, 1000, "cmdline") == ["foo", "bar"]
+
+    def test_save_permissions(self, disk_cache, cache):
+        """The cache file and its directory are only accessible to the user."""
+        disk_cache.save(cache, {})
+        assert disk_cache.path.stat().st_mode & 0o777 == 0o600
+        assert disk_cache.path.parent.stat().st_mode & 0o777 == 0o700
+
+    def test_save_replace(self, disk_cache, cache, samples):
+        """The cache file is replaced, no temporary file is left."""
+        disk_cache.save(cache, samples)
+        disk_cache.save(cache, {})
+        assert disk_cache.load(cache) == {}
+        assert os.listdir(disk_cache.path.parent) == ["procs.cache"]
+
+    def test_save_error(self, disk_cache, cache, mocker):
+        """On error, the temporary file is removed."""
+        mocker.patch("os.replace", side_effect=OSError)
+        with pytest.raises(OSError):
+            disk_cache.save(cache, {})
+        assert os.listdir(disk_cache.path.parent) == []
+
+    def test_save_max_processes(self, disk_cache, cache):
+        """Data is saved for at most the maximum number of processes."""
+        disk_cache.max_processes = 2
+        for pid in (10, 20, 30):
+            cache.set(pid, 1000, "cmdline", ["foo"])
+        samples = {
+            pid: (datetime(2020, 1, 1), 100.0, {}) for pid in (10, 20, 30)
+        }
+        disk_cache.save(cache, samples)
+        new_cache = StaticFilesCache()
+        assert list(disk_cache.load(new_cache)) == [10, 20]
+        assert 30 not in new_cache
+
+    def test_load_no_file(self, disk_cache, cache):
+        """If the file doesn't exist, no data is loaded."""
+        assert disk_cache.load(cache) == {}
+        assert len(cache) == 0
+
+    @pytest.mark.parametrize(
+        "content",
+        [b"", b"garbage", pickle.dumps([1, 2]), pickle.dumps({"version": 0})],
+    )
+    def test_load_invalid(self, disk_cache, cache, content):
+        """Invalid content is ignored."""
+        disk_cache.path.parent.mkdir()
+        disk_cache.path.write_bytes(content)
+        assert disk_cache.load(cache) == {}
+
+    @pytest.mark.parametrize(
+        "static,samples",
+        [
+            ([], {}),
+            ({}, None),
+            ({"10": (1000, {})}, {}),
+            ({10: (1000, {}, 0)}, {}),
+            ({10: ("1000", {})}, {}),
+            ({10: (1000, {"cmdline": ["foo"]})}, {}),
+            ({10: (1000, {"cmdline": ("soon", ["foo"])})}, {}),
+            ({}, {10: (datetime(2020, 1, 1), 100.0)}),
+            ({}, {10: ("2020-01-01", 100.0, {})}),
+            ({}, {10: (datetime(2020, 1, 1), "100", {})}),
+            ({}, {10: (datetime(2020, 1, 1), 100.0, [])}),
+            ({}, {10: (datetime(2020, 1, 1), 100.0, {1: 2})}),
+        ],
+    )
+    def test_load_invalid_data(self, disk_cache, cache, static, samples):
+        """Data with an invalid structure is ignored."""
+        disk_cache.path.parent.mkdir()
+        disk_cache.path.write_bytes(
+            pickle.dumps(
+                {
+                    "version": 1,
+                    "boot_id": "abcd",
+                    "static": static,
+                    "samples": samples,
+                }
+            )
+        )
+        assert disk_cache.load(cache) == {}
+        assert len(cache) == 0
+
+    def test_load_no_monotonic(self, disk_cache, cache):
+        """Samples and entries without expiry are valid."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        samples = {10: (datetime(2020, 1, 1), None, {"stat.utime": 1})}
+        disk_cache.save(cache, samples)
+        assert disk_cache.load(StaticFilesCache()) == samples
+
+    def test_load_unsafe(self, disk_cache, cache):
+        """Content referencing arbitrary types is not loaded."""
+        disk_cache.path.parent.mkdir()
+        disk_cache.path.write_bytes(pickle.dumps({"obj": StaticFilesCache()}))
+        assert disk_cache.load(cache) == {}
+
+    def test_load_different_boot(
+        self, disk_cache, cache, samples, boot_id_file
+    ):
+        """Data saved during a different boot is ignored."""
+        cache.set(10, 1000, "cmdline", ["foo"])
+        disk_cache.save(cache, samples)
+        boot_id_file.write_text("efgh\n")
+        new_cache = StaticFilesCache()
+        assert disk_cache.load(new_cache) == {}
+        assert len(new_cache) == 0
+
+    def test_load_no_boot_id(self, disk_cache, cache, samples, tmp_path):
+        """If the boot ID is not available, data is still saved."""
+        disk_cache._boot_id_file = tmp_path / "not-here"
+        disk_cache.save(cache, samples)
+        assert disk_cache.load(cache) == samples
@@ -1,13 +1,26 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 import random
+import threading
+import time
 
 import pytest
 
+from lxstats.fs import FileDescriptorCache
 from lxstats.process import Process
+from lxstats.process.cache import StaticFilesCache
 from lxstats.process.collection import (
+    _collect_shard,
+    AsyncCollector,
     Collection,
     Collector,
+    IncrementalCollector,
+    ParallelCollector,
+    ShardedCollector,
 )
+from lxstats.process.filter import CommandNameFilter
 
 
 @pytest.fixture
@@ -15,6 +28,31 @@ def pids():
     yield [10, 20, 30]
 
 
+class CommFilter:
+    """A filter on the process comm, recording stats available to it."""
+
+    stats = ("comm",)
+
+    def __init__(self, comm):
+        self.comm = comm
+        self.available_stats = {}
+
+    def __call__(self, process):
+        self.available_stats[process.pid] = process.available_stats()
+        return process.get("comm") == self.comm
+
+
+# Content of a stat file with a start time
+STAT_CONTENT = " ".join(["10", "(foo)", "S"] + ["1"] * 41)
+
+
+@pytest.fixture
+def comm_filter(proc_dir, pids):
+    for pid, comm in zip(pids, ["foo", "bar", "foo"]):
+        (proc_dir / str(pid) / "comm").write_text(comm)
+    yield CommFilter("foo")
+
+
 @pytest.fixture
 def processes_cmdline(pids, make_process_dir):
     for pid in pids:
@@ -49,6 +87,508 @@ class TestCollector:
         collector = Collector(proc=proc_dir, pids=(10, 50))
         assert [process.pid for process in collector.collect()] == [10]
 
+    def test_collector_with_stats(self, proc_dir):
+        """If stats are provided, only files for those stats are read."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = Collector(proc=proc_dir, pids=(10,), stats=["comm"])
+        [process] = collector.collect()
+        assert process.available_stats() == ["comm"]
+
+    def test_collector_prefilter(self, proc_dir, comm_filter):
+        """Only stats needed by the prefilter are collected before it."""
+        collector = Collector(proc=proc_dir)
+        processes = list(collector.collect(prefilter=comm_filter))
+        assert sorted(process.pid for process in processes) == [10, 30]
+        assert comm_filter.available_stats == {
+            10: ["comm"],
+            20: ["comm"],
+            30: ["comm"],
+        }
+        assert all(
+            process.available_stats() == ["cmdline", "comm"]
+            for process in processes
+        )
+
+    def test_collector_prefilter_with_stats(self, proc_dir, comm_filter):
+        """Stats needed by the prefilter are kept with requested ones."""
+        collector = Collector(proc=proc_dir, pids=(10,), stats=["cmdline"])
+        [process] = collector.collect(prefilter=comm_filter)
+        assert process.available_stats() == ["cmdline", "comm"]
+
+    def test_collector_use_dir_fd(self, proc_dir):
+        """Process files can be read relative to the process directory."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = Collector(proc=proc_dir, pids=(10,), use_dir_fd=True)
+        [process] = collector.collect()
+        assert process.get("comm") == "foo"
+
+    def test_collector_compact(self, proc_dir):
+        """Processes can store stats in compact form."""
+        (proc_dir / "10" / "statm").write_text("1 2 3 4 5 6 7")
+        collector = Collector(proc=proc_dir, pids=(10,), compact=True)
+        [process] = collector.collect()
+        assert process._compact
+        assert process.get("statm.size") == 1
+
+    def test_collector_lazy(self, proc_dir):
+        """Processes can read files when stats are accessed."""
+        (proc_dir / "10" / "statm").write_text("1 2 3 4 5 6 7")
+        collector = Collector(proc=proc_dir, pids=(10,), lazy=True)
+        [process] = collector.collect()
+        assert process._read_files == {}
+        assert process.get("statm.size") == 1
+
+    def test_collector_lazy_prefilter(self, proc_dir, comm_filter):
+        """Files needed by the prefilter are read when it's called."""
+        collector = Collector(proc=proc_dir, lazy=True)
+        processes = list(collector.collect(prefilter=comm_filter))
+        assert sorted(process.pid for process in processes) == [10, 30]
+        assert all(
+            process._read_files == {"comm": None} for process in processes
+        )
+
+    def test_collector_static_cache(self, proc_dir):
+        """Static files are read through the cache, if passed."""
+        cache = StaticFilesCache()
+        (proc_dir / "10" / "stat").write_text(STAT_CONTENT)
+        (proc_dir / "10" / "cmdline").write_text("foo")
+        collector = Collector(proc=proc_dir, pids=(10,), static_cache=cache)
+        [process] = collector.collect()
+        assert process.get("cmdline") == ["foo"]
+        assert 10 in cache
+
+    def test_collector_static_cache_evict(self, proc_dir):
+        """Cached content for processes no longer found is evicted."""
+        cache = StaticFilesCache()
+        (proc_dir / "10" / "stat").write_text(STAT_CONTENT)
+        collector = Collector(proc=proc_dir, static_cache=cache)
+        list(collector.collect())
+        remove_process_dir(proc_dir, 10)
+        list(collector.collect())
+        assert 10 not in cache
+
+    def test_collector_fd_cache(self, proc_dir):
+        """Files are read through the descriptor cache, if passed."""
+        fd_cache = FileDescriptorCache()
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = Collector(proc=proc_dir, pids=(10,), fd_cache=fd_cache)
+        [process] = collector.collect()
+        assert process.get("comm") == "foo"
+        assert proc_dir / "10" / "comm" in fd_cache
+        fd_cache.clear()
+
+    def test_collector_fd_cache_evict(self, proc_dir):
+        """Descriptors for processes no longer found are evicted."""
+        fd_cache = FileDescriptorCache()
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = Collector(proc=proc_dir, fd_cache=fd_cache)
+        list(collector.collect())
+        (proc_dir / "10" / "comm").unlink()
+        (proc_dir / "10" / "cmdline").unlink()
+        (proc_dir / "10").rmdir()
+        list(collector.collect())
+        assert proc_dir / "10" / "comm" not in fd_cache
+        fd_cache.clear()
+
+
+def remove_process_dir(proc_dir, pid):
+    pid_dir = proc_dir / str(pid)
+    for path in pid_dir.iterdir():
+        path.unlink()
+    pid_dir.rmdir()
+
+
+@pytest.mark.usefixtures("processes_cmdline")
+class TestIncrementalCollector:
+    def test_collect_scan(self, proc_dir, pids):
+        """The IncrementalCollector returns Processes for all PIDs."""
+        (proc_dir / "self").mkdir()
+        collector = IncrementalCollector(proc=proc_dir)
+        assert [process.pid for process in collector.collect()] == pids
+
+    def test_collect_with_pids(self, proc_dir):
+        """If PIDs are provided, only those are included."""
+        collector = IncrementalCollector(proc=proc_dir, pids=(30, 10))
+        assert [process.pid for process in collector.collect()] == [10, 30]
+
+    def test_collect_static_cache_evict(self, proc_dir):
+        """Cached content for exited processes is evicted."""
+        cache = StaticFilesCache()
+        (proc_dir / "10" / "stat").write_text(STAT_CONTENT)
+        collector = IncrementalCollector(proc=proc_dir, static_cache=cache)
+        list(collector.collect())
+        assert 10 in cache
+        remove_process_dir(proc_dir, 10)
+        list(collector.collect())
+        assert 10 not in cache
+
+    def test_collect_lazy(self, proc_dir):
+        """Processes can read files when stats are accessed."""
+        collector = IncrementalCollector(proc=proc_dir, pids=(10,), lazy=True)
+        [process] = collector.collect()
+        assert process._lazy
+
+    def test_collect_compact(self, proc_dir):
+        """Processes can store stats in compact form."""
+        collector = IncrementalCollector(
+            proc=proc_dir, pids=(10,), compact=True
+        )
+        [process] = collector.collect()
+        assert process._compact
+
+    def test_samples(self, proc_dir):
+        """Last samples for collected processes are returned."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = IncrementalCollector(proc=proc_dir, pids=(10, 20))
+        [process, _] = collector.collect()
+        samples = collector.samples()
+        assert samples[10] == (
+            process.timestamp,
+            process.monotonic,
+            process.stats(),
+        )
+
+    def test_samples_not_collected(self, proc_dir):
+        """Processes without a sample are not included."""
+        collector = IncrementalCollector(proc=proc_dir, pids=(10,))
+        list(collector.collect())
+        collector._processes[10]._reset()
+        assert collector.samples() == {}
+
+    def test_load_samples(self, proc_dir):
+        """Loaded samples are used for rates on the first collection."""
+        (proc_dir / "10" / "stat").write_text(STAT_CONTENT)
+        (proc_dir / "10" / "io").write_text("read_bytes: 300")
+        collector = IncrementalCollector(proc=proc_dir, pids=(10,))
+        collector.load_samples(
+            {
+                10: (
+                    datetime.utcnow(),
+                    time.monotonic() - 1,
+                    {"io.read_bytes": 100, "stat.starttime": 1},
+                )
+            }
+        )
+        [process] = collector.collect()
+        assert process.get("io.read_bytes_per_sec") == pytest.approx(
+            200.0, rel=0.1
+        )
+
+    def test_collect_reuse_processes(self, proc_dir):
+        """Processes are reused across collections."""
+        collector = IncrementalCollector(proc=proc_dir)
+        first = list(collector.collect())
+        second = list(collector.collect())
+        assert all(
+            process1 is process2 for process1, process2 in zip(first, second)
+        )
+
+    def test_collect_updates_stats(self, proc_dir):
+        """Stats for reused processes are collected again."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = IncrementalCollector(proc=proc_dir, pids=(10,))
+        [process] = collector.collect()
+        (proc_dir / "10" / "comm").write_text("bar")
+        [process] = collector.collect()
+        assert process.get("comm") == "bar"
+
+    def test_started_exited(self, proc_dir, make_process_dir):
+        """Started and exited processes are tracked."""
+        collector = IncrementalCollector(proc=proc_dir)
+        list(collector.collect())
+        assert collector.started == {10, 20, 30}
+        assert collector.exited == set()
+        remove_process_dir(proc_dir, 20)
+        make_process_dir(40)
+        assert [process.pid for process in collector.collect()] == [
+            10,
+            30,
+            40,
+        ]
+        assert collector.started == {40}
+        assert collector.exited == {20}
+        list(collector.collect())
+        assert collector.started == set()
+        assert collector.exited == set()
+
+    def test_exited_during_collection(self, proc_dir):
+        """Processes exiting during collection are tracked as exited."""
+        collector = IncrementalCollector(proc=proc_dir, pids=(10, 20))
+        list(collector.collect())
+        remove_process_dir(proc_dir, 20)
+        assert [process.pid for process in collector.collect()] == [10]
+        assert collector.exited == {20}
+        assert collector._processes.keys() == {10}
+
+    def test_non_existing(self, proc_dir):
+        """Non-existing processes are not tracked as started or exited."""
+        collector = IncrementalCollector(proc=proc_dir, pids=(10, 50))
+        assert [process.pid for process in collector.collect()] == [10]
+        assert collector.started == {10}
+        assert collector.exited == set()
+
+    def test_collect_prefilter(self, proc_dir, comm_filter):
+        """Processes not matching the prefilter are skipped."""
+        collector = IncrementalCollector(proc=proc_dir)
+        processes = list(collector.collect(prefilter=comm_filter))
+        assert [process.pid for process in processes] == [10, 30]
+        assert collector.exited == set()
+        list(collector.collect(prefilter=comm_filter))
+        assert collector.started == set()
+        assert collector.exited == set()
+
+    def test_fd_cache_evict(self, proc_dir):
+        """Descriptors for exited processes are evicted."""
+        fd_cache = FileDescriptorCache()
+        collector = IncrementalCollector(proc=proc_dir, fd_cache=fd_cache)
+        list(collector.collect())
+        remove_process_dir(proc_dir, 10)
+        list(collector.collect())
+        assert proc_dir / "10" / "cmdline" not in fd_cache
+        assert len(fd_cache) == 2
+        fd_cache.clear()
+
+
+@pytest.mark.usefixtures("processes_cmdline")
+class TestParallelCollector:
+    def test_collect_scan(self, proc_dir, pids):
+        """The ParallelCollector returns Processes for all PIDs."""
+        collector = ParallelCollector(proc=proc_dir, workers=2)
+        assert sorted(process.pid for process in collector.collect()) == pids
+
+    def test_collect_ordered(self, proc_dir):
+        """By default, processes are yielded in PID order."""
+        collector = ParallelCollector(
+            proc=proc_dir, pids=(30, 10, 20), workers=3, max_pending=2
+        )
+        assert [process.pid for process in collector.collect()] == [
+            10,
+            20,
+            30,
+        ]
+
+    def test_collect_unordered(self, proc_dir, pids):
+        """Processes can be yielded as they're collected."""
+        collector = ParallelCollector(
+            proc=proc_dir, ordered=False, max_pending=1
+        )
+        assert sorted(process.pid for process in collector.collect()) == pids
+
+    def test_collect_with_stats(self, proc_dir):
+        """Only requested stats are collected."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = ParallelCollector(
+            proc=proc_dir, pids=(10,), stats=["comm"]
+        )
+        [process] = collector.collect()
+        assert process.available_stats() == ["comm"]
+
+    def test_collect_skip_non_existing(self, proc_dir):
+        """Non-existing processes are skipped."""
+        collector = ParallelCollector(
+            proc=proc_dir, pids=(10, 50), ordered=False
+        )
+        assert [process.pid for process in collector.collect()] == [10]
+
+    def test_collect_fd_cache_evict(self, proc_dir):
+        """Descriptors for processes no longer found are evicted."""
+        fd_cache = FileDescriptorCache()
+        collector = ParallelCollector(proc=proc_dir, fd_cache=fd_cache)
+        list(collector.collect())
+        assert proc_dir / "10" / "cmdline" in fd_cache
+        (proc_dir / "10" / "cmdline").unlink()
+        (proc_dir / "10").rmdir()
+        list(collector.collect())
+        assert len(fd_cache) == 2
+        assert proc_dir / "10" / "cmdline" not in fd_cache
+        fd_cache.clear()
+
+    def test_collect_prefilter(self, proc_dir, comm_filter):
+        """Processes not matching the prefilter are skipped."""
+        collector = ParallelCollector(proc=proc_dir, pids=(10, 20, 30))
+        processes = list(collector.collect(prefilter=comm_filter))
+        assert [process.pid for process in processes] == [10, 30]
+
+    def test_collect_reuse_processes(self, proc_dir):
+        """Processes are reused across collections."""
+        collector = ParallelCollector(proc=proc_dir, workers=2)
+        first = list(collector.collect())
+        second = list(collector.collect())
+        assert all(
+            process1 is process2 for process1, process2 in zip(first, second)
+        )
+
+    def test_collect_rates(self, proc_dir):
+        """Rates are available from the second collection."""
+        (proc_dir / "10" / "stat").write_text(STAT_CONTENT)
+        (proc_dir / "10" / "io").write_text("read_bytes: 100")
+        collector = ParallelCollector(proc=proc_dir, pids=(10,), workers=2)
+        [process] = collector.collect()
+        assert process.get("io.read_bytes_per_sec") is None
+        (proc_dir / "10" / "io").write_text("read_bytes: 300")
+        [process] = collector.collect()
+        assert process.get("io.read_bytes_per_sec") > 0
+
+    def test_samples(self, proc_dir):
+        """Last samples for collected processes are returned."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        collector = ParallelCollector(proc=proc_dir, pids=(10,), workers=2)
+        [process] = collector.collect()
+        assert collector.samples() == {
+            10: (process.timestamp, process.monotonic, process.stats())
+        }
+
+    def test_collect_stop_early(self, proc_dir):
+        """Iteration can be stopped before all processes are collected."""
+        collector = ParallelCollector(proc=proc_dir, pids=(10, 20, 30))
+        iterator = collector.collect()
+        assert next(iterator).pid == 10
+        iterator.close()
+
+
+@pytest.mark.usefixtures("processes_cmdline")
+class TestShardedCollector:
+    def test_collect_scan(self, proc_dir, pids):
+        """The ShardedCollector returns Processes for all PIDs."""
+        collector = ShardedCollector(proc=proc_dir, workers=2)
+        assert [process.pid for process in collector.collect()] == pids
+
+    def test_collect_with_pids(self, proc_dir):
+        """If PIDs are provided, only those are included, in order."""
+        collector = ShardedCollector(
+            proc=proc_dir, pids=(30, 10), workers=2, shard_size=1
+        )
+        assert [process.pid for process in collector.collect()] == [10, 30]
+
+    def test_collect_stats(self, proc_dir):
+        """Stats collected by workers are loaded in processes."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        (proc_dir / "20" / "comm").write_text("bar")
+        collector = ShardedCollector(
+            proc=proc_dir, pids=(10, 20), stats=["comm"], workers=1
+        )
+        processes = list(collector.collect())
+        assert [process.stats() for process in processes] == [
+            {"comm": "foo"},
+            {"comm": "bar"},
+        ]
+        assert all(process.timestamp for process in processes)
+
+    def test_collect_compact(self, proc_dir):
+        """Stats can be loaded in compact form."""
+        (proc_dir / "10" / "statm").write_text("1 2 3 4 5 6 7")
+        collector = ShardedCollector(
+            proc=proc_dir, pids=(10,), stats=["statm.size"], compact=True
+        )
+        [process] = collector.collect()
+        assert process._compact
+        assert process.stats() == {"statm.size": 1}
+
+    def test_collect_prefilter(self, proc_dir, comm_filter):
+        """Processes not matching the prefilter are skipped."""
+        collector = ShardedCollector(proc=proc_dir, workers=1)
+        processes = list(collector.collect(prefilter=CommandNameFilter("foo")))
+        assert [process.pid for process in processes] == [10, 30]
+
+    def test_collect_no_processes(self, tmp_path):
+        """If no process is found, nothing is returned."""
+        collector = ShardedCollector(proc=tmp_path)
+        assert list(collector.collect()) == []
+
+    def test_collect_shard(self, proc_dir):
+        """Stats for a shard are returned in compact form."""
+        (proc_dir / "10" / "comm").write_text("foo")
+        (proc_dir / "20" / "comm").write_text("bar")
+        keys, rows = _collect_shard(proc_dir, [10, 20, 50], None, False)
+        assert keys == ["cmdline", "comm"]
+        assert [
+            (pid, key_ids, values) for pid, _, key_ids, values in rows
+        ] == [
+            (10, (0, 1), ([], "foo")),
+            (20, (0, 1), ([], "bar")),
+        ]
+
+
+async def alist(iterable):
+    return [item async for item in iterable]
+
+
+@pytest.mark.usefixtures("processes_cmdline")
+class TestAsyncCollector:
+    def test_acollect_scan(self, proc_dir, pids):
+        """The AsyncCollector returns Processes for all PIDs."""
+        collector = AsyncCollector(proc=proc_dir)
+        processes = asyncio.run(alist(collector.acollect()))
+        assert sorted(process.pid for process in processes) == pids
+
+    def test_acollect_concurrency(self, proc_dir, pids):
+        """Processes are collected with limited concurrency."""
+        collector = AsyncCollector(proc=proc_dir, concurrency=1)
+        processes = asyncio.run(alist(collector.acollect()))
+        assert sorted(process.pid for process in processes) == pids
+
+    def test_acollect_prefilter(self, proc_dir, comm_filter):
+        """Processes not matching the prefilter are skipped."""
+        collector = AsyncCollector(proc=proc_dir)
+        processes = asyncio.run(
+            alist(collector.acollect(prefilter=comm_filter))
+        )
+        assert sorted(process.pid for process in processes) == [10, 30]
+
+    def test_acollect_executor(self, proc_dir, pids):
+        """A specific executor can be used."""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            collector = AsyncCollector(proc=proc_dir, executor=executor)
+            processes = asyncio.run(alist(collector.acollect()))
+        assert sorted(process.pid for process in processes) == pids
+
+    def test_acollect_skip_non_existing(self, proc_dir):
+        """Non-existing processes are skipped."""
+        collector = AsyncCollector(proc=proc_dir, pids=(10, 50))
+        processes = asyncio.run(alist(collector.acollect()))
+        assert [process.pid for process in processes] == [10]
+
+    def test_acollect_fd_cache_evict(self, proc_dir):
+        """Descriptors for processes no longer found are evicted."""
+        fd_cache = FileDescriptorCache()
+        collector = AsyncCollector(proc=proc_dir, fd_cache=fd_cache)
+        asyncio.run(alist(collector.acollect()))
+        (proc_dir / "10" / "cmdline").unlink()
+        (proc_dir / "10").rmdir()
+        asyncio.run(alist(collector.acollect()))
+        assert proc_dir / "10" / "cmdline" not in fd_cache
+        fd_cache.clear()
+
+    def test_acollect_stop_early(self, mocker, proc_dir):
+        """Iteration can be stopped before all processes are collected."""
+        release = threading.Event()
+        collect_process = AsyncCollector._collect_process
+
+        def blocking_collect_process(self, proc_dir, prefilter=None):
+            if proc_dir.name == "30":
+                release.wait()
+            return collect_process(self, proc_dir, prefilter)
+
+        mocker.patch.object(
+            AsyncCollector, "_collect_process", blocking_collect_process
+        )
+
+        async def first():
+            processes = collector.acollect()
+            process = await anext(processes)
+            await processes.aclose()
+            return process
+
+        executor = ThreadPoolExecutor()
+        collector = AsyncCollector(
+            proc=proc_dir, pids=(10, 20, 30), executor=executor
+        )
+        try:
+            assert asyncio.run(first()).pid in (10, 20)
+        finally:
+            release.set()
+            executor.shutdown()
+
 
 @pytest.fixture
 def processes_comm(pids, make_process_dir):
@@ -91,6 +631,42 @@ class TestCollection:
         collection = Collection(collector=collector, sort_by="-comm")
         assert list(collection) == process_list([20, 10, 30])
 
+    def test_sort_by_missing_values(self, collector, process_list, proc_dir):
+        """Processes with missing values are sorted last."""
+        (proc_dir / "10" / "comm").unlink()
+        collection = Collection(collector=collector, sort_by="comm")
+        assert list(collection) == process_list([30, 20, 10])
+
+    def test_sort_by_reversed_missing_values(
+        self, collector, process_list, proc_dir
+    ):
+        """Processes with missing values are sorted last when reversed."""
+        (proc_dir / "10" / "comm").unlink()
+        collection = Collection(collector=collector, sort_by="-comm")
+        assert list(collection) == process_list([20, 30, 10])
+
+    def test_limit(self, collector, process_list):
+        """The number of processes can be limited."""
+        collection = Collection(collector=collector, limit=2)
+        assert len(list(collection)) == 2
+
+    def test_limit_negative(self, collector):
+        """The limit can't be negative."""
+        with pytest.raises(ValueError) as error:
+            Collection(collector=collector, limit=-1)
+        assert str(error.value) == "Limit must not be negative"
+
+    def test_limit_sort_by(self, collector, process_list):
+        """Top processes are returned if sorting with a limit."""
+        collection = Collection(collector=collector, sort_by="comm", limit=2)
+        assert list(collection) == process_list([30, 10])
+
+    def test_limit_sort_by_reversed(self, collector, process_list, proc_dir):
+        """Top processes are returned if sorting in reverse with a limit."""
+        (proc_dir / "20" / "comm").unlink()
+        collection = Collection(collector=collector, sort_by="-comm", limit=2)
+        assert list(collection) == process_list([10, 30])
+
     def test_add_filter(self, collector, process_list):
         """Collector.add_filter adds a filter for processes."""
         collection = Collection(collector=collector)
@@ -104,6 +680,84 @@ class TestCollection:
         collection.add_filter(lambda proc: proc.pid != 30)
         assert list(collection) == process_list([10])
 
+    def test_aiter(self, proc_dir, pids, process_list):
+        """Collection can be iterated asynchronously."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector)
+        processes = asyncio.run(alist(collection))
+        assert sorted(processes, key=lambda process: process.pid) == (
+            process_list(pids)
+        )
+
+    def test_aiter_filter_sort(self, proc_dir, pids, process_list):
+        """Asynchronous iteration filters and sorts processes."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector, sort_by="-comm")
+        collection.add_filter(lambda proc: proc.pid != 10)
+        processes = asyncio.run(alist(collection))
+        assert processes == process_list([20, 30])
+
+    def test_aiter_filter(self, proc_dir, pids, process_list):
+        """Asynchronous iteration filters unsorted processes."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector)
+        collection.add_filter(lambda proc: proc.pid == 10)
+        processes = asyncio.run(alist(collection))
+        assert processes == process_list([10])
+
+    def test_aiter_limit(self, proc_dir, pids):
+        """Asynchronous iteration stops at the limit."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector, limit=2)
+        collection.add_filter(lambda proc: proc.pid != 10)
+        processes = asyncio.run(alist(collection))
+        assert sorted(process.pid for process in processes) == [20, 30]
+
+    def test_aiter_limit_zero(self, proc_dir, pids):
+        """With a zero limit, no process is returned."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector, limit=0)
+        assert asyncio.run(alist(collection)) == []
+        assert list(Collection(collector=collector, limit=0)) == []
+
+    def test_aiter_limit_sort_by(self, proc_dir, pids, process_list):
+        """Asynchronous iteration returns top sorted processes."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector, sort_by="comm", limit=1)
+        processes = asyncio.run(alist(collection))
+        assert processes == process_list([30])
+
+    def test_add_filter_with_stats(self, collector, process_list, mocker):
+        """Filters declaring stats are passed to the collector."""
+        collect = mocker.spy(collector, "collect")
+        collection = Collection(collector=collector)
+        comm_filter = CommFilter("foo")
+        collection.add_filter(comm_filter)
+        collection.add_filter(lambda proc: proc.pid != 10)
+        assert list(collection) == process_list([])
+        comm_filter.comm = "bar"
+        assert list(collection) == process_list([30])
+        assert collect.call_args.kwargs["prefilter"].stats == ["comm"]
+
+    def test_collector_without_prefilter(self, process_list):
+        """Collectors not accepting a prefilter can be used."""
+
+        class SimpleCollector:
+            def collect(self):
+                return iter(process_list([10, 20]))
+
+        collection = Collection(collector=SimpleCollector())
+        collection.add_filter(lambda proc: proc.pid != 10)
+        assert list(collection) == process_list([20])
+
+    def test_aiter_filter_with_stats(self, proc_dir, pids, process_list):
+        """Filters declaring stats are used in asynchronous iteration."""
+        collector = AsyncCollector(proc=proc_dir, pids=pids)
+        collection = Collection(collector=collector)
+        collection.add_filter(CommFilter("zza"))
+        processes = asyncio.run(alist(collection))
+        assert processes == process_list([20])
+
     def test_filter_exclusive(self, collector):
         """Filters are applied in 'or'."""
         collection = Collection(collector=collector)
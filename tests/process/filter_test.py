@@ -1,11 +1,48 @@
 import pytest
 
 from lxstats.process.filter import (
+    AllFilter,
     CommandLineFilter,
     CommandNameFilter,
 )
 
 
+class SampleFilter:
+    def __init__(self, stats, result):
+        self.stats = stats
+        self.result = result
+
+    def __call__(self, process):
+        return self.result
+
+
+class TestAllFilter:
+    def test_stats(self):
+        """Stats needed by all filters are declared."""
+        all_filter = AllFilter(
+            [
+                SampleFilter(("comm", "cmdline"), True),
+                SampleFilter(("io",), True),
+            ]
+        )
+        assert all_filter.stats == ["cmdline", "comm", "io"]
+
+    @pytest.mark.parametrize(
+        "results,matches",
+        [
+            ((True, True), True),
+            ((True, False), False),
+            ((False, False), False),
+        ],
+    )
+    def test_filter(self, process, results, matches):
+        """Processes must match all filters."""
+        all_filter = AllFilter(
+            [SampleFilter(("comm",), result) for result in results]
+        )
+        assert all_filter(process) == matches
+
+
 class TestCommandNameFilter:
     @pytest.mark.parametrize(
         "cmdline,matches", [("foo\x00bar\x00", True), ("/bin/foo\x00", False)]
@@ -17,6 +54,10 @@ class TestCommandNameFilter:
         process.collect_stats()
         assert proc_filter(process) == matches
 
+    def test_stats(self):
+        """The filter declares the stats it needs."""
+        assert CommandNameFilter("foo").stats == ("cmdline", "comm")
+
     def test_filter_matching_comm(self, process, process_dir):
         """CommandNameFilter matches a process by comm value."""
         proc_filter = CommandNameFilter("foo")
@@ -39,6 +80,10 @@ class TestCommandLineFilter:
         process.collect_stats()
         assert proc_filter(process) == matches
 
+    def test_stats(self):
+        """The filter declares the stats it needs."""
+        assert CommandLineFilter("foo").stats == ("cmdline", "comm")
+
     def test_include_args(self, process, process_dir):
         """Arguments are included in match if include_args is True."""
         proc_filter = CommandLineFilter("foo", include_args=True)
@@ -0,0 +1,79 @@
+from datetime import datetime
+from io import StringIO
+import json
+
+import pytest
+
+from lxstats.process.formatters import NDJSONFormatter
+
+
+class TestNDJSONFormatter:
+    def test_format(self, collection):
+        """NDJSONFormatter formats a JSON object per process on each line."""
+        stream = StringIO()
+        formatter = NDJSONFormatter(stream, ["pid", "cmd"])
+        formatter.format(collection)
+        assert stream.getvalue() == (
+            '{"pid":10,"cmd":"/bin/foo"}\n{"pid":20,"cmd":"/bin/bar"}\n'
+        )
+
+    def test_format_streaming(self, collection):
+        """Each process is written as soon as it's collected."""
+        stream = StringIO()
+        formatter = NDJSONFormatter(stream, ["pid"])
+        lines = []
+
+        def processes():
+            for process in collection:
+                yield process
+                lines.append(stream.getvalue().splitlines())
+
+        formatter.format(processes())
+        assert lines == [['{"pid":10}'], ['{"pid":10}', '{"pid":20}']]
+
+    def test_format_flush(self, collection, mocker):
+        """The stream is flushed after each record."""
+        stream = StringIO()
+        flush = mocker.spy(stream, "flush")
+        formatter = NDJSONFormatter(stream, ["pid"], header=True)
+        formatter.format(collection)
+        assert flush.call_count == 3
+
+    def test_format_header(self, collection):
+        """A header record with the sweep timestamp can be written."""
+        stream = StringIO()
+        formatter = NDJSONFormatter(stream, ["pid"], header=True)
+        formatter._utcnow = lambda: datetime(2020, 1, 2, 3, 4, 5)
+        formatter.format(collection)
+        header, *processes = stream.getvalue().splitlines()
+        assert json.loads(header) == {
+            "type": "sweep",
+            "timestamp": "2020-01-02T03:04:05",
+            "fields": ["pid"],
+        }
+        assert processes == ['{"pid":10}', '{"pid":20}']
+
+    def test_format_timestamp(self, collection):
+        """Timestamps are formatted in ISO 8601 format."""
+        stream = StringIO()
+        formatter = NDJSONFormatter(stream, ["pid", "timestamp"])
+        process = next(iter(collection))
+        process.load_stats({}, datetime(2020, 1, 2, 3, 4, 5))
+        formatter.format([process])
+        assert stream.getvalue() == (
+            '{"pid":10,"timestamp":"2020-01-02T03:04:05"}\n'
+        )
+
+    def test_format_not_serializable(self):
+        """An error is raised for values that can't be serialized."""
+
+        class SampleProcess:
+            def get(self, stat):
+                return object()
+
+        formatter = NDJSONFormatter(StringIO(), ["foo"])
+        with pytest.raises(TypeError) as error:
+            formatter.format([SampleProcess()])
+        assert str(error.value) == (
+            "Object of type object is not JSON serializable"
+        )
@@ -0,0 +1,125 @@
+from io import StringIO
+
+import pytest
+
+from lxstats.process.formatters import PrometheusFormatter
+
+
+class SampleProcess:
+    def __init__(self, **stats):
+        self.stats = stats
+
+    def get(self, stat):
+        return self.stats.get(stat)
+
+
+@pytest.fixture
+def stream():
+    yield StringIO()
+
+
+class TestPrometheusFormatter:
+    def test_format(self, collection, stream):
+        """Numeric fields are formatted as gauges labeled by pid and comm."""
+        formatter = PrometheusFormatter(stream, ["pid", "comm", "stat.rss"])
+        formatter.format(
+            [
+                SampleProcess(pid=10, comm="foo", **{"stat.rss": 100}),
+                SampleProcess(pid=20, comm="bar", **{"stat.rss": 200}),
+            ]
+        )
+        assert stream.getvalue() == (
+            "# HELP lxstats_process_stat_rss Process stat.rss\n"
+            "# TYPE lxstats_process_stat_rss gauge\n"
+            'lxstats_process_stat_rss{pid="10",comm="foo"} 100\n'
+            'lxstats_process_stat_rss{pid="20",comm="bar"} 200\n'
+        )
+
+    @pytest.mark.parametrize("field", ["stat.utime", "io.read_bytes"])
+    def test_format_counter(self, stream, field):
+        """Cumulative stats are formatted as counters."""
+        formatter = PrometheusFormatter(stream, [field])
+        formatter.format([SampleProcess(pid=10, comm="foo", **{field: 3})])
+        name = "lxstats_process_" + field.replace(".", "_") + "_total"
+        assert stream.getvalue().splitlines()[1:] == [
+            f"# TYPE {name} counter",
+            f'{name}{{pid="10",comm="foo"}} 3',
+        ]
+
+    @pytest.mark.parametrize(
+        "field", ["io.read_bytes_per_sec", "stat.utime_per_sec", "cpu.percent"]
+    )
+    def test_format_rate(self, stream, field):
+        """Rates of cumulative stats are formatted as gauges."""
+        formatter = PrometheusFormatter(stream, [field])
+        formatter.format([SampleProcess(pid=10, comm="foo", **{field: 1.5})])
+        name = "lxstats_process_" + field.replace(".", "_")
+        assert stream.getvalue().splitlines()[1:] == [
+            f"# TYPE {name} gauge",
+            f'{name}{{pid="10",comm="foo"}} 1.5',
+        ]
+
+    def test_format_missing_label(self, stream):
+        """Labels without a value are omitted."""
+        formatter = PrometheusFormatter(stream, ["stat.rss"])
+        formatter.format([SampleProcess(pid=10, **{"stat.rss": 1})])
+        assert stream.getvalue().splitlines()[-1] == (
+            'lxstats_process_stat_rss{pid="10"} 1'
+        )
+
+    def test_format_float(self, stream):
+        """Float values are formatted."""
+        formatter = PrometheusFormatter(stream, ["cpu.percent"])
+        formatter.format(
+            [
+                SampleProcess(pid=1, comm="a", **{"cpu.percent": 1.5}),
+                SampleProcess(
+                    pid=2, comm="b", **{"cpu.percent": float("nan")}
+                ),
+                SampleProcess(
+                    pid=3, comm="c", **{"cpu.percent": float("inf")}
+                ),
+                SampleProcess(
+                    pid=4, comm="d", **{"cpu.percent": float("-inf")}
+                ),
+            ]
+        )
+        values = [line.split()[-1] for line in stream.getvalue().splitlines()]
+        assert values[2:] == ["1.5", "NaN", "+Inf", "-Inf"]
+
+    def test_format_skip_non_numeric(self, stream):
+        """Non-numeric values are skipped."""
+        formatter = PrometheusFormatter(
+            stream, ["stat.state", "stat.rss", "flag"]
+        )
+        formatter.format(
+            [SampleProcess(pid=1, comm="a", flag=True, **{"stat.state": "S"})]
+        )
+        assert stream.getvalue() == ""
+
+    def test_format_escape_labels(self, stream):
+        """Label values are escaped."""
+        formatter = PrometheusFormatter(stream, ["stat.rss"])
+        formatter.format(
+            [SampleProcess(pid=1, comm='a"b\\c\nd', **{"stat.rss": 1})]
+        )
+        assert stream.getvalue().splitlines()[-1] == (
+            'lxstats_process_stat_rss{pid="1",comm="a\\"b\\\\c\\nd"} 1'
+        )
+
+    def test_format_prefix(self, stream):
+        """The prefix for metric names can be configured."""
+        formatter = PrometheusFormatter(stream, ["stat.rss"], prefix="foo_")
+        formatter.format([SampleProcess(pid=1, comm="a", **{"stat.rss": 1})])
+        assert stream.getvalue().splitlines()[-1] == (
+            'foo_stat_rss{pid="1",comm="a"} 1'
+        )
+
+    def test_format_repeated(self, stream):
+        """Samples are reset at each format."""
+        formatter = PrometheusFormatter(stream, ["stat.rss"])
+        process = SampleProcess(pid=1, comm="a", **{"stat.rss": 1})
+        formatter.format([process])
+        first = stream.getvalue()
+        formatter.format([process])
+        assert stream.getvalue() == first * 2
@@ -0,0 +1,163 @@
+from datetime import datetime
+import sqlite3
+
+import pytest
+
+from lxstats.process.formatters import SQLiteFormatter
+
+
+class SampleProcess:
+    def __init__(self, pid, starttime, comm, **stats):
+        self.pid = pid
+        self.cmd = f"/bin/{comm}"
+        self.stats = {"stat.starttime": starttime, "comm": comm, **stats}
+
+    def get(self, stat):
+        return self.stats.get(stat)
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def formatter(connection):
+    formatter = SQLiteFormatter(connection, ["pid", "comm", "stat.rss"])
+    formatter._utcnow = lambda: datetime(2020, 1, 2, 3, 4, 5)
+    yield formatter
+
+
+def samples(connection):
+    return connection.execute(
+        "SELECT s.timestamp, p.pid, p.starttime, p.comm, p.cmd, "
+        's."stat.rss" FROM samples s '
+        "JOIN processes p ON p.id = s.process_id "
+        "ORDER BY s.rowid"
+    ).fetchall()
+
+
+class TestSQLiteFormatter:
+    def test_format(self, connection, formatter):
+        """Samples for processes are written to the database."""
+        formatter.format(
+            [
+                SampleProcess(10, 100, "foo", **{"stat.rss": 1000}),
+                SampleProcess(20, 200, "bar"),
+            ]
+        )
+        assert samples(connection) == [
+            ("2020-01-02 03:04:05", 10, 100, "foo", "/bin/foo", 1000),
+            ("2020-01-02 03:04:05", 20, 200, "bar", "/bin/bar", None),
+        ]
+
+    def test_format_process_reused(self, connection, formatter):
+        """Processes are stored once, identified by PID and start time."""
+        formatter.format([SampleProcess(10, 100, "foo", **{"stat.rss": 1})])
+        formatter._utcnow = lambda: datetime(2020, 1, 2, 3, 4, 6)
+        formatter.format(
+            [
+                SampleProcess(10, 100, "foo", **{"stat.rss": 2}),
+                SampleProcess(20, 200, "bar", **{"stat.rss": 3}),
+            ]
+        )
+        formatter.format([SampleProcess(10, 300, "baz", **{"stat.rss": 4})])
+        assert connection.execute(
+            "SELECT id, pid, starttime, comm FROM processes ORDER BY id"
+        ).fetchall() == [
+            (1, 10, 100, "foo"),
+            (2, 20, 200, "bar"),
+            (3, 10, 300, "baz"),
+        ]
+        assert [(row[0], row[1], row[5]) for row in samples(connection)] == [
+            ("2020-01-02 03:04:05", 10, 1),
+            ("2020-01-02 03:04:06", 10, 2),
+            ("2020-01-02 03:04:06", 20, 3),
+            ("2020-01-02 03:04:06", 10, 4),
+        ]
+
+    def test_format_process_ids_single_query(self, connection, formatter):
+        """IDs for new processes are fetched with a single query."""
+        statements = []
+        connection.set_trace_callback(statements.append)
+        formatter.format(
+            [SampleProcess(pid, pid * 10, "foo") for pid in range(1, 101)]
+        )
+        selects = [
+            statement
+            for statement in statements
+            if statement.startswith("SELECT")
+        ]
+        assert len(selects) == 1
+        assert len(samples(connection)) == 100
+        assert connection.execute(
+            "SELECT COUNT(*) FROM samples s JOIN processes p "
+            "ON p.id = s.process_id AND p.starttime = p.pid * 10"
+        ).fetchone() == (100,)
+
+    def test_format_existing_database(self, connection, formatter):
+        """Processes already in the database are reused."""
+        formatter.format([SampleProcess(10, 100, "foo")])
+        formatter = SQLiteFormatter(
+            connection, ["pid", "stat.rss", "io.rchar"]
+        )
+        formatter.format([SampleProcess(10, 100, "foo", **{"io.rchar": 5})])
+        assert connection.execute(
+            'SELECT process_id, "io.rchar" FROM samples'
+        ).fetchall() == [(1, None), (1, 5)]
+
+    def test_format_no_starttime(self, connection, formatter):
+        """Processes without start time are stored with zero."""
+        formatter.format([SampleProcess(10, None, "foo")])
+        assert connection.execute(
+            "SELECT pid, starttime FROM processes"
+        ).fetchall() == [(10, 0)]
+
+    def test_format_values(self, connection):
+        """Values not supported by SQLite are converted."""
+        formatter = SQLiteFormatter(connection, ["cmdline", "big"])
+        formatter.format(
+            [SampleProcess(10, 100, "foo", cmdline=["foo", "-v"], big=2**64)]
+        )
+        assert connection.execute(
+            "SELECT cmdline, big FROM samples"
+        ).fetchall() == [('["foo", "-v"]', str(2**64))]
+
+    def test_format_transaction(self, connection, formatter):
+        """Each sweep is written in a transaction."""
+        formatter.format([SampleProcess(10, 100, "foo")])
+
+        broken = SampleProcess(30, 300, "baz")
+        # Not supported by SQLite
+        broken.cmd = object()
+        with pytest.raises(sqlite3.Error):
+            formatter.format([SampleProcess(20, 200, "bar"), broken])
+        assert [row[1] for row in samples(connection)] == [10]
+        formatter.format([SampleProcess(20, 200, "bar")])
+        assert [row[1] for row in samples(connection)] == [10, 20]
+
+    def test_indexes(self, connection, formatter):
+        """Indexes are created for timestamp, PID and command."""
+        indexes = {
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        assert {
+            "samples_timestamp",
+            "samples_process_id",
+            "processes_pid",
+            "processes_comm",
+        } <= indexes
+
+    def test_database_path(self, tmp_path):
+        """A path to the database file can be passed."""
+        path = tmp_path / "procs.db"
+        formatter = SQLiteFormatter(path, ["pid", "stat.rss"])
+        formatter.format([SampleProcess(10, 100, "foo", **{"stat.rss": 1})])
+        connection = sqlite3.connect(path)
+        assert samples(connection)[0][1:] == (10, 100, "foo", "/bin/foo", 1)
+        connection.close()
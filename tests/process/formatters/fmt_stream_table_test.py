@@ -0,0 +1,100 @@
+from io import StringIO
+
+import pytest
+
+from lxstats.process.formatters import (
+    StreamTableFormatter,
+    TableFormatter,
+)
+
+
+class SampleProcess:
+    def __init__(self, **stats):
+        self.stats = stats
+
+    def get(self, stat):
+        return self.stats.get(stat)
+
+
+@pytest.fixture
+def processes():
+    yield [
+        SampleProcess(pid=1, cmd="a"),
+        SampleProcess(pid=2, cmd="/bin/foo"),
+        SampleProcess(pid=1000, cmd="/usr/bin/long-command"),
+    ]
+
+
+class TestStreamTableFormatter:
+    def test_format(self, collection):
+        """Output is the same as TableFormatter for a small table."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(stream, ["pid", "cmd"])
+        formatter.format(collection)
+        table_stream = StringIO()
+        TableFormatter(table_stream, ["pid", "cmd"]).format(collection)
+        assert stream.getvalue() == table_stream.getvalue()
+
+    def test_format_repeated(self, collection):
+        """The header is written at each format."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(stream, ["pid"])
+        formatter.format(collection)
+        formatter.format(collection)
+        assert stream.getvalue() == " pid \n 10  \n 20  \n" * 2
+
+    def test_format_lookahead(self, processes):
+        """Widths are computed from rows in the lookahead window."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(stream, ["pid", "cmd"], lookahead=2)
+        formatter.format(processes)
+        assert stream.getvalue() == (
+            " pid  cmd      \n"
+            " 1    a        \n"
+            " 2    /bin/foo \n"
+            " 1000  /usr/bin/long-command \n"
+        )
+
+    def test_format_streaming(self, processes):
+        """Rows after the lookahead window are written as they arrive."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(stream, ["pid"], lookahead=1)
+        outputs = []
+
+        def collection():
+            for process in processes:
+                yield process
+                outputs.append(stream.getvalue())
+
+        formatter.format(collection())
+        assert outputs == [
+            " pid \n 1   \n",
+            " pid \n 1   \n 2   \n",
+            " pid \n 1   \n 2   \n 1000 \n",
+        ]
+
+    def test_format_widths(self, processes):
+        """Columns can have declared widths."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(
+            stream, ["pid", "cmd"], widths={"pid": 6, "cmd": 2}
+        )
+        outputs = []
+
+        def collection():
+            for process in processes[:2]:
+                yield process
+                outputs.append(stream.getvalue())
+
+        formatter.format(collection())
+        assert outputs[0] == " pid     cmd \n 1       a   \n"
+        assert stream.getvalue() == (
+            " pid     cmd \n" " 1       a   \n" " 2       /bin/foo \n"
+        )
+
+    def test_format_no_processes(self):
+        """Only the header is written if there are no processes."""
+        stream = StringIO()
+        formatter = StreamTableFormatter(stream, ["pid", "cmd"])
+        formatter.format([])
+        assert stream.getvalue() == " pid  cmd \n"
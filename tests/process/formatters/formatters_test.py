@@ -1,17 +1,48 @@
+import pytest
+
+from lxstats.process import formatters
 from lxstats.process.formatters import (
     get_formats,
     get_formatter,
 )
+from lxstats.process.formatters.fmt_csv import CSVFormatter
 from lxstats.process.formatters.fmt_table import TableFormatter
 
 
 class TestGetFormats:
     def test_get_formats(self):
         """get_formats return a sorted list of formatters."""
-        assert get_formats() == ["csv", "json", "table"]
+        assert get_formats() == [
+            "csv",
+            "json",
+            "ndjson",
+            "prometheus",
+            "stream-table",
+            "table",
+        ]
 
 
 class TestGetFormatter:
     def test_get_formatter(self):
         """get_formatter return a formatter by name."""
         assert get_formatter("table") == TableFormatter
+
+    def test_get_formatter_unknown(self):
+        """get_formatter raises an error for unknown formats."""
+        with pytest.raises(KeyError):
+            get_formatter("unknown")
+
+
+class TestLazyAttributes:
+    def test_getattr(self):
+        """Formatter classes are available from the package."""
+        assert formatters.CSVFormatter is CSVFormatter
+
+    def test_getattr_unknown(self):
+        """An error is raised for unknown attributes."""
+        with pytest.raises(AttributeError):
+            formatters.Unknown
+
+    def test_dir(self):
+        """Lazily-loaded attributes are listed."""
+        assert "JSONFormatter" in dir(formatters)
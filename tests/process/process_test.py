@@ -3,10 +3,55 @@ from datetime import datetime
 
 import pytest
 
+from lxstats.files.proc.process import ProcPIDStat
+from lxstats.fs import FileDescriptorCache
+from lxstats.process.cache import StaticFilesCache
 from lxstats.process.process import (
+    CLOCK_TICKS,
+    Process,
+    stats_keys,
     Task,
     TaskBase,
 )
+from lxstats.process.stats import CompactStats
+
+
+class TestStatsKeys:
+    def test_keys(self):
+        """Stats are mapped to keys in the file for their prefix."""
+        assert stats_keys(
+            ["stat.state", "stat.rss", "sched.se.nr_migrations"]
+        ) == {
+            "stat": {"state", "rss"},
+            "sched": {"se.nr_migrations"},
+        }
+
+    def test_whole_file(self):
+        """Stats with no key need the whole file."""
+        assert stats_keys(["comm", "stat", "stat.state"]) == {
+            "comm": None,
+            "stat": None,
+        }
+        assert stats_keys(["stat.state", "stat"]) == {"stat": None}
+
+    def test_derived(self):
+        """Stats not read from files are mapped to the keys they need."""
+        assert stats_keys(["pid", "cmd", "cpu.percent"]) == {
+            "cmdline": None,
+            "comm": None,
+            "stat": {"utime", "stime", "starttime"},
+        }
+
+    def test_rate(self):
+        """Rates need the key for the stat and the process start time."""
+        assert stats_keys(["io.read_bytes_per_sec"]) == {
+            "io": {"read_bytes"},
+            "stat": {"starttime"},
+        }
+
+    def test_unknown(self):
+        """Unknown stats are ignored."""
+        assert stats_keys(["unknown", "foo.bar"]) == {}
 
 
 @pytest.fixture
@@ -36,6 +81,69 @@ class TestTaskBase:
         task_base.collect_stats()
         assert task_base.available_stats() == ["cmdline"]
 
+    def test_collect_stats_selected(self, task_base, process_dir):
+        """If stats are specified, only needed files are read."""
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "wchan").write_text("0")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["pid", "statm"])
+        assert task_base.available_stats() == [
+            "statm.data",
+            "statm.dt",
+            "statm.lib",
+            "statm.resident",
+            "statm.share",
+            "statm.size",
+            "statm.text",
+        ]
+
+    def test_collect_stats_selected_keys(self, task_base, process_dir):
+        """If stats are specified, only needed keys are parsed from files."""
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        (process_dir / "io").write_text("rchar: 10\nwchar: 20\n")
+        task_base.collect_stats(
+            stats=["statm.size", "statm.share", "io.wchar"]
+        )
+        assert task_base.stats() == {
+            "io.wchar": 20,
+            "statm.share": 3,
+            "statm.size": 1,
+        }
+
+    def test_collect_stats_selected_not_existing(self, task_base, process_dir):
+        """Files for requested stats that don't exist are skipped."""
+        (process_dir / "comm").write_text("cmd")
+        task_base.collect_stats(stats=["comm", "wchan"])
+        assert task_base.stats() == {"comm": "cmd"}
+
+    def test_collect_stats_use_dir_fd(self, process_pid, process_dir):
+        """Stats can be read relative to the open task directory."""
+        task_base = TaskBase(process_pid, process_dir, use_dir_fd=True)
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["comm"])
+        assert task_base.stats() == {"comm": "cmd"}
+        assert not task_base._dir.is_open
+
+    def test_collect_stats_use_dir_fd_all(self, process_pid, process_dir):
+        """All stats can be read relative to the open task directory."""
+        task_base = TaskBase(process_pid, process_dir, use_dir_fd=True)
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "wchan").write_text("0")
+        task_base.collect_stats()
+        assert task_base.stats() == {"comm": "cmd", "wchan": "0"}
+
+    def test_collect_stats_use_dir_fd_no_proc_dir(
+        self, process_pid, process_dir
+    ):
+        """If the task dir can't be opened, stats are left empty."""
+        task_base = TaskBase(process_pid, process_dir, use_dir_fd=True)
+        process_dir.rmdir()
+        task_base.collect_stats()
+        assert task_base.stats() == {}
+        assert task_base.timestamp is None
+
     def test_collect_stats_no_proc_dir(self, task_base, process_dir):
         """If the task dir is not found, stats are left empty."""
         task_base.collect_stats()
@@ -125,6 +233,225 @@ class TestTaskBase:
         task_base.collect_stats()
         assert task_base.stats() == {"comm": "cmd", "wchan": "0"}
 
+    def test_update_stats(self, task_base, process_dir):
+        """Additional stats can be collected, keeping existing ones."""
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "wchan").write_text("0")
+        task_base.collect_stats(stats=["comm"])
+        timestamp = task_base.timestamp
+        task_base.update_stats(stats=["wchan"])
+        assert task_base.stats() == {"comm": "cmd", "wchan": "0"}
+        assert task_base.timestamp == timestamp
+
+    def test_update_stats_no_reread(self, task_base, process_dir):
+        """Files already read are not read again."""
+        (process_dir / "comm").write_text("cmd")
+        task_base.collect_stats(stats=["comm"])
+        (process_dir / "comm").write_text("other")
+        task_base.update_stats()
+        assert task_base.get("comm") == "cmd"
+
+    def test_update_stats_keys(self, task_base, process_dir):
+        """Only keys not read yet are parsed from files."""
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["statm.size"])
+        (process_dir / "statm").write_text("10 20 30 40 50 60 70")
+        task_base.update_stats(stats=["statm.size", "statm.resident"])
+        assert task_base.stats() == {"statm.size": 1, "statm.resident": 20}
+        task_base.update_stats(stats=["statm.size"])
+        assert task_base.stats() == {"statm.size": 1, "statm.resident": 20}
+
+    def test_update_stats_whole_file(self, task_base, process_dir):
+        """Whole files are read if only some keys were read before."""
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["statm.size"])
+        task_base.update_stats()
+        assert task_base.get("statm.dt") == 7
+        (process_dir / "statm").write_text("10 20 30 40 50 60 70")
+        task_base.update_stats(stats=["statm.dt"])
+        assert task_base.get("statm.dt") == 7
+
+    def test_collect_stats_compact(self, process_pid, process_dir):
+        """Stats can be stored in compact form."""
+        task_base = TaskBase(process_pid, process_dir, compact=True)
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["comm", "statm.size", "statm.share"])
+        assert isinstance(task_base._stats, CompactStats)
+        assert task_base.get("statm.share") == 3
+        assert task_base.stats() == {
+            "comm": "cmd",
+            "statm.share": 3,
+            "statm.size": 1,
+        }
+        assert task_base.available_stats() == [
+            "comm",
+            "statm.share",
+            "statm.size",
+        ]
+
+    def test_collect_stats_compact_cgroup(self, process_pid, process_dir):
+        """Stats for cgroup hierarchies are accessible in compact form."""
+        (process_dir / "cgroup").write_text(
+            "9:name=systemd:/\n4:memory:/user.slice\n0::/user.slice\n"
+        )
+        for stats in (None, ["cgroup.4"]):
+            task_base = TaskBase(process_pid, process_dir, compact=True)
+            task_base.collect_stats(stats=stats)
+            assert task_base.get("cgroup.4") == (["memory"], "/user.slice")
+            assert task_base.stats()["cgroup.4"] == (
+                ["memory"],
+                "/user.slice",
+            )
+
+    def test_update_stats_compact(self, process_pid, process_dir):
+        """Values for files in compact form are merged on update."""
+        task_base = TaskBase(process_pid, process_dir, compact=True)
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["statm.size"])
+        task_base.update_stats(stats=["statm.dt"])
+        assert task_base.stats() == {"statm.size": 1, "statm.dt": 7}
+
+    def test_load_stats_compact(self, process_pid, process_dir):
+        """Stats loaded in compact form are grouped by file."""
+        task_base = TaskBase(process_pid, process_dir, compact=True)
+        task_base.load_stats({"comm": "cmd", "statm.size": 1}, datetime.now())
+        assert task_base.get("statm.size") == 1
+        assert task_base.stats() == {"comm": "cmd", "statm.size": 1}
+
+    def test_lazy(self, process_pid, process_dir, mocker):
+        """In lazy mode, files are read when stats are accessed."""
+        task_base = TaskBase(process_pid, process_dir, lazy=True)
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats()
+        assert task_base.timestamp is not None
+        assert task_base._read_files == {}
+        assert task_base.get("statm.size") == 1
+        assert task_base._read_files == {"statm": {"size"}}
+        assert task_base.get("comm") == "cmd"
+        assert task_base.get("wchan") is None
+
+    def test_lazy_cached(self, process_pid, process_dir):
+        """In lazy mode, values are cached until the next collection."""
+        task_base = TaskBase(process_pid, process_dir, lazy=True)
+        (process_dir / "comm").write_text("cmd")
+        task_base.collect_stats()
+        assert task_base.get("comm") == "cmd"
+        (process_dir / "comm").write_text("other")
+        assert task_base.get("comm") == "cmd"
+        task_base.collect_stats()
+        assert task_base.get("comm") == "other"
+
+    def test_lazy_cmd(self, process_pid, process_dir):
+        """In lazy mode, files for the command are read when accessed."""
+        task_base = TaskBase(process_pid, process_dir, lazy=True)
+        (process_dir / "comm").write_text("cmd")
+        task_base.collect_stats()
+        assert task_base.get("cmd") == "[cmd]"
+
+    def test_lazy_stats(self, process_pid, process_dir):
+        """In lazy mode, all collected stats are read when listed."""
+        task_base = TaskBase(process_pid, process_dir, lazy=True)
+        (process_dir / "comm").write_text("cmd")
+        (process_dir / "wchan").write_text("0")
+        (process_dir / "statm").write_text("1 2 3 4 5 6 7")
+        task_base.collect_stats(stats=["comm"])
+        task_base.update_stats(stats=["statm.size"])
+        assert task_base.available_stats() == ["comm", "statm.size"]
+        assert task_base.stats() == {"comm": "cmd", "statm.size": 1}
+
+    def test_static_cache(self, process_pid, process_dir):
+        """Static files are read from the cache after the first time."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "stat").write_text(stat_content(starttime=1000))
+        (process_dir / "cmdline").write_text("foo\x00bar")
+        (process_dir / "environ").write_text("FOO=foo\x00BAR=bar")
+        task_base.collect_stats(stats=["cmdline", "environ.FOO"])
+        assert task_base.stats() == {
+            "cmdline": ["foo", "bar"],
+            "environ.FOO": "foo",
+            "stat.starttime": 1000,
+        }
+        assert cache.get(process_pid, 1000, "environ") == {
+            "FOO": "foo",
+            "BAR": "bar",
+        }
+        (process_dir / "cmdline").write_text("baz")
+        task_base.collect_stats(stats=["cmdline", "environ.BAR"])
+        assert task_base.stats() == {
+            "cmdline": ["foo", "bar"],
+            "environ.BAR": "bar",
+            "stat.starttime": 1000,
+        }
+
+    def test_static_cache_non_str_keys(self, process_pid, process_dir):
+        """Cached content with non-string keys is filtered by key."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "stat").write_text(stat_content(starttime=1000))
+        (process_dir / "cgroup").write_text("4:memory:/foo\n0::/bar\n")
+        task_base.collect_stats(stats=["cgroup.4"])
+        task_base.collect_stats(stats=["cgroup.4"])
+        assert task_base.stats() == {
+            "cgroup.4": (["memory"], "/foo"),
+            "stat.starttime": 1000,
+        }
+
+    def test_static_cache_read_stat_once(
+        self, process_pid, process_dir, mocker
+    ):
+        """The stat file is read once for the start time and other stats."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "stat").write_text(stat_content(starttime=1000))
+        (process_dir / "cmdline").write_text("foo")
+        (process_dir / "comm").write_text("foo")
+        parse = mocker.spy(ProcPIDStat, "parse")
+        task_base.collect_stats(stats=["pid", "stat.state", "comm", "cmdline"])
+        task_base.collect_stats(stats=["pid", "stat.state", "comm", "cmdline"])
+        assert parse.call_count == 2
+        assert task_base.get("stat.state") == "2"
+        assert task_base.get("cmdline") == ["foo"]
+
+    def test_static_cache_starttime(self, process_pid, process_dir):
+        """Cached content is not used for a different process."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "stat").write_text(stat_content(starttime=1000))
+        (process_dir / "cmdline").write_text("foo")
+        task_base.collect_stats(stats=["stat.starttime", "cmdline"])
+        (process_dir / "stat").write_text(stat_content(starttime=2000))
+        (process_dir / "cmdline").write_text("bar")
+        task_base.collect_stats(stats=["stat.starttime", "cmdline"])
+        assert task_base.get("cmdline") == ["bar"]
+
+    def test_static_cache_no_starttime(self, process_pid, process_dir):
+        """If the start time is not available, the cache is not used."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "cmdline").write_text("foo")
+        task_base.collect_stats(stats=["cmdline"])
+        assert task_base.get("cmdline") == ["foo"]
+        assert len(cache) == 0
+
+    def test_static_cache_not_found(self, process_pid, process_dir):
+        """Files that are not found are not cached."""
+        cache = StaticFilesCache()
+        task_base = TaskBase(process_pid, process_dir, static_cache=cache)
+        (process_dir / "stat").write_text(stat_content(starttime=1000))
+        task_base.collect_stats(stats=["environ"])
+        assert task_base.stats() == {"stat.starttime": 1000}
+        assert len(cache) == 0
+
+    def test_load_stats(self, task_base):
+        """Stats collected elsewhere can be loaded."""
+        now = datetime.utcnow()
+        task_base.load_stats({"comm": "cmd"}, now)
+        assert task_base.stats() == {"comm": "cmd"}
+        assert task_base.timestamp == now
+
     def test_get(self, task_base, process_dir):
         """Value for a stat can be returned."""
         (process_dir / "wchan").write_text("poll_schedule_timeout")
@@ -155,6 +482,132 @@ class TestTaskBase:
         assert hash(task_base) == hash(other)
 
 
+def stat_content(utime=0, stime=0, starttime=100):
+    fields = [str(i) for i in range(45)]
+    fields[13] = str(utime)
+    fields[14] = str(stime)
+    fields[21] = str(starttime)
+    return " ".join(fields)
+
+
+@pytest.fixture
+def clock(task_base):
+    times = iter(range(10, 100, 2))
+    task_base._monotonic_clock = lambda: next(times)
+
+
+@pytest.mark.usefixtures("clock")
+class TestTaskBaseRates:
+    def test_no_previous_sample(self, task_base, process_dir):
+        """Rates are not available after the first collection."""
+        (process_dir / "io").write_text("read_bytes: 100")
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") is None
+
+    def test_rate(self, task_base, process_dir):
+        """Rates per second are computed from the previous sample."""
+        (process_dir / "stat").write_text(stat_content())
+        (process_dir / "io").write_text("read_bytes: 100")
+        task_base.collect_stats()
+        (process_dir / "io").write_text("read_bytes: 300")
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") == 100.0
+
+    def test_cpu_percent(self, task_base, process_dir):
+        """The CPU percentage is computed from user and system time."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        (process_dir / "stat").write_text(
+            stat_content(utime=CLOCK_TICKS, stime=CLOCK_TICKS // 2)
+        )
+        task_base.collect_stats()
+        assert task_base.get("cpu.percent") == pytest.approx(75.0)
+
+    def test_rate_lazy(self, process_pid, process_dir):
+        """In lazy mode, rates are computed for stats accessed before."""
+        task_base = TaskBase(process_pid, process_dir, lazy=True)
+        times = iter(range(10, 100, 2))
+        task_base._monotonic_clock = lambda: next(times)
+        (process_dir / "stat").write_text(stat_content())
+        (process_dir / "io").write_text("read_bytes: 100")
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") is None
+        (process_dir / "io").write_text("read_bytes: 300")
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") == 100.0
+
+    def test_loaded_sample(self, task_base, process_dir):
+        """Loaded stats with a monotonic time are used for rates."""
+        task_base.load_stats(
+            {"io.read_bytes": 100, "stat.starttime": 100},
+            datetime.utcnow(),
+            monotonic=8,
+        )
+        assert task_base.monotonic == 8
+        (process_dir / "stat").write_text(stat_content())
+        (process_dir / "io").write_text("read_bytes: 300")
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") == 100.0
+
+    def test_different_process(self, task_base, process_dir):
+        """The previous sample is dropped if the start time changes."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        (process_dir / "stat").write_text(
+            stat_content(utime=100, starttime=200)
+        )
+        task_base.collect_stats()
+        assert task_base.get("cpu.percent") is None
+
+    def test_previous_sample_only(self, task_base, process_dir):
+        """Only the previous sample is used for rates."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        (process_dir / "stat").write_text(stat_content(utime=10))
+        task_base.collect_stats()
+        (process_dir / "stat").write_text(stat_content(utime=30))
+        task_base.collect_stats()
+        assert task_base.get("stat.utime_per_sec") == 10.0
+
+    def test_missing_stat(self, task_base, process_dir):
+        """If the stat is missing, the rate is not reported."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        task_base.collect_stats()
+        assert task_base.get("io.read_bytes_per_sec") is None
+
+    def test_not_numeric(self, task_base, process_dir):
+        """Rates are not reported for non-numeric stats."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        task_base.collect_stats()
+        assert task_base.get("stat.state_per_sec") is None
+
+    def test_unknown_stat(self, task_base, process_dir):
+        """Unknown stats are not reported even with a previous sample."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        task_base.collect_stats()
+        assert task_base.get("unknown") is None
+
+    def test_no_interval(self, task_base, process_dir):
+        """Rates are not reported if samples have the same time."""
+        task_base._monotonic_clock = lambda: 10
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        task_base.collect_stats()
+        assert task_base.get("cpu.percent") is None
+
+    def test_no_stats_collected(self, task_base, process_dir):
+        """The previous sample is dropped if stats can't be collected."""
+        (process_dir / "stat").write_text(stat_content())
+        task_base.collect_stats()
+        (process_dir / "stat").unlink()
+        process_dir.rmdir()
+        task_base.collect_stats()
+        assert task_base._previous is None
+
+
 class TestProcess:
     def test_pid(self, process, process_pid):
         """The pid attribute returns the PID."""
@@ -177,6 +630,36 @@ class TestProcess:
             ]
         )
 
+    def test_tasks_use_dir_fd(self, process_pid, process_dir):
+        """Tasks are listed relative to the open process directory."""
+        process = Process(process_pid, process_dir, use_dir_fd=True)
+        (process_dir / "task").mkdir()
+        (process_dir / "task/123").mkdir()
+        (process_dir / "task/123/comm").write_text("cmd")
+        [task] = process.tasks()
+        assert task.tid == 123
+        assert not process._dir.is_open
+        task.collect_stats()
+        assert task.get("comm") == "cmd"
+
+    def test_tasks_fd_cache(self, process_pid, process_dir):
+        """Tasks share the process descriptor cache."""
+        fd_cache = FileDescriptorCache()
+        process = Process(process_pid, process_dir, fd_cache=fd_cache)
+        (process_dir / "task").mkdir()
+        (process_dir / "task/123").touch()
+        [task] = process.tasks()
+        assert task._dir._fd_cache is fd_cache
+
+    def test_tasks_no_static_cache(self, process_pid, process_dir):
+        """Tasks don't use the process static files cache."""
+        cache = StaticFilesCache()
+        process = Process(process_pid, process_dir, static_cache=cache)
+        (process_dir / "task").mkdir()
+        (process_dir / "task/123").touch()
+        [task] = process.tasks()
+        assert task._static_cache is None
+
 
 @pytest.fixture
 def task(process, process_pid):
@@ -0,0 +1,268 @@
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+
+from lxstats.process.collection import Collection
+from lxstats.process.filter import CommandNameFilter
+from lxstats.process.recording import (
+    _unzigzag,
+    _zigzag,
+    Reader,
+    Recorder,
+    RecordingError,
+    ReplayCollector,
+)
+
+
+class SampleProcess:
+    def __init__(self, pid, **stats):
+        self.pid = pid
+        self.stats = stats
+
+    def get(self, stat):
+        return self.stats.get(stat)
+
+
+@pytest.fixture
+def stream():
+    yield BytesIO()
+
+
+@pytest.fixture
+def recorder(stream):
+    yield Recorder(stream, ["comm", "stat.rss", "cpu.percent", "cmdline"])
+
+
+def sweeps(stream):
+    stream.seek(0)
+    return list(Reader(stream))
+
+
+class TestZigzag:
+    @pytest.mark.parametrize(
+        "value,encoded", [(0, 0), (-1, 1), (1, 2), (-2, 3), (2**40, 2**41)]
+    )
+    def test_zigzag(self, value, encoded):
+        """Signed integers are mapped to unsigned ones and back."""
+        assert _zigzag(value) == encoded
+        assert _unzigzag(encoded) == value
+
+
+class TestRecorder:
+    def test_record(self, stream, recorder):
+        """Sweeps are recorded with values for fields."""
+        timestamp = datetime(2020, 1, 2, 3, 4, 5, 678)
+        recorder.record(
+            [
+                SampleProcess(
+                    10,
+                    comm="foo",
+                    cmdline=["foo", "-v"],
+                    **{"stat.rss": 100, "cpu.percent": 1.5},
+                ),
+                SampleProcess(5, comm="bar", **{"stat.rss": 2**70}),
+            ],
+            timestamp=timestamp,
+        )
+        assert sweeps(stream) == [
+            (
+                timestamp,
+                [
+                    (
+                        10,
+                        {
+                            "comm": "foo",
+                            "stat.rss": 100,
+                            "cpu.percent": 1.5,
+                            "cmdline": ["foo", "-v"],
+                        },
+                    ),
+                    (
+                        5,
+                        {
+                            "comm": "bar",
+                            "stat.rss": 2**70,
+                            "cpu.percent": None,
+                            "cmdline": None,
+                        },
+                    ),
+                ],
+            )
+        ]
+
+    def test_record_delta(self, stream, recorder):
+        """Values are encoded based on the previous sweep."""
+        first = SampleProcess(
+            10, comm="foo", cmdline=["foo"], **{"stat.rss": 100}
+        )
+        recorder.record([first], timestamp=datetime(2020, 1, 1))
+        size = len(stream.getvalue())
+        second = SampleProcess(
+            10, comm="foo", cmdline=["foo"], **{"stat.rss": 90}
+        )
+        recorder.record([second], timestamp=datetime(2020, 1, 1, 0, 0, 1))
+        # Length, timestamp (three bytes), count, PID, and four values (with
+        # two bytes for the RSS delta)
+        assert len(stream.getvalue()) - size == 11
+        [_, (timestamp, rows)] = sweeps(stream)
+        assert timestamp == datetime(2020, 1, 1, 0, 0, 1)
+        assert rows == [
+            (
+                10,
+                {
+                    "comm": "foo",
+                    "stat.rss": 90,
+                    "cpu.percent": None,
+                    "cmdline": ["foo"],
+                },
+            )
+        ]
+
+    def test_record_type_change(self, stream, recorder):
+        """Values changing type are recorded."""
+        recorder.record([SampleProcess(10, comm="foo", **{"stat.rss": 1})])
+        recorder.record([SampleProcess(10, comm=3, **{"stat.rss": 1.0})])
+        recorder.record([SampleProcess(10, comm=True, **{"stat.rss": 2})])
+        rows = [rows[0][1] for _, rows in sweeps(stream)]
+        assert [(row["comm"], row["stat.rss"]) for row in rows] == [
+            ("foo", 1),
+            (3, 1.0),
+            (True, 2),
+        ]
+        assert type(rows[1]["stat.rss"]) is float
+
+    def test_record_not_available(self, stream, recorder):
+        """Values that are no longer available are recorded."""
+        recorder.record([SampleProcess(10, **{"stat.rss": 1})])
+        recorder.record([SampleProcess(10)])
+        assert [rows[0][1]["stat.rss"] for _, rows in sweeps(stream)] == [
+            1,
+            None,
+        ]
+
+    def test_record_exited(self, stream, recorder):
+        """Values for processes not in the previous sweep are not reused."""
+        recorder.record([SampleProcess(10, comm="foo")])
+        recorder.record([SampleProcess(20, comm="bar")])
+        recorder.record([SampleProcess(10, comm="foo")])
+        assert [rows[0][1]["comm"] for _, rows in sweeps(stream)] == [
+            "foo",
+            "bar",
+            "foo",
+        ]
+
+    def test_record_current_time(self, stream, recorder):
+        """The current time is used if no timestamp is passed."""
+        recorder._utcnow = lambda: datetime(2020, 1, 1)
+        recorder.record([])
+        assert sweeps(stream) == [(datetime(2020, 1, 1), [])]
+
+
+class TestReader:
+    def test_fields(self, stream, recorder):
+        """Recorded fields are read from the header."""
+        stream.seek(0)
+        assert Reader(stream).fields == [
+            "comm",
+            "stat.rss",
+            "cpu.percent",
+            "cmdline",
+        ]
+
+    def test_not_recording(self):
+        """An error is raised if the stream is not a recording."""
+        with pytest.raises(RecordingError, match="Not a recording"):
+            Reader(BytesIO(b"LXSX\x01"))
+
+    def test_unsupported_version(self):
+        """An error is raised if the version is not supported."""
+        with pytest.raises(RecordingError, match="Unsupported version: 2"):
+            Reader(BytesIO(b"LXSR\x02\x00"))
+
+    @pytest.mark.parametrize(
+        "content", [b"LXS", b"LXSR", b"LXSR\x01\x01\x05a"]
+    )
+    def test_truncated_header(self, content):
+        """An error is raised if the header is truncated."""
+        with pytest.raises(RecordingError, match="Truncated recording"):
+            Reader(BytesIO(content))
+
+    @pytest.mark.parametrize("suffix", [b"\x80", b"\x05\x00"])
+    def test_truncated_sweep(self, stream, recorder, suffix):
+        """An error is raised if a sweep is truncated."""
+        stream.write(suffix)
+        with pytest.raises(RecordingError, match="Truncated recording"):
+            sweeps(stream)
+
+    @pytest.mark.parametrize(
+        "sweep",
+        [
+            # Missing values
+            b"\x00\x01\x14",
+            # Invalid tag
+            b"\x00\x01\x14\x09",
+            # Truncated string
+            b"\x00\x01\x14\x05\x05a",
+            # Truncated float
+            b"\x00\x01\x14\x01\x04a",
+        ],
+    )
+    def test_invalid_sweep(self, stream, recorder, sweep):
+        """An error is raised if a sweep is invalid."""
+        stream.write(bytes([len(sweep)]) + sweep)
+        with pytest.raises(RecordingError, match="Invalid sweep"):
+            sweeps(stream)
+
+
+class TestReplayCollector:
+    @pytest.fixture
+    def recording(self, stream, recorder):
+        recorder.record(
+            [
+                SampleProcess(10, comm="foo", **{"stat.rss": 100}),
+                SampleProcess(20, comm="bar", **{"stat.rss": 200}),
+            ],
+            timestamp=datetime(2020, 1, 1),
+        )
+        recorder.record(
+            [SampleProcess(10, comm="foo", **{"stat.rss": 300})],
+            timestamp=datetime(2020, 1, 1, 0, 0, 1),
+        )
+        stream.seek(0)
+        yield stream
+
+    def test_collect(self, recording):
+        """Each collection returns processes from the next sweep."""
+        collector = ReplayCollector(recording)
+        assert collector.fields == [
+            "comm",
+            "stat.rss",
+            "cpu.percent",
+            "cmdline",
+        ]
+        assert not collector.finished
+        first = list(collector.collect())
+        assert [process.pid for process in first] == [10, 20]
+        assert first[0].stats() == {"comm": "foo", "stat.rss": 100}
+        assert first[0].timestamp == datetime(2020, 1, 1)
+        assert first[0].cmd == "[foo]"
+        [process] = collector.collect()
+        assert process.get("stat.rss") == 300
+        assert process.timestamp == datetime(2020, 1, 1, 0, 0, 1)
+        assert collector.finished
+        assert list(collector.collect()) == []
+
+    def test_collect_prefilter(self, recording):
+        """The prefilter is applied to processes."""
+        collector = ReplayCollector(recording)
+        processes = collector.collect(prefilter=CommandNameFilter("bar"))
+        assert [process.pid for process in processes] == [20]
+
+    def test_collection(self, recording):
+        """Processes can be sorted and filtered in a Collection."""
+        collection = Collection(
+            collector=ReplayCollector(recording), sort_by="-stat.rss"
+        )
+        assert [process.pid for process in collection] == [20, 10]
+        assert [process.pid for process in collection] == [10]
@@ -0,0 +1,154 @@
+import pytest
+
+from lxstats.process.scheduler import (
+    Scheduler,
+    Tick,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    yield FakeClock()
+
+
+@pytest.fixture
+def make_scheduler(clock):
+    def make_scheduler(*args, **kwargs):
+        scheduler = Scheduler(*args, **kwargs)
+        scheduler._clock = clock
+        scheduler._sleep = clock.sleep
+        return scheduler
+
+    yield make_scheduler
+
+
+class TestScheduler:
+    def test_negative_interval(self):
+        """The interval can't be negative."""
+        with pytest.raises(ValueError) as error:
+            Scheduler(-1)
+        assert str(error.value) == "Interval must not be negative"
+
+    def test_ticks(self, clock, make_scheduler):
+        """Ticks are yielded at deadlines, the first one immediately."""
+        scheduler = make_scheduler(5)
+        assert list(scheduler.ticks(count=3)) == [
+            Tick(0, 100.0, 0),
+            Tick(1, 105.0, 0),
+            Tick(2, 110.0, 0),
+        ]
+        # no sleep after the last tick
+        assert clock.sleeps == [5.0, 5.0]
+        assert clock.now == 110.0
+
+    def test_ticks_no_drift(self, clock, make_scheduler):
+        """Time taken to process ticks doesn't shift following ones."""
+        scheduler = make_scheduler(5)
+        deadlines = []
+        for tick in scheduler.ticks(count=4):
+            deadlines.append(clock.now)
+            clock.now += 1.5
+        assert deadlines == [100.0, 105.0, 110.0, 115.0]
+        assert clock.sleeps == [3.5, 3.5, 3.5]
+
+    def test_ticks_float_interval(self, clock, make_scheduler):
+        """The interval can be a fraction of a second."""
+        scheduler = make_scheduler(0.25)
+        deadlines = [tick.deadline for tick in scheduler.ticks(count=4)]
+        assert deadlines == [100.0, 100.25, 100.5, 100.75]
+
+    def test_ticks_forever(self, make_scheduler):
+        """Without a count, ticks are yielded forever."""
+        scheduler = make_scheduler(1)
+        ticks = scheduler.ticks()
+        indexes = [next(ticks).index for _ in range(100)]
+        assert indexes == list(range(100))
+
+    def test_ticks_zero_interval(self, clock, make_scheduler):
+        """With a zero interval, ticks are yielded without waiting."""
+        scheduler = make_scheduler(0)
+        for tick in scheduler.ticks(count=3):
+            clock.now += 1
+        assert tick == Tick(2, 100.0, 0)
+        assert clock.sleeps == []
+        assert scheduler.missed == 0
+
+    def test_ticks_processing_on_deadline(self, clock, make_scheduler):
+        """A tick finishing exactly at the next deadline misses nothing."""
+        scheduler = make_scheduler(5)
+        ticks = []
+        for tick in scheduler.ticks(count=2):
+            ticks.append(tick)
+            clock.now += 5
+        assert ticks == [Tick(0, 100.0, 0), Tick(1, 105.0, 0)]
+        assert scheduler.missed == 0
+
+    def test_ticks_skip_missed(self, clock, make_scheduler):
+        """Missed ticks are reported and skipped."""
+        missed = []
+        scheduler = make_scheduler(5, on_missed=missed.append)
+        ticks = []
+        for tick in scheduler.ticks(count=3):
+            ticks.append(tick)
+            if tick.index == 0:
+                clock.now += 12
+        assert ticks == [
+            Tick(0, 100.0, 0),
+            Tick(1, 115.0, 2),
+            Tick(2, 120.0, 0),
+        ]
+        assert missed == [2]
+        assert scheduler.missed == 2
+        assert clock.sleeps == [3.0, 5.0]
+
+    def test_ticks_catch_up(self, clock, make_scheduler):
+        """Missed ticks can be run immediately, to catch up."""
+        missed = []
+        scheduler = make_scheduler(
+            5, skip_missed=False, on_missed=missed.append
+        )
+        ticks = []
+        for tick in scheduler.ticks(count=5):
+            ticks.append((tick, clock.now))
+            if tick.index == 0:
+                clock.now += 12
+        assert ticks == [
+            (Tick(0, 100.0, 0), 100.0),
+            (Tick(1, 105.0, 2), 112.0),
+            (Tick(2, 110.0, 0), 112.0),
+            (Tick(3, 115.0, 0), 115.0),
+            (Tick(4, 120.0, 0), 120.0),
+        ]
+        # missed ticks are only reported once
+        assert missed == [2]
+        assert scheduler.missed == 2
+        assert clock.sleeps == [3.0, 5.0]
+
+    def test_ticks_no_report_after_last(self, clock, make_scheduler):
+        """Overrunning the last tick is not reported."""
+        missed = []
+        scheduler = make_scheduler(5, on_missed=missed.append)
+        for tick in scheduler.ticks(count=1):
+            clock.now += 20
+        assert missed == []
+        assert scheduler.missed == 0
+
+    def test_run(self, clock, make_scheduler):
+        """A function can be called at each tick."""
+        calls = []
+        scheduler = make_scheduler(2)
+        scheduler.run(lambda: calls.append(clock.now), count=3)
+        assert calls == [100.0, 102.0, 104.0]
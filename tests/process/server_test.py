@@ -0,0 +1,121 @@
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from lxstats.process.formatter import Formatter
+from lxstats.process.server import (
+    SweepCache,
+    SweepServer,
+)
+
+
+class CountingFormatter(Formatter):
+    """Formatter writing the number of times it's been used."""
+
+    content_type = "text/x-count"
+
+    count = 0
+
+    def format(self, collection):
+        type(self).count += 1
+        self._write(f"{type(self).count} {list(collection)}")
+
+
+@pytest.fixture
+def formatter_class():
+    CountingFormatter.count = 0
+    yield CountingFormatter
+
+
+@pytest.fixture
+def clock():
+    yield [100.0]
+
+
+@pytest.fixture
+def cache(formatter_class, clock):
+    cache = SweepCache([1, 2], formatter_class, ["pid"], 10)
+    cache._clock = lambda: clock[0]
+    yield cache
+
+
+@pytest.fixture
+def server(cache):
+    server = SweepServer(cache, 0)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def url(server, path):
+    host, port = server.server_address
+    return f"http://{host}:{port}{path}"
+
+
+class TestSweepCache:
+    def test_get(self, cache):
+        """Formatted output is returned as bytes."""
+        assert cache.get() == b"1 [1, 2]"
+        assert cache.content_type == "text/x-count"
+
+    def test_get_cached(self, cache, clock):
+        """Output is cached for the interval."""
+        cache.get()
+        clock[0] += 9
+        assert cache.get() == b"1 [1, 2]"
+
+    def test_get_refresh(self, cache, clock):
+        """Output is refreshed after the interval."""
+        cache.get()
+        clock[0] += 10
+        assert cache.get() == b"2 [1, 2]"
+
+    def test_get_concurrent(self, cache, formatter_class):
+        """Concurrent calls share the same sweep."""
+        results = []
+
+        def get():
+            results.append(cache.get())
+
+        threads = [threading.Thread(target=get) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [b"1 [1, 2]"] * 10
+        assert formatter_class.count == 1
+
+
+class TestSweepServer:
+    def test_local(self, server):
+        """The server listens on localhost by default."""
+        assert server.server_address[0] == "127.0.0.1"
+
+    @pytest.mark.parametrize("path", ["/", "/metrics", "/metrics?foo=bar"])
+    def test_get(self, server, path):
+        """Cached content is served."""
+        with urlopen(url(server, path)) as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"] == "text/x-count"
+            assert response.headers["Content-Length"] == "8"
+            assert response.read() == b"1 [1, 2]"
+
+    def test_get_cached(self, server):
+        """Content is cached across requests."""
+        for _ in range(3):
+            with urlopen(url(server, "/metrics")) as response:
+                assert response.read() == b"1 [1, 2]"
+
+    def test_not_found(self, server):
+        """Other paths are not found."""
+        with pytest.raises(HTTPError) as error:
+            urlopen(url(server, "/other"))
+        assert error.value.code == 404
+        error.value.close()
@@ -0,0 +1,137 @@
+import pickle
+
+import pytest
+
+from lxstats.process.stats import (
+    _record_types,
+    CompactStats,
+    Record,
+)
+
+
+class TestRecord:
+    def test_type_for(self):
+        """Record types are shared for the same keys."""
+        record_type = Record.type_for(("foo", "bar"))
+        assert issubclass(record_type, Record)
+        assert Record.type_for(("foo", "bar")) is record_type
+        assert Record.type_for(("bar", "foo")) is not record_type
+
+    def test_from_dict(self):
+        """A record can be created from a dict."""
+        record = Record.from_dict({"foo": 1, "bar": 2})
+        assert record == (1, 2)
+        assert record.to_dict() == {"foo": 1, "bar": 2}
+
+    def test_getitem(self):
+        """Values can be accessed by key or by index."""
+        record = Record.from_dict({"foo": 1, "bar": 2})
+        assert record["bar"] == 2
+        assert record[0] == 1
+        with pytest.raises(KeyError):
+            record["baz"]
+
+    def test_get(self):
+        """Values can be accessed with a default."""
+        record = Record.from_dict({"foo": 1, "bar": 2})
+        assert record.get("foo") == 1
+        assert record.get("baz") is None
+        assert record.get("baz", 3) == 3
+
+    def test_keys_items(self):
+        """Keys and items can be listed."""
+        record = Record.from_dict({"foo": 1, "bar": 2})
+        assert list(record.keys()) == ["foo", "bar"]
+        assert list(record.items()) == [("foo", 1), ("bar", 2)]
+
+    def test_no_dict(self):
+        """Records don't have a per-instance dict."""
+        record = Record.from_dict({"foo": 1})
+        assert not hasattr(record, "__dict__")
+
+    def test_pickle(self):
+        """Records can be pickled."""
+        record = Record.from_dict({"foo": 1, "bar": 2})
+        unpickled = pickle.loads(pickle.dumps(record))
+        assert type(unpickled) is type(record)
+        assert unpickled.to_dict() == {"foo": 1, "bar": 2}
+
+
+class TestCompactStats:
+    def test_set_file(self):
+        """Values for a file are accessed with the file prefix."""
+        stats = CompactStats()
+        stats.set_file("statm", {"size": 100, "resident": 20})
+        stats.set_file("comm", "foo")
+        assert stats["statm.size"] == 100
+        assert stats["comm"] == "foo"
+        assert stats.get("statm.share") is None
+        assert stats.get("statm") is None
+        assert stats.get("wchan") is None
+        assert "statm.resident" in stats
+
+    def test_set_file_merge(self):
+        """Values for the same file are merged."""
+        stats = CompactStats()
+        stats.set_file("statm", {"size": 100, "resident": 20})
+        stats.set_file("statm", {"resident": 30, "share": 10})
+        assert stats.copy() == {
+            "statm.size": 100,
+            "statm.resident": 30,
+            "statm.share": 10,
+        }
+
+    def test_set_file_none(self):
+        """Files can have a None value."""
+        stats = CompactStats()
+        stats.set_file("comm", None)
+        assert stats["comm"] is None
+        assert list(stats) == ["comm"]
+
+    def test_iter_len(self):
+        """Stats are listed in the flat form."""
+        stats = CompactStats()
+        stats.set_file("comm", "foo")
+        stats.set_file("statm", {"size": 100, "resident": 20})
+        assert list(stats) == ["comm", "statm.size", "statm.resident"]
+        assert len(stats) == 3
+
+    def test_set_file_not_record(self):
+        """Files without a fixed set of keys are stored as plain dicts."""
+        stats = CompactStats()
+        stats.set_file("environ", {"FOO": "foo"})
+        stats.set_file("environ", {"BAR": "bar"})
+        assert stats._files["environ"] == {"FOO": "foo", "BAR": "bar"}
+        assert stats["environ.BAR"] == "bar"
+        assert stats.get("environ") is None
+        assert list(stats) == ["environ.FOO", "environ.BAR"]
+        assert len(stats) == 2
+
+    def test_set_file_not_record_no_types(self):
+        """Record types are not created for files with varying keys."""
+        types_count = len(_record_types)
+        stats = CompactStats()
+        for n in range(10):
+            stats.set_file("environ", {f"VAR{n}": "value"})
+        assert len(_record_types) == types_count
+
+    def test_set_file_non_str_keys(self):
+        """Non-string keys are converted to strings."""
+        stats = CompactStats()
+        stats.set_file("cgroup", {1: (["cpu"], "/"), 0: ([""], "/user.slice")})
+        assert stats["cgroup.1"] == (["cpu"], "/")
+        assert stats.copy() == {
+            "cgroup.1": (["cpu"], "/"),
+            "cgroup.0": ([""], "/user.slice"),
+        }
+
+    def test_update(self):
+        """Stats can be updated from a flat dict."""
+        stats = CompactStats()
+        stats.update({"comm": "foo", "statm.size": 100, "statm.share": 10})
+        assert stats.copy() == {
+            "comm": "foo",
+            "statm.size": 100,
+            "statm.share": 10,
+        }
+        assert isinstance(stats._files["statm"], Record)
@@ -0,0 +1,34 @@
+import pytest
+
+from lxstats.scripts.procs import ProcsScript
+
+
+@pytest.fixture
+def parser():
+    yield ProcsScript().get_parser()
+
+
+class TestProcsScript:
+    @pytest.mark.parametrize("value,top", [("0", 0), ("10", 10)])
+    def test_top(self, parser, value, top):
+        """The number of top processes can be specified."""
+        assert parser.parse_args(["--top", value]).top == top
+
+    @pytest.mark.parametrize("value", ["-1", "foo"])
+    def test_top_invalid(self, parser, capsys, value):
+        """The number of top processes must be a non-negative integer."""
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--top", value])
+        assert "Must specify a non-negative integer" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("value,interval", [("0", 0), ("0.5", 0.5)])
+    def test_interval(self, parser, value, interval):
+        """The interval can be a fraction of a second."""
+        assert parser.parse_args(["--interval", value]).interval == interval
+
+    @pytest.mark.parametrize("value", ["-1", "foo"])
+    def test_interval_invalid(self, parser, capsys, value):
+        """The interval must be a non-negative number."""
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--interval", value])
+        assert "Must specify a non-negative number" in capsys.readouterr().err